@@ -0,0 +1,226 @@
+import os
+import time
+import datetime
+import platform
+import subprocess
+import pandas
+from parstud.benchmark.synthetic import generate_study
+from parstud.reader.reader import build_database
+from parstud.plotter.plotter import error_plot_jobs
+from parstud.plotter.plotter import piechart_plot_jobs
+from parstud.plotter.plotter import breakdown_plot_jobs
+from parstud.plotter.plotter import render_figures
+from parstud.runner.run_profile import generate_syscalls
+from parstud.runner.run_profile import run_and_gather_statistics
+from parstud.runner.run_profile import summarize_overhead
+
+RESULTFILE = "benchmark_parstud.csv"
+
+# Command used to measure the bookkeeping overhead of the runner
+NOOP_CMD = "/bin/true"
+
+
+def bench_reader(datapath, dbfile="runinfo_parstud.csv"):
+    """
+    Measures the time needed by build_database to read a study and the
+    memory used by the resulting database.
+
+    Parameters
+    ----------
+    datapath : string
+        path to the study, e.g. generated by generate_study.
+
+    dbfile : string, optional
+        name of the run database in datapath.
+
+    Returns
+    -------
+    tuple
+        The reader database and a dict with the "reader_time" in seconds,
+        the "reader_throughput" in runs per second and the "database_memory"
+        in bytes.
+    """
+
+    _start = time.perf_counter()
+    _df = build_database(os.path.join(datapath, ""), dbfile)
+    _elapsed = time.perf_counter() - _start
+
+    return (
+        _df,
+        {
+            "reader_time": _elapsed,
+            "reader_throughput": len(_df.index) / _elapsed,
+            "database_memory": int(_df.memory_usage(deep=True).sum()),
+        },
+    )
+
+
+def bench_plotter(df, plotdir, ext="png", nprocs=None):
+    """
+    Measures the time needed to render all figures of a reader database.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        reader database, e.g. returned by bench_reader.
+
+    plotdir : string
+        path to an existing directory for the plots.
+
+    ext : string, optional
+        image extension of the plots. Default is "png".
+
+    nprocs : int, optional
+        maximum number of processes to render with.
+
+    Returns
+    -------
+    dict
+        With the "plot_time" in seconds.
+    """
+
+    # Use the layout of the CSV files written by the read subcommand
+    _df = df.reset_index()
+
+    _start = time.perf_counter()
+    _jobs = error_plot_jobs(_df, plotdir, ext)
+    _jobs += piechart_plot_jobs(_df, plotdir, ext)
+    _jobs += breakdown_plot_jobs(_df, plotdir, ext)
+    render_figures(_jobs, nprocs=nprocs)
+    return {"plot_time": time.perf_counter() - _start}
+
+
+def bench_runner(datapath, runs):
+    """
+    Measures the per command overhead of the runner by executing a command
+    doing nothing.
+
+    Parameters
+    ----------
+    datapath : string
+        path to an existing, empty directory for the run database.
+
+    runs : int
+        number of times the command is executed.
+
+    Returns
+    -------
+    dict
+        With the total "runner_time" in seconds, the wall time per command
+        "runner_time_per_command" in seconds, which includes gathering the
+        system information and the run time of the command itself, and the
+        mean per command overhead of each category recorded by the runner,
+        e.g. "runner_overhead_spawn", and of all of them,
+        "runner_overhead_total".
+    """
+
+    _syscalls = generate_syscalls(None, NOOP_CMD)
+
+    _start = time.perf_counter()
+    _rundb = run_and_gather_statistics(_syscalls, datapath, passes_per_cmd=runs)
+    _elapsed = time.perf_counter() - _start
+
+    _results = {"runner_time": _elapsed, "runner_time_per_command": _elapsed / runs}
+    for _category, _mean in summarize_overhead(_rundb)["mean"].items():
+        _results["runner_overhead_" + _category] = _mean
+    return _results
+
+
+def run_benchmarks(workdir, runs, runner_runs=100, nprocs=None, seed=0):
+    """
+    Runs the benchmark suite of parstud on a synthetic study.
+
+    Parameters
+    ----------
+    workdir : string
+        path to an existing, empty directory for the synthetic study, the
+        plots and the runner benchmark.
+
+    runs : int
+        number of runs of the synthetic study, spread evenly over 8
+        variations.
+
+    runner_runs : int, optional
+        number of no-op commands executed to measure the runner overhead.
+
+    nprocs : int, optional
+        maximum number of processes to render with.
+
+    seed : int, optional
+        seed of the synthetic study.
+
+    Returns
+    -------
+    dict
+        All measurements, together with the scale of the benchmark.
+
+    Raises
+    ------
+    FileNotFoundError
+        If workdir does not exist.
+    """
+
+    if not os.path.isdir(workdir):
+        raise FileNotFoundError
+
+    _paths = {}
+    for _name in ("study", "plots", "runner"):
+        _paths[_name] = os.path.join(workdir, _name)
+        os.makedirs(_paths[_name])
+
+    _variations = [1, 2, 4, 8, 16, 32, 64, 128]
+    _passes = max(1, runs // len(_variations))
+    generate_study(_paths["study"], _variations, passes_per_cmd=_passes, seed=seed)
+
+    _results = {"runs": _passes * len(_variations), "runner_runs": runner_runs}
+    _df, _reader_results = bench_reader(_paths["study"])
+    _results.update(_reader_results)
+    _results.update(bench_plotter(_df, _paths["plots"], nprocs=nprocs))
+    _results.update(bench_runner(_paths["runner"], runner_runs))
+    return _results
+
+
+def record_results(results, resultfile):
+    """
+    Appends benchmark results to a CSV file, so that regressions can be
+    tracked over time. Every row is stamped with the date, the git revision
+    of parstud (if available) and the versions of Python and pandas.
+
+    Parameters
+    ----------
+    results : dict
+        measurements, e.g. returned by run_benchmarks.
+
+    resultfile : string
+        CSV file to append to. Created if it does not exist.
+
+    Returns
+    -------
+    pandas.DataFrame
+        All recorded results, including the new ones.
+    """
+
+    try:
+        _revision = os.fsdecode(
+            subprocess.check_output(
+                ["git", "rev-parse", "--short", "HEAD"],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                stderr=subprocess.DEVNULL,
+            )
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        _revision = None
+
+    _row = {
+        "date": datetime.datetime.now().isoformat(),
+        "revision": _revision,
+        "python": platform.python_version(),
+        "pandas": pandas.__version__,
+    }
+    _row.update(results)
+
+    _new = pandas.DataFrame([_row])
+    if os.path.isfile(resultfile):
+        _new = pandas.concat([pandas.read_csv(resultfile), _new], sort=False)
+    _new.to_csv(resultfile, index=False)
+    return _new
@@ -0,0 +1,138 @@
+import os
+import datetime
+import numpy as np
+import pandas
+
+# Phases of the parallel-pod code with a simple cost model: the time of a
+# phase on np processors is serial + parallel / np seconds, per million
+# points x snapshots. The numbers are loosely fitted to measured logs.
+POD_PHASES = [
+    ("Reading files", 0.20, 0.10),
+    ("Computing projection matrix", 0.01, 0.25),
+    ("Computing eigenvalues and eigenvectors", 0.0001, 0.0),
+    ("Computing POD modes", 0.03, 1.30),
+    ("Writing eigenvalues", 0.0001, 0.0),
+    ("Writing chronos", 0.0005, 0.0),
+    ("Writing POD modes", 0.40, 0.0),
+]
+
+
+def generate_log(phase_times):
+    """
+    Generates the text of a log file in the format written by the
+    parallel-pod code.
+
+    Parameters
+    ----------
+    phase_times : list or tuple
+        list of (phase, time) pairs, time in seconds.
+
+    Returns
+    -------
+    string
+        The log file contents.
+
+    Example
+    -------
+    >>> print(generate_log([("Reading files", 1.5)]))
+    Starting POD routines
+    <BLANKLINE>
+    Reading files...				 Done in 1.5s
+    <BLANKLINE>
+    """
+
+    _lines = ["Starting POD routines \n"]
+    for (_phase, _time) in phase_times:
+        _lines.append("{0}...\t\t\t\t Done in {1:g}s \n".format(_phase, _time))
+    return "\n".join(_lines) + "\n"
+
+
+def generate_study(
+    datapath,
+    variations,
+    passes_per_cmd=1,
+    points=381600,
+    snapshots=200,
+    noise=0.05,
+    seed=None,
+):
+    """
+    Writes a synthetic study to datapath: one parallel-pod style log per run
+    and a run database in the format written by the runner module.
+
+    Parameters
+    ----------
+    datapath : string
+        path to an existing directory where the study is written.
+
+    variations : list or tuple
+        numbers of processors to generate runs for.
+
+    passes_per_cmd : int, optional
+        number of runs per variation.
+
+    points : int, optional
+        number of points declared on the command lines.
+
+    snapshots : int, optional
+        number of snapshots declared on the command lines.
+
+    noise : float, optional
+        relative standard deviation of the log-normal noise applied to
+        every phase time. Default is 0.05.
+
+    seed : int, optional
+        seed of the random number generator.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The run database, also written to datapath as runinfo_parstud.csv.
+
+    Raises
+    ------
+    FileNotFoundError
+        If datapath does not exist.
+    """
+
+    if not os.path.isdir(datapath):
+        raise FileNotFoundError
+
+    _rng = np.random.default_rng(seed)
+    _size = points * snapshots / 1e6
+    _base = "3DPOD_U.out -i input -c chronos -m mode -p {0:d} -v 3 -nm 20 -s {1:d} -np".format(
+        points, snapshots
+    )
+
+    _clock = datetime.datetime(2019, 10, 28)
+    _dicts = []
+    for _variation in variations:
+        for _pass in range(1, passes_per_cmd + 1):
+            _noise = _rng.lognormal(0.0, noise, size=len(POD_PHASES))
+            _times = [
+                (_phase, _size * (_serial + _parallel / float(_variation)) * _n)
+                for ((_phase, _serial, _parallel), _n) in zip(POD_PHASES, _noise)
+            ]
+
+            _CMDOUTFILE = "output_{0}.txt".format(len(_dicts))
+            with open(os.path.join(datapath, _CMDOUTFILE), mode="w") as f:
+                f.write(generate_log(_times))
+
+            _start = _clock
+            _clock = _clock + datetime.timedelta(seconds=sum(t for (_, t) in _times))
+            _dicts.append(
+                {
+                    "command": "{0} {1}".format(_base, _variation),
+                    "desired_passes": passes_per_cmd,
+                    "pass_no": _pass,
+                    "start_time": _start.isoformat(),
+                    "exit_status": 0.0,
+                    "attempted": True,
+                    "stdout_file": _CMDOUTFILE,
+                    "end_time": _clock.isoformat(),
+                }
+            )
+
+    _rundb = pandas.DataFrame(_dicts)
+    _rundb.to_csv(os.path.join(datapath, "runinfo_parstud.csv"))
+    return _rundb
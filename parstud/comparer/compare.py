@@ -0,0 +1,222 @@
+import numpy as np
+import pandas as pd
+from scipy import stats
+from parstud.reader.reader import phase_columns
+from parstud.reader.reader import POD_PARAMETERS
+from parstud.reader.reader import drop_outliers
+
+# Smallest absolute Cliff's delta considered a "small" effect (Romano et al.)
+MIN_EFFECT_SIZE = 0.147
+
+# Rank of the verdicts in a comparison report
+VERDICT_ORDER = {"slowdown": 0, "unchanged": 1, "speedup": 2}
+
+# Columns of a comparison report, besides the variation keys
+REPORT_COLUMNS = [
+    "Phase",
+    "Baseline median [s]",
+    "New median [s]",
+    "Relative change",
+    "Cliff's delta",
+    "p-value",
+    "Verdict",
+]
+
+
+def cliffs_delta(baseline, new):
+    """
+    Computes Cliff's delta effect size between two samples.
+
+    Parameters
+    ----------
+    baseline    :   array_like
+        Timings of the baseline study.
+    new         :   array_like
+        Timings of the new study.
+
+    Returns
+    -------
+    float
+        Value in [-1, 1]. Positive values mean that the new timings tend to
+        be larger (slower) than the baseline ones.
+
+    Raises
+    ------
+    ValueError
+        If any of the samples is empty.
+
+    Example
+    -------
+    >>> cliffs_delta([1.0, 2.0], [3.0, 4.0])
+    1.0
+    """
+
+    _x = np.asarray(baseline, dtype=float)
+    _y = np.asarray(new, dtype=float)
+
+    if _x.size == 0 or _y.size == 0:
+        raise ValueError("baseline and new need to contain at least one value")
+
+    _diff = np.sign(_y[:, None] - _x[None, :])
+    return float(_diff.sum() / (_x.size * _y.size))
+
+
+def compare_databases(
+    baseline, new, keys=None, alpha=0.05, min_effect=MIN_EFFECT_SIZE
+):
+    """
+    Compares two reader databases phase by phase and variation by variation.
+
+    Rows of both databases are aligned by the parameter columns given in keys.
+    For every phase present in both databases and every parameter combination
+    present in both, the median timings are compared, Cliff's delta is used as
+    effect size and a two-sided Mann-Whitney U test decides on significance.
+    A change is only reported as a slowdown or speedup if it is significant
+    and its effect size reaches min_effect. Passes flagged as outliers are
+    left out.
+
+    Parameters
+    ----------
+    baseline    :   pandas.DataFrame
+        Reader database of the reference study.
+    new         :   pandas.DataFrame
+        Reader database of the study to check.
+    keys        :   list or tuple, optional
+        Columns identifying a variation. Defaults to "Number of processors"
+        together with the problem size parameters present in both databases.
+    alpha       :   float, optional
+        Significance level of the Mann-Whitney U test. Default is 0.05.
+    min_effect  :   float, optional
+        Minimum absolute Cliff's delta of a change. Default is 0.147, the
+        lower bound of a "small" effect.
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per variation and phase, ranked from the largest slowdown to
+        the largest speedup. The "Verdict" column is either "slowdown",
+        "speedup" or "unchanged". The "Relative change" is NaN if the
+        baseline median is zero but the new one is not; these slowdowns are
+        ranked first. The report is empty if no phase and variation pair has
+        timings in both databases.
+
+    Raises
+    ------
+    TypeError
+        If baseline or new is not a pandas DataFrame.
+    ValueError
+        If the databases have no phase or variation in common.
+    """
+
+    if not isinstance(baseline, pd.DataFrame) or not isinstance(new, pd.DataFrame):
+        raise TypeError("baseline and new must be pandas DataFrames")
+
+    # Passes flagged as outliers by the runner are not representative
+    baseline = drop_outliers(baseline)
+    new = drop_outliers(new)
+
+    if keys is None:
+        keys = ["Number of processors"] + [
+            col
+            for col in POD_PARAMETERS.values()
+            if col in baseline.columns and col in new.columns
+        ]
+
+    _keys = list(keys)
+    _phases = [col for col in phase_columns(baseline) if col in phase_columns(new)]
+    if not _phases:
+        raise ValueError("The databases have no phase in common")
+
+    _base_groups = baseline.groupby(_keys)
+    _new_groups = new.groupby(_keys)
+    _variations = [key for key in _base_groups.groups if key in _new_groups.groups]
+    if not _variations:
+        raise ValueError("The databases have no variation in common")
+
+    _rows = []
+    for _variation in _variations:
+        _base = _base_groups.get_group(_variation)
+        _new = _new_groups.get_group(_variation)
+        _values = _variation if isinstance(_variation, tuple) else (_variation,)
+
+        for _phase in _phases:
+            _x = _base[_phase].dropna().values
+            _y = _new[_phase].dropna().values
+            if _x.size == 0 or _y.size == 0:
+                continue
+
+            _base_median = float(np.median(_x))
+            _new_median = float(np.median(_y))
+            if _base_median != 0:
+                _change = (_new_median - _base_median) / _base_median
+            elif _new_median == 0:
+                _change = 0.0
+            else:
+                # No relative change from a vanishing baseline
+                _change = np.nan
+            _delta = cliffs_delta(_x, _y)
+            _pvalue = stats.mannwhitneyu(_x, _y, alternative="two-sided").pvalue
+
+            _relevant = _pvalue < alpha and abs(_delta) >= min_effect
+            if _relevant and _delta > 0:
+                _verdict = "slowdown"
+            elif _relevant and _delta < 0:
+                _verdict = "speedup"
+            else:
+                _verdict = "unchanged"
+
+            _row = dict(zip(_keys, _values))
+            _row.update(
+                {
+                    "Phase": _phase,
+                    "Baseline median [s]": _base_median,
+                    "New median [s]": _new_median,
+                    "Relative change": _change,
+                    "Cliff's delta": _delta,
+                    "p-value": _pvalue,
+                    "Verdict": _verdict,
+                }
+            )
+            _rows.append(_row)
+
+    # Slowdowns first, then unchanged phases and speedups, each ranked by
+    # their relative change. A slowdown from a vanishing baseline has no
+    # relative change but is larger than any finite one.
+    _report = pd.DataFrame(_rows, columns=_keys + REPORT_COLUMNS)
+    _rank = _report["Verdict"].map(VERDICT_ORDER)
+    _magnitude = _report["Relative change"].fillna(np.inf)
+    _order = np.lexsort((-_magnitude.values, _rank.values))
+    return _report.iloc[_order].reset_index(drop=True)
+
+
+def find_regressions(report, threshold=0.05):
+    """
+    Selects the significant slowdowns of a comparison report exceeding a
+    relative threshold.
+
+    Parameters
+    ----------
+    report      :   pandas.DataFrame
+        Report generated by compare_databases.
+    threshold   :   float, optional
+        Minimum relative slowdown to be reported, e.g. 0.05 for 5 %.
+        Default is 0.05.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Rows of report flagged as regressions.
+
+    Raises
+    ------
+    TypeError
+        If report is not a pandas DataFrame.
+    """
+
+    if not isinstance(report, pd.DataFrame):
+        raise TypeError("report must be an pandas DataFrame")
+
+    # A slowdown from a vanishing baseline exceeds any relative threshold
+    _change = report["Relative change"]
+    _mask = (report["Verdict"] == "slowdown") & ((_change > threshold) | _change.isnull())
+    return report[_mask]
@@ -0,0 +1,254 @@
+import os
+import math
+import threading
+import http.server
+import pandas as pd
+from parstud.reader.reader import read_log
+
+# Upper bounds of the run duration histogram buckets, in seconds
+DURATION_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 600.0, 1800.0, 3600.0)
+
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(
+        '{0}="{1}"'.format(_key, _escape(_value)) for (_key, _value) in labels
+    ) + "}"
+
+
+def _number(value):
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class StudyMetrics:
+    """
+    Live metrics of a running study, in the OpenMetrics text format scraped
+    by Prometheus compatible monitoring stacks.
+
+    The metrics are updated by passing update as a callback to the runner,
+    see run_profile.execute_per_run_database, and exposed either through an
+    HTTP endpoint (serve) or a file for the textfile collector of the node
+    exporter (textfile). The following metrics are exposed:
+
+    - parstud_runs_planned: number of runs in the run database.
+    - parstud_runs_completed_total, parstud_runs_failed_total and
+      parstud_runs_timed_out_total: finished runs by outcome.
+    - parstud_current_variation: 1 for the variation of the latest run.
+    - parstud_run_duration_seconds: histogram of the run durations per
+      variation.
+    - parstud_phase_seconds: phase times of the latest parsed log per
+      variation.
+
+    Parameters
+    ----------
+    textfile : string, optional
+        file rewritten after every update, e.g.
+        '/var/lib/node_exporter/textfile/parstud.prom'.
+
+    buckets : list or tuple, optional
+        upper bounds of the run duration histogram buckets, in seconds.
+    """
+
+    def __init__(self, textfile=None, buckets=DURATION_BUCKETS):
+        self.textfile = textfile
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._lock = threading.Lock()
+        self._planned = 0
+        self._outcomes = {"completed": 0, "failed": 0, "timed_out": 0}
+        self._current = None
+        self._durations = {}
+        self._phases = {}
+
+    def update(self, dbpath, rundb, index):
+        """
+        Accounts for a finished run. Called by the runner as
+        callback(dbpath, rundb, index).
+        """
+
+        _run = rundb.loc[index]
+        _variation = str(_run["command"]).split()[-1]
+
+        if _run.get("timed_out") == True:
+            _outcome = "timed_out"
+        elif _run["exit_status"] == 0:
+            _outcome = "completed"
+        else:
+            _outcome = "failed"
+
+        _phases = {}
+        if _outcome == "completed":
+            _log = os.path.join(dbpath, str(_run["stdout_file"]))
+            try:
+                _phases = dict(zip(read_log(_log, 0), read_log(_log, 1)))
+            except (OSError, ValueError):
+                # Not a log of the POD code
+                pass
+
+        with self._lock:
+            self._planned = len(rundb.index)
+            self._outcomes[_outcome] += 1
+            # The runner only calls back once a run is over, so the latest
+            # attempted run is the one the study is at
+            self._current = _variation
+            if not pd.isnull(_run.get("elapsed_time")):
+                _counts, _sum = self._durations.get(
+                    _variation, ([0] * len(self.buckets), 0.0)
+                )
+                _elapsed = float(_run["elapsed_time"])
+                _counts = [
+                    _count + (_elapsed <= _bound)
+                    for (_count, _bound) in zip(_counts, self.buckets)
+                ]
+                self._durations[_variation] = (_counts, _sum + _elapsed)
+            if _phases:
+                self._phases[_variation] = _phases
+
+        if self.textfile:
+            self.write_textfile(self.textfile)
+
+    def render(self, openmetrics=True):
+        """
+        Returns the metrics as text.
+
+        Parameters
+        ----------
+        openmetrics : boolean, optional
+            OpenMetrics 1.0 format if True (default), otherwise the
+            Prometheus text format 0.0.4 read by the textfile collector.
+
+        Returns
+        -------
+        string
+        """
+
+        _lines = []
+
+        def _family(name, kind, help, samples):
+            # Prometheus text format 0.0.4 types counters by their sample name
+            _typed = name + "_total" if kind == "counter" and not openmetrics else name
+            _lines.append("# HELP {0} {1}".format(_typed, help))
+            _lines.append("# TYPE {0} {1}".format(_typed, kind))
+            for (_suffix, _labelset, _value) in samples:
+                _lines.append(
+                    "{0}{1}{2} {3}".format(name, _suffix, _labels(_labelset), _number(_value))
+                )
+
+        with self._lock:
+            _family(
+                "parstud_runs_planned",
+                "gauge",
+                "Number of runs in the run database.",
+                [("", (), self._planned)],
+            )
+            for (_outcome, _help) in (
+                ("completed", "Runs finished successfully."),
+                ("failed", "Runs finished with a non-zero exit status."),
+                ("timed_out", "Runs killed after exceeding the timeout."),
+            ):
+                _family(
+                    "parstud_runs_" + _outcome,
+                    "counter",
+                    _help,
+                    [("_total", (), self._outcomes[_outcome])],
+                )
+
+            _family(
+                "parstud_current_variation",
+                "gauge",
+                "1 for the variation of the latest run.",
+                [("", (("variation", self._current),), 1)] if self._current else [],
+            )
+
+            _samples = []
+            for _variation in sorted(self._durations):
+                _counts, _sum = self._durations[_variation]
+                for (_count, _bound) in zip(_counts, self.buckets):
+                    _labelset = (("variation", _variation), ("le", _number(_bound)))
+                    _samples.append(("_bucket", _labelset, _count))
+                _samples.append(("_count", (("variation", _variation),), _counts[-1]))
+                _samples.append(("_sum", (("variation", _variation),), _sum))
+            _family(
+                "parstud_run_duration_seconds",
+                "histogram",
+                "Duration of the runs per variation.",
+                _samples,
+            )
+
+            _samples = []
+            for _variation in sorted(self._phases):
+                for (_phase, _time) in self._phases[_variation].items():
+                    _labelset = (("variation", _variation), ("phase", _phase))
+                    _samples.append(("", _labelset, _time))
+            _family(
+                "parstud_phase_seconds",
+                "gauge",
+                "Phase times of the latest parsed log per variation.",
+                _samples,
+            )
+
+        if openmetrics:
+            _lines.append("# EOF")
+        return "\n".join(_lines) + "\n"
+
+    def write_textfile(self, filename):
+        """
+        Writes the metrics in the Prometheus text format to filename. The
+        file is replaced atomically, so that the collector never reads a
+        partially written file.
+        """
+
+        _tmpfile = filename + ".tmp"
+        with open(_tmpfile, mode="w") as f:
+            f.write(self.render(openmetrics=False))
+        os.replace(_tmpfile, filename)
+
+    def serve(self, port, host="127.0.0.1"):
+        """
+        Serves the metrics over HTTP on host:port from a background thread.
+
+        Parameters
+        ----------
+        port : int
+            port to listen on, 0 for any free port.
+
+        host : string, optional
+            address to listen on. Default is the local host only.
+
+        Returns
+        -------
+        http.server.ThreadingHTTPServer
+            The running server; its server_address holds the actual port and
+            shutdown() stops it.
+        """
+
+        _metrics = self
+
+        class _Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                _body = _metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", OPENMETRICS_CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(_body)))
+                self.end_headers()
+                self.wfile.write(_body)
+
+            def log_message(self, format, *args):
+                # Keep the output of the runner clean
+                pass
+
+        _server = http.server.ThreadingHTTPServer((host, port), _Handler)
+        _thread = threading.Thread(target=_server.serve_forever, daemon=True)
+        _thread.start()
+        return _server
@@ -0,0 +1,220 @@
+import os
+import json
+import pandas as pd
+from parstud.reader.reader import read_log
+
+TRACEFILE = "trace_parstud.json"
+
+# Process id under which all tracks of a study are grouped
+STUDY_PID = 1
+
+
+def _microseconds(timestamp, origin):
+    return (timestamp - origin).total_seconds() * 1e6
+
+
+def run_events(path, run, origin, tid):
+    """
+    Builds the trace events of one run: a track named after the pass and the
+    command, a slice spanning the run and one nested slice per phase of its
+    log. The phases are laid out back to back from the start of the run, in
+    log order, since the logs only hold their durations.
+
+    Parameters
+    ----------
+    path    :   string
+        Path to the study directory.
+    run     :   pandas.Series
+        Row of the run database.
+    origin  :   pandas.Timestamp
+        Time of the trace origin.
+    tid     :   int
+        Track id of the run.
+
+    Returns
+    -------
+    list
+        Trace events, empty if the run was not attempted.
+    """
+
+    if pd.isnull(run.get("start_time")) or pd.isnull(run.get("end_time")):
+        return []
+
+    _start = pd.Timestamp(run["start_time"])
+    _ts = _microseconds(_start, origin)
+    # The monotonic duration of the process is more precise than the
+    # difference of the wall-clock times
+    if not pd.isnull(run.get("elapsed_time")):
+        _dur = float(run["elapsed_time"]) * 1e6
+    else:
+        _dur = _microseconds(pd.Timestamp(run["end_time"]), _start)
+
+    _args = {
+        _key: run[_key]
+        for _key in ("command", "pass_no", "exit_status", "outlier", "load_1min")
+        if _key in run.index and not pd.isnull(run[_key])
+    }
+    _args = json.loads(pd.Series(_args).to_json())
+
+    _events = [
+        {
+            "name": "thread_name",
+            "ph": "M",
+            "pid": STUDY_PID,
+            "tid": tid,
+            "args": {"name": "pass {0!s}: {1!s}".format(_args.get("pass_no"), run["command"])},
+        },
+        {
+            "name": "run {0!s}".format(run.name),
+            "cat": "run",
+            "ph": "X",
+            "pid": STUDY_PID,
+            "tid": tid,
+            "ts": _ts,
+            "dur": _dur,
+            "args": _args,
+        },
+    ]
+
+    _log = os.path.join(path, str(run.get("stdout_file")))
+    try:
+        _phases = list(zip(read_log(_log, 0), read_log(_log, 1)))
+    except (OSError, ValueError):
+        # Not a log of the POD code, the run has no phases
+        _phases = []
+
+    for (_phase, _time) in _phases:
+        _events.append(
+            {
+                "name": _phase,
+                "cat": "phase",
+                "ph": "X",
+                "pid": STUDY_PID,
+                "tid": tid,
+                "ts": _ts,
+                "dur": _time * 1e6,
+            }
+        )
+        _ts = _ts + _time * 1e6
+    return _events
+
+
+def counter_events(counters, origin):
+    """
+    Builds counter events from resource samples, drawn by trace viewers as
+    graphs above the run tracks.
+
+    Parameters
+    ----------
+    counters    :   pandas.DataFrame
+        One row per sample, with the sampling time in a "timestamp" column
+        (anything pandas.to_datetime understands) and one numeric column per
+        resource, e.g. CPU utilisation or disk throughput.
+    origin      :   pandas.Timestamp
+        Time of the trace origin.
+
+    Returns
+    -------
+    list
+        Trace events.
+
+    Raises
+    ------
+    KeyError
+        If counters has no "timestamp" column.
+    """
+
+    _times = pd.to_datetime(counters["timestamp"])
+    _columns = [
+        _col
+        for _col in counters.columns
+        if _col != "timestamp" and pd.api.types.is_numeric_dtype(counters[_col])
+    ]
+
+    _events = []
+    for _time, (_, _sample) in zip(_times, counters[_columns].iterrows()):
+        for _col in _columns:
+            if pd.isnull(_sample[_col]):
+                continue
+            _events.append(
+                {
+                    "name": _col,
+                    "ph": "C",
+                    "pid": STUDY_PID,
+                    "ts": _microseconds(_time, origin),
+                    "args": {_col: float(_sample[_col])},
+                }
+            )
+    return _events
+
+
+def build_trace(path, rundb, counters=None):
+    """
+    Converts a run database and the logs of its runs into a timeline in the
+    Chrome Trace Event format, which can be opened in Perfetto
+    (ui.perfetto.dev) or chrome://tracing. Every run is a track holding a
+    slice for the run and nested slices for its phases, so that overlapping
+    runs and phases can be seen side by side. The load average recorded
+    before each run is drawn as a counter, together with the optional
+    resource samples.
+
+    Parameters
+    ----------
+    path        :   string
+        Path to the study directory.
+    rundb       :   pandas.DataFrame
+        Run database as written by the runner.
+    counters    :   pandas.DataFrame, optional
+        Resource samples, see counter_events.
+
+    Returns
+    -------
+    dict
+        The trace, with timestamps in microseconds since the start of the
+        first run.
+
+    Raises
+    ------
+    TypeError
+        If rundb is not a pandas DataFrame.
+    """
+
+    if not isinstance(rundb, pd.DataFrame):
+        raise TypeError("rundb must be an pandas DataFrame")
+
+    _events = [
+        {
+            "name": "process_name",
+            "ph": "M",
+            "pid": STUDY_PID,
+            "args": {"name": "parstud study {0!s}".format(os.path.abspath(path))},
+        }
+    ]
+    if "start_time" not in rundb.columns or rundb["start_time"].isnull().all():
+        return {"traceEvents": _events, "displayTimeUnit": "ms"}
+
+    _starts = pd.to_datetime(rundb["start_time"])
+
+    _origin = _starts.min()
+    for _tid, (_, _run) in enumerate(rundb.iterrows(), start=1):
+        _events += run_events(path, _run, _origin, _tid)
+
+    if "load_1min" in rundb.columns:
+        _load = pd.DataFrame(
+            {"timestamp": _starts, "load_1min": rundb["load_1min"]}
+        ).dropna()
+        _events += counter_events(_load, _origin)
+
+    if counters is not None:
+        _events += counter_events(counters, _origin)
+
+    return {"traceEvents": _events, "displayTimeUnit": "ms"}
+
+
+def write_trace(trace, filename):
+    """
+    Writes a trace built by build_trace to a JSON file.
+    """
+
+    with open(filename, mode="w") as f:
+        json.dump(trace, f)
@@ -1,13 +1,23 @@
 import os
 import sys
+import json
 import errno
 import argparse
-from runner.run_profile import *
-from reader.reader import *
-from plotter.plotter import *
+
+# Make the parstud package importable when this file is run as a script, so
+# that the modules can import each other through the package.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# NOTE: The modules of the parstud package pull in pandas, NumPy, SciPy and
+# matplotlib. They are imported inside the subcommand functions only, so that
+# argument parsing (e.g. 'run --help') does not pay for importing them.
 
 
 def run_study(args):
+    from parstud.runner.run_profile import generate_syscalls
+    from parstud.runner.run_profile import run_and_gather_statistics
+    from parstud.runner.run_profile import summarize_overhead
+
     # Check the desired output directory for existance and emptyness
     try:
         check_output_directory(args.dir, force=args.forcedir)
@@ -18,10 +28,31 @@ def run_study(args):
 
     _syscalls = generate_syscalls(args.variations, args.systemcall)
     _passes = args.passes[0]
-    run_and_gather_statistics(_syscalls, args.dir, _passes, buildonly=False)
+    _callbacks = start_metrics(args)
+    _rundb = run_and_gather_statistics(
+        _syscalls,
+        args.dir,
+        _passes,
+        buildonly=False,
+        wrapper=args.wrapper,
+        order=args.order,
+        seed=args.seed,
+        max_load=args.maxload,
+        compression=args.compression,
+        archive=args.archive,
+        outlier_threshold=args.outliers,
+        max_reruns=args.reruns,
+        timeout=args.timeout,
+        callbacks=_callbacks,
+    )
+
+    print("Overhead of the runner [s]:")
+    print(summarize_overhead(_rundb).to_string())
 
 
 def read_database_and_gather_data(args):
+    from parstud.reader.reader import build_database
+
     if not os.path.isdir(args.idir):
         msg = "'{0!s}' is not an existing directory".format(args.idir)
         raise FileNotFoundError(msg)
@@ -37,7 +68,8 @@ def read_database_and_gather_data(args):
             raise IOError(msg)
 
     # Create suitable pandas DataFrame
-    _reader_df = build_database(args.idir, args.dbf)
+    # build_database expects the directory with a trailing separator
+    _reader_df = build_database(os.path.join(args.idir, ""), args.dbf)
 
     # If output filename is given, print to it as CSV
     if args.outf:
@@ -47,25 +79,238 @@ def read_database_and_gather_data(args):
 
 
 def plot_logfile(args):
+    import pandas as pd
+    from parstud.plotter.plotter import error_plot_jobs
+    from parstud.plotter.plotter import piechart_plot_jobs
+    from parstud.plotter.plotter import breakdown_plot_jobs
+    from parstud.plotter.plotter import category_breakdown
+    from parstud.plotter.plotter import bottleneck_table
+    from parstud.plotter.plotter import render_figures
+    from parstud.plotter.cache import cached_files
+    from parstud.plotter.cache import render_cached
+    from parstud.plotter.streaming import stream_statistics
+    from parstud.plotter.streaming import statistics_breakdown
+    from parstud.plotter.streaming import statistics_plot_jobs
+
     if os.path.isfile(args.input) and not os.access(args.input, os.R_OK):
         msg = "Cannot read {0!s}".format(args.input)
         raise IOError(msg)
 
+    # Figures recorded in the plot cache of the output directory are kept,
+    # unless caching is disabled.
+    _keep = []
+    if not args.nocache and os.path.isdir(args.dir):
+        _keep = cached_files(args.dir)
+
     # Check the desired output directory for existance and emptyness
+    try:
+        check_output_directory(args.dir, force=args.forcedir, keep=_keep)
+    except FileExistsError as _exc:
+        parser.print_usage()
+        print(_exc)
+        sys.exit(errno.EEXIST)
+
+    style = "seaborn-colorblind"
+    extension = "pdf"
+
+    # Optional phase to category mapping, e.g. {"Computing POD modes": "Solver"}
+    _mapping = None
+    if args.categories:
+        with open(args.categories, mode="r") as f:
+            _mapping = json.load(f)
+
+    if args.chunksize:
+        # Compute the statistics out of core, chunk by chunk
+        _stats = stream_statistics(args.input, chunksize=args.chunksize)
+        _jobs = statistics_plot_jobs(
+            _stats, args.dir, extension, style=style, mapping=_mapping
+        )
+        _breakdown = statistics_breakdown(_stats, _mapping)
+    else:
+        # Create suitable pandas DataFrame
+        _plotter_df = pd.read_csv(args.input)
+        _jobs = error_plot_jobs(_plotter_df, args.dir, extension, style=style)
+        _jobs += piechart_plot_jobs(
+            _plotter_df, args.dir, extension, style=style, mapping=_mapping
+        )
+        _jobs += breakdown_plot_jobs(
+            _plotter_df, args.dir, extension, style=style, mapping=_mapping
+        )
+        _breakdown = category_breakdown(_plotter_df, _mapping)
+
+    print("Share of time per category and dominant bottleneck:")
+    print(bottleneck_table(_breakdown).to_string())
+
+    # Render all independent figures in one process pool
+    if args.nocache:
+        render_figures(_jobs, nprocs=args.nprocs)
+        return
+
+    _report = render_cached(_jobs, args.dir, nprocs=args.nprocs)
+    print(
+        "Rendered {0:d} figure(s), reused {1:d} unchanged figure(s)".format(
+            len(_report["rendered"]), len(_report["reused"])
+        )
+    )
+    for _name in _report["rendered"]:
+        print("    rendered: {0!s}".format(_name))
+
+
+def stream_study(args):
+    from parstud.runner.run_profile import generate_syscalls
+    from parstud.plotter.cache import cached_files
+    from parstud.pipeline.pipeline import run_study_pipeline
+
+    # Check the desired output directories for existance and emptyness
+    _keep = []
+    if os.path.isdir(args.plotdir):
+        _keep = cached_files(args.plotdir)
     try:
         check_output_directory(args.dir, force=args.forcedir)
+        check_output_directory(args.plotdir, force=args.forcedir, keep=_keep)
     except FileExistsError as _exc:
         parser.print_usage()
         print(_exc)
         sys.exit(errno.EEXIST)
 
-    # Create suitable pandas DataFrame
-    _plotter_df = pd.read_csv(args.input)
+    _syscalls = generate_syscalls(args.variations, args.systemcall)
+    _passes = args.passes[0]
+    _callbacks = start_metrics(args)
+    run_study_pipeline(
+        _syscalls,
+        args.dir,
+        args.plotdir,
+        passes_per_cmd=_passes,
+        style="seaborn-colorblind",
+        nprocs=args.nprocs,
+        wrapper=args.wrapper,
+        order=args.order,
+        seed=args.seed,
+        max_load=args.maxload,
+        compression=args.compression,
+        archive=args.archive,
+        outlier_threshold=args.outliers,
+        max_reruns=args.reruns,
+        timeout=args.timeout,
+        callbacks=_callbacks,
+    )
 
-    plt.style.use("seaborn-colorblind")
-    extension = "pdf"
-    error_plot(_plotter_df, args.dir, extension)
-    piechart_plot(_plotter_df, args.dir, extension)
+
+def benchmark_parstud(args):
+    from parstud.benchmark.bench import run_benchmarks
+    from parstud.benchmark.bench import record_results
+
+    # Check the desired output directory for existance and emptyness
+    try:
+        check_output_directory(args.dir, force=args.forcedir)
+    except FileExistsError as _exc:
+        parser.print_usage()
+        print(_exc)
+        sys.exit(errno.EEXIST)
+
+    _results = run_benchmarks(
+        args.dir, args.runs, runner_runs=args.runnerruns, nprocs=args.nprocs
+    )
+    for _key, _value in _results.items():
+        print("{0!s}: {1!s}".format(_key, _value))
+    record_results(_results, args.outf)
+
+
+def compare_studies(args):
+    import pandas as pd
+    from parstud.comparer.compare import compare_databases
+    from parstud.comparer.compare import find_regressions
+
+    for _input in (args.baseline, args.new):
+        if not os.path.isfile(_input):
+            msg = "'{0!s}' does not exist".format(_input)
+            raise FileNotFoundError(msg)
+
+    _baseline_df = pd.read_csv(args.baseline)
+    _new_df = pd.read_csv(args.new)
+
+    _report = compare_databases(
+        _baseline_df, _new_df, alpha=args.alpha, min_effect=args.mineffect
+    )
+
+    # If output filename is given, print to it as CSV
+    if args.outf:
+        _report.to_csv(args.outf)
+    else:
+        print(_report.to_string())
+
+    # Signal regressions through the exit status so that the comparison can
+    # gate benchmark pipelines.
+    _regressions = find_regressions(_report, threshold=args.threshold)
+    if not _regressions.empty:
+        print(
+            "{0:d} slowdown(s) above {1:.1%} detected".format(
+                len(_regressions.index), args.threshold
+            )
+        )
+        sys.exit(1)
+
+
+def plan_study(args):
+    import pandas as pd
+    from parstud.planner.planner import fit_study
+    from parstud.planner.planner import model_table
+    from parstud.planner.planner import efficiency_knee
+    from parstud.planner.planner import propose_variations
+    from parstud.runner.run_profile import generate_syscalls
+
+    if not os.path.isfile(args.input):
+        msg = "'{0!s}' does not exist".format(args.input)
+        raise FileNotFoundError(msg)
+
+    _plan_df = pd.read_csv(args.input)
+    _candidates = range(1, args.maxprocs + 1)
+
+    try:
+        _fits = fit_study(_plan_df)
+    except ValueError as _exc:
+        print(_exc)
+    else:
+        print("Scaling model T(p) = serial + parallel / p + overhead * p [s]:")
+        print(model_table(_fits).to_string())
+        print(
+            "Efficiency knee (E < {0:g}): {1!s}".format(
+                args.efficiency,
+                efficiency_knee(_fits["Total"], _candidates, efficiency=args.efficiency),
+            )
+        )
+
+    _variations = propose_variations(
+        _plan_df, _candidates, n=args.number, efficiency=args.efficiency
+    )
+    print("Proposed variations: {0!s}".format(" ".join(_variations)))
+
+    if args.systemcall:
+        for _syscall in generate_syscalls(_variations, args.systemcall):
+            print(_syscall)
+
+
+def export_trace(args):
+    import pandas as pd
+    from parstud.exporter.trace import build_trace
+    from parstud.exporter.trace import write_trace
+
+    _dbf = os.path.join(args.idir, args.dbf)
+    if not os.path.exists(_dbf):
+        msg = "'{0!s}' does not exist".format(_dbf)
+        raise FileNotFoundError(msg)
+
+    _counters = None
+    if args.counters:
+        _counters = pd.read_csv(args.counters)
+
+    _trace = build_trace(args.idir, pd.read_csv(_dbf, index_col=0), counters=_counters)
+    write_trace(_trace, args.outf)
+    print(
+        "Wrote {0:d} trace events to '{1!s}', open it in https://ui.perfetto.dev".format(
+            len(_trace["traceEvents"]), args.outf
+        )
+    )
 
 
 # ---
@@ -74,6 +319,23 @@ def plot_logfile(args):
 #
 # ---
 
+# Function for starting the exporters of live metrics requested on the
+# command line. Returns the callbacks to pass to the runner.
+def start_metrics(args):
+    if args.metricsport is None and not args.metricsfile:
+        return []
+
+    from parstud.exporter.metrics import StudyMetrics
+
+    _metrics = StudyMetrics(textfile=args.metricsfile)
+    if args.metricsport is not None:
+        _server = _metrics.serve(args.metricsport)
+        print(
+            "Serving metrics on http://{0!s}:{1:d}/metrics".format(*_server.server_address)
+        )
+    return [_metrics.update]
+
+
 # Function for checking if a directory is valid.
 def directory(dirstring):
     if os.path.isdir(dirstring) == False:
@@ -84,20 +346,23 @@ def directory(dirstring):
 
 
 # Function for checking, creating and/or cleaning the desired output dir.
-def check_output_directory(dirstring, force=False):
+# Files listed in keep are neither considered nor removed.
+def check_output_directory(dirstring, force=False, keep=()):
     if os.path.isdir(dirstring) == False:
         msg = "Creating output directory '{0!s}'".format(dirstring)
         os.makedirs(dirstring)
 
-    if os.path.isdir(dirstring) == True and not os.listdir(dirstring):
+    _files = [_file for _file in os.listdir(dirstring) if _file not in keep]
+
+    if os.path.isdir(dirstring) == True and not _files:
         msg = "Using empty directory '{0!s}' for output".format(dirstring)
 
-    if os.path.isdir(dirstring) == True and os.listdir(dirstring):
+    if os.path.isdir(dirstring) == True and _files:
         msg = "Directory '{0!s}' is not empty".format(dirstring)
 
         if force:
             msg = "Forcing use of {0!s}! Cleaning directory...".format(dirstring)
-            for _file in os.listdir(dirstring):
+            for _file in _files:
                 os.remove(os.path.join(dirstring, _file))
 
         if not force:
@@ -109,12 +374,98 @@ def check_output_directory(dirstring, force=False):
     return dirstring
 
 
-if __name__ == "__main__":
+# Function for creating and configuring the argument parser.
+def build_parser():
     # Create and configure an argument parser
     parser = argparse.ArgumentParser(
         description="""Script for performing parametric runs on system commands."""
     )
 
+    # Options shared by the subcommands executing a study
+    runoptions = argparse.ArgumentParser(add_help=False)
+    runoptions.add_argument(
+        "-v",
+        "--variations",
+        help="""Variations to be applied to base system call""",
+        nargs="*",
+        type=str,
+        default=None,
+    )
+    runoptions.add_argument(
+        "-p",
+        "--passes",
+        help="""Number of passes per systemcall variation.""",
+        nargs=1,
+        default=[1],
+        type=int,
+    )
+    runoptions.add_argument(
+        "-w",
+        "--wrapper",
+        help="""Profiling tool to wrap every systemcall in: 'time' (/usr/bin/time -v), 'perf' (perf stat) or 'strace' (strace -c).""",
+        type=str,
+        default=None,
+    )
+    runoptions.add_argument(
+        "--order",
+        help="""Execution order of the runs: 'sequential' (all passes of a variation back to back), 'roundrobin' (one pass of every variation at a time) or 'random' (seeded random permutation).""",
+        choices=["sequential", "roundrobin", "random"],
+        default="sequential",
+    )
+    runoptions.add_argument(
+        "--seed",
+        help="""Seed of the random execution order.""",
+        type=int,
+        default=None,
+    )
+    runoptions.add_argument(
+        "--maxload",
+        help="""Before each run, wait until the 1 minute load average is at most this value and the CPU frequency has settled.""",
+        type=float,
+        default=None,
+    )
+    runoptions.add_argument(
+        "--compression",
+        help="""Compress the run outputs with 'gzip' or 'zstd' (requires the zstandard package).""",
+        choices=["gzip", "zstd"],
+        default=None,
+    )
+    runoptions.add_argument(
+        "--archive",
+        help="""Pack the run outputs into a single append-only archive with an index instead of one file per run.""",
+        action="store_true",
+    )
+    runoptions.add_argument(
+        "--outliers",
+        help="""Once all passes of a variation ran, flag the passes whose total or per phase time has a modified z-score (median/MAD) above this value, e.g. 3.5.""",
+        type=float,
+        default=None,
+    )
+    runoptions.add_argument(
+        "--reruns",
+        help="""Maximum number of replacement passes per variation for the passes flagged as outliers.""",
+        type=int,
+        default=0,
+    )
+    runoptions.add_argument(
+        "--timeout",
+        help="""Kill systemcalls running longer than this many seconds.""",
+        type=float,
+        default=None,
+    )
+    runoptions.add_argument(
+        "--metricsport",
+        help="""Serve live OpenMetrics of the study on this local port, at /metrics.""",
+        type=int,
+        default=None,
+    )
+    runoptions.add_argument(
+        "--metricsfile",
+        help="""Write live metrics of the study to this file, for the textfile collector of the Prometheus node exporter.""",
+        type=str,
+        default=None,
+    )
+
     subparsers = parser.add_subparsers(
         title="Subcommands",
         description="Commands for running, collecting and plotting data",
@@ -122,7 +473,7 @@ if __name__ == "__main__":
     )
 
     # Add subparsers
-    runner = subparsers.add_parser("run")
+    runner = subparsers.add_parser("run", parents=[runoptions])
     runner.set_defaults(func=run_study)
 
     reader = subparsers.add_parser("read")
@@ -131,6 +482,21 @@ if __name__ == "__main__":
     plotter = subparsers.add_parser("plot")
     plotter.set_defaults(func=plot_logfile)
 
+    comparer = subparsers.add_parser("compare")
+    comparer.set_defaults(func=compare_studies)
+
+    study = subparsers.add_parser("study", parents=[runoptions])
+    study.set_defaults(func=stream_study)
+
+    bench = subparsers.add_parser("bench")
+    bench.set_defaults(func=benchmark_parstud)
+
+    planner = subparsers.add_parser("plan")
+    planner.set_defaults(func=plan_study)
+
+    tracer = subparsers.add_parser("trace")
+    tracer.set_defaults(func=export_trace)
+
     # Configure the subparser for runner
     runner.add_argument("dir", help="""Directory where to store the run output.""")
     runner.add_argument(
@@ -143,22 +509,6 @@ if __name__ == "__main__":
     runner.add_argument(
         "systemcall", help="""Base system call to be varied.""", type=str
     )
-    runner.add_argument(
-        "-v",
-        "--variations",
-        help="""Variations to be applied to base system call""",
-        nargs="*",
-        type=str,
-        default=None,
-    )
-    runner.add_argument(
-        "-p",
-        "--passes",
-        help="""Number of passes per systemcall variation.""",
-        nargs=1,
-        default=[1],
-        type=int,
-    )
 
     # Configure the subparser for reader
     reader.add_argument(
@@ -190,6 +540,195 @@ if __name__ == "__main__":
         help="""Force usage of output directory. WARNING: This will wipe the specified drectory clean""",
         action="store_true",
     )
+    plotter.add_argument(
+        "-np",
+        "--nprocs",
+        help="""Maximum number of processes to render the plots with. Defaults to the number of CPUs.""",
+        type=int,
+        default=None,
+    )
+    plotter.add_argument(
+        "-cs",
+        "--chunksize",
+        help="""Read the input in chunks of this many rows and compute the statistics out of core, for inputs that do not fit in memory.""",
+        type=int,
+        default=None,
+    )
+    plotter.add_argument(
+        "-c",
+        "--categories",
+        help="""JSON file mapping phases to categories, e.g. {"Computing POD modes": "Solver"}. Unmapped phases are categorized by the first word of their name.""",
+        type=str,
+        default=None,
+    )
+    plotter.add_argument(
+        "--nocache",
+        help="""Re-render all figures instead of reusing the unchanged ones recorded in the plot cache of the output directory.""",
+        action="store_true",
+    )
+
+    # Configure the subparser for comparer
+    comparer.add_argument(
+        "baseline", help="""Reference CSV file generated by using the 'read' subcommand"""
+    )
+    comparer.add_argument(
+        "new", help="""CSV file generated by using the 'read' subcommand to check"""
+    )
+    comparer.add_argument(
+        "-t",
+        "--threshold",
+        help="""Relative slowdown above which a significant change fails the comparison.""",
+        type=float,
+        default=0.05,
+    )
+    comparer.add_argument(
+        "-a",
+        "--alpha",
+        help="""Significance level of the Mann-Whitney U test.""",
+        type=float,
+        default=0.05,
+    )
+    comparer.add_argument(
+        "-d",
+        "--mineffect",
+        help="""Minimum absolute Cliff's delta of a significant change. Defaults to 0.147, a small effect.""",
+        type=float,
+        default=0.147,
+    )
+    comparer.add_argument(
+        "-o",
+        help="""File to store the comparison report in.""",
+        type=str,
+        dest="outf",
+        default=None,
+    )
+
+    # Configure the subparser for study
+    study.add_argument("dir", help="""Directory where to store the run output.""")
+    study.add_argument("plotdir", help="""Directory where to store the plots.""")
+    study.add_argument(
+        "-fd",
+        "--forcedirectory",
+        dest="forcedir",
+        help="""Force usage of output directories. WARNING: This will wipe the specified directories clean""",
+        action="store_true",
+    )
+    study.add_argument(
+        "systemcall", help="""Base system call to be varied.""", type=str
+    )
+    study.add_argument(
+        "-np",
+        "--nprocs",
+        help="""Maximum number of processes to render the plots with. Defaults to the number of CPUs.""",
+        type=int,
+        default=None,
+    )
+
+    # Configure the subparser for bench
+    bench.add_argument(
+        "dir", help="""Directory where to store the synthetic study and benchmark output."""
+    )
+    bench.add_argument(
+        "-fd",
+        "--forcedirectory",
+        dest="forcedir",
+        help="""Force usage of output directory. WARNING: This will wipe the specified directory clean""",
+        action="store_true",
+    )
+    bench.add_argument(
+        "-n",
+        "--runs",
+        help="""Number of runs of the synthetic study.""",
+        type=int,
+        default=10000,
+    )
+    bench.add_argument(
+        "-nr",
+        "--runnerruns",
+        help="""Number of no-op commands executed to measure the runner overhead.""",
+        type=int,
+        default=100,
+    )
+    bench.add_argument(
+        "-np",
+        "--nprocs",
+        help="""Maximum number of processes to render the plots with. Defaults to the number of CPUs.""",
+        type=int,
+        default=None,
+    )
+    bench.add_argument(
+        "-o",
+        help="""CSV file the results are appended to.""",
+        type=str,
+        dest="outf",
+        default="benchmark_parstud.csv",
+    )
+
+    # Configure the subparser for planner
+    planner.add_argument(
+        "input", help="""Input CSV file generated by using the 'read' subcommand"""
+    )
+    planner.add_argument(
+        "-s",
+        "--systemcall",
+        help="""Base system call; if given, the systemcalls of the proposed variations are printed.""",
+        type=str,
+        default=None,
+    )
+    planner.add_argument(
+        "-n",
+        "--number",
+        help="""Number of variations to propose.""",
+        type=int,
+        default=3,
+    )
+    planner.add_argument(
+        "-mp",
+        "--maxprocs",
+        help="""Largest number of processors which can be run.""",
+        type=int,
+        default=os.cpu_count(),
+    )
+    planner.add_argument(
+        "-e",
+        "--efficiency",
+        help="""Parallel efficiency below which the scaling is considered collapsed.""",
+        type=float,
+        default=0.5,
+    )
+
+    # Configure the subparser for tracer
+    tracer.add_argument(
+        "idir",
+        help="""Directory where the database and run output to export is stored.""",
+        type=directory,
+    )
+    tracer.add_argument(
+        "-dbf",
+        help="""Run database file name""",
+        type=str,
+        default="runinfo_parstud.csv",
+    )
+    tracer.add_argument(
+        "-c",
+        "--counters",
+        help="""CSV file of resource samples to overlay, with a 'timestamp' column and one numeric column per resource.""",
+        type=str,
+        default=None,
+    )
+    tracer.add_argument(
+        "-o",
+        help="""File to store the trace in.""",
+        type=str,
+        dest="outf",
+        default="trace_parstud.json",
+    )
+
+    return parser
+
+
+if __name__ == "__main__":
+    parser = build_parser()
 
     # Parse arguments
     args = parser.parse_args()
@@ -0,0 +1,301 @@
+import os
+import functools
+import concurrent.futures
+import pandas as pd
+from parstud.runner.run_profile import run_and_gather_statistics
+from parstud.reader.reader import database_from_info
+from parstud.reader.reader import phase_columns
+from parstud.reader.reader import drop_outliers
+from parstud.plotter.plotter import error_plot_jobs_from_statistics
+from parstud.plotter.plotter import piechart_plot_jobs_from_reduced
+from parstud.plotter.plotter import piechart_title
+from parstud.plotter.plotter import category_breakdown_from_means
+from parstud.plotter.plotter import breakdown_plot_jobs_from_breakdown
+from parstud.plotter.cache import render_cached
+
+READERFILE = "readinfo_parstud.csv"
+STATISTICSFILE = "statistics_parstud.csv"
+
+
+def compute_statistics(df):
+    """
+    Computes per variation statistics of every phase of a reader database,
+    leaving out the passes flagged as outliers.
+
+    Parameters
+    ----------
+    df      :   pandas.DataFrame
+        DataFrame containing log data - usually read from csv produced by reader
+
+    Returns
+    -------
+    pandas.DataFrame
+        Indexed by "Number of processors", with the number of passes and the
+        "<phase> mean", "<phase> std", "<phase> min" and "<phase> max" columns.
+
+    Raises
+    ------
+    TypeError
+        If df is not a pandas DataFrame.
+    """
+
+    if not isinstance(df, pd.DataFrame):
+        raise TypeError("df must be an pandas DataFrame")
+
+    _phases = phase_columns(df)
+    df = drop_outliers(df)
+    _grouped = df[_phases + ["Number of processors"]].groupby("Number of processors")
+
+    _stats = pd.DataFrame(index=_grouped.size().index)
+    _stats["Number of passes"] = _grouped.size()
+    for _phase in _phases:
+        for _stat in ("mean", "std", "min", "max"):
+            _stats["{0!s} {1!s}".format(_phase, _stat)] = _grouped[_phase].agg(_stat)
+    return _stats
+
+
+def new_pipeline_state():
+    """
+    Returns the in-memory state of a study pipeline: the reader database,
+    the per variation statistics and 2.5 % / 97.5 % quantiles of every
+    phase, all initially empty.
+    """
+
+    return {"reader": None, "statistics": None, "p025": None, "p975": None}
+
+
+def _replace_variation(frame, updated, variation):
+    """
+    Replaces the rows of variation in frame, indexed by variation, by the
+    ones of updated.
+    """
+
+    if frame is None:
+        return updated
+    return pd.concat([frame.drop(index=variation, errors="ignore"), updated])
+
+
+def _append_reader_rows(datapath, reader, rows, rewrite):
+    """
+    Appends rows to the reader database persisted in datapath, or rewrites
+    it from reader if rewrite is set, the file is missing or the columns
+    changed.
+    """
+
+    _file = os.path.join(datapath, READERFILE)
+    if not rewrite and os.path.isfile(_file):
+        _columns = pd.read_csv(_file, nrows=0).columns
+        if list(_columns) == list(reader.columns):
+            rows[_columns].to_csv(_file, mode="a", header=False, index=False)
+            return
+
+    reader.to_csv(_file, index=False)
+
+
+def process_finished_run(
+    datapath,
+    rundb,
+    index,
+    plotdir,
+    state,
+    ext="pdf",
+    style=None,
+    nprocs=None,
+    executor=None,
+):
+    """
+    Callback for the runner, processing one finished run of a study:
+
+    1. The log of the run is parsed and appended to the reader database,
+       which is persisted in datapath. Only the new row is appended to the
+       file, unless the runner flagged outliers among the passes already
+       written, in which case the file is rewritten.
+    2. The statistics of the variation of the run are recomputed, the other
+       variations are left untouched, and persisted in datapath.
+    3. The error bar, pie chart and breakdown figures are rebuilt from the
+       per variation statistics rather than from the reader database, and
+       refreshed through the plot cache of plotdir, hence only the figures
+       whose data changed are rendered again.
+
+    Failed runs do not change the inputs of any stage and are skipped.
+
+    Parameters
+    ----------
+    datapath    :   string
+        Path to the study directory holding the run database and logs.
+    rundb       :   pandas.DataFrame
+        Run database as maintained by the runner.
+    index       :   int
+        Index of the finished run in rundb.
+    plotdir     :   string
+        Path for output plots.
+    state       :   dict
+        Pipeline state, see new_pipeline_state. Updated in place.
+    ext         :   string, optional
+        Image extension to define the format. Default is "pdf".
+    style       :   string, optional
+        Matplotlib style to render the plots with.
+    nprocs      :   int, optional
+        Maximum number of processes to render with.
+    executor    :   concurrent.futures.Executor, optional
+        Pool to render in, kept alive over the whole study.
+
+    Returns
+    -------
+    dict
+        With the "rendered" and "reused" figures, None if the run failed.
+    """
+
+    if rundb.at[index, "exit_status"] != 0:
+        return None
+
+    # Reader stage: parse only the log of the finished run
+    _run_df = database_from_info(os.path.join(datapath, ""), rundb.loc[[index]])
+    _run_df = _run_df.reset_index()
+    try:
+        _run_df["Number of processors"] = pd.to_numeric(_run_df["Number of processors"])
+    except ValueError:
+        # Keep non-numerical variations as they are
+        pass
+    _rewrite = state["reader"] is None
+    if state["reader"] is None:
+        state["reader"] = _run_df
+    else:
+        state["reader"] = pd.concat([state["reader"], _run_df], ignore_index=True)
+    _reader = state["reader"]
+    _variation = _run_df["Number of processors"].iloc[0]
+    _in_variation = _reader["Number of processors"] == _variation
+
+    # The runner may have flagged outliers among the passes of the variation
+    # once its last pass finished
+    if "outlier" in rundb.columns:
+        _flags = rundb.dropna(subset=["stdout_file"]).set_index("stdout_file")["outlier"]
+        _updated = (
+            _reader.loc[_in_variation, "stdout_file"].map(_flags).fillna(False).astype(bool)
+        )
+        if "outlier" not in _reader.columns:
+            _reader["outlier"] = False
+        _outlier = _reader["outlier"].fillna(False).astype(bool)
+        _previous = _outlier[_in_variation].iloc[:-1]
+        _rewrite = _rewrite or bool((_previous != _updated.iloc[:-1]).any())
+        _outlier[_updated.index] = _updated
+        _reader["outlier"] = _outlier
+    _append_reader_rows(datapath, _reader, _reader.iloc[[-1]], _rewrite)
+
+    # Statistics stage: recompute only the variation of the finished run
+    _phases = phase_columns(_reader)
+    _passes = drop_outliers(_reader[_in_variation])
+    _grouped = _passes[_phases + ["Number of processors"]].groupby("Number of processors")
+    state["statistics"] = _replace_variation(
+        state["statistics"], compute_statistics(_reader[_in_variation]), _variation
+    )
+    state["p025"] = _replace_variation(state["p025"], _grouped.quantile(0.025), _variation)
+    state["p975"] = _replace_variation(state["p975"], _grouped.quantile(0.975), _variation)
+    state["statistics"].to_csv(os.path.join(datapath, STATISTICSFILE))
+
+    # Plotter stage: every error bar figure spans all variations, but only
+    # the statistics of the changed variation were recomputed. The cache
+    # skips figures whose data did not change.
+    _stats = state["statistics"].sort_index()
+    _mean = _stats[[_phase + " mean" for _phase in _phases]].set_axis(_phases, axis=1)
+    _jobs = error_plot_jobs_from_statistics(
+        _mean,
+        state["p025"].sort_index()[_phases],
+        state["p975"].sort_index()[_phases],
+        plotdir,
+        ext,
+        style=style,
+    )
+
+    # The pie chart averages over all passes, i.e. weighs every variation
+    # by its number of passes
+    _breakdown = category_breakdown_from_means(_mean)
+    _weights = _stats["Number of passes"]
+    _reduced = _breakdown.mul(_weights, axis=0).sum() / _weights.sum()
+    _jobs += piechart_plot_jobs_from_reduced(
+        _reduced, plotdir, ext, style=style, title=piechart_title(_reader)
+    )
+    _jobs += breakdown_plot_jobs_from_breakdown(_breakdown, plotdir, ext, style=style)
+    return render_cached(_jobs, plotdir, nprocs=nprocs, executor=executor)
+
+
+def run_study_pipeline(
+    syscalls,
+    datapath,
+    plotdir,
+    passes_per_cmd=1,
+    ext="pdf",
+    style=None,
+    nprocs=None,
+    callbacks=None,
+    **kwargs
+):
+    """
+    Runs a parametric study while reading, aggregating and plotting its
+    results incrementally, as each run finishes.
+
+    Parameters
+    ----------
+    syscalls        :   list or tuple
+        list of systemcalls used for populating the run database.
+    datapath        :   string
+        Path to the study directory where runs and databases are stored.
+    plotdir         :   string
+        Path for output plots.
+    passes_per_cmd  :   int, optional
+        How many times each syscall is going to be executed.
+    ext             :   string, optional
+        Image extension to define the format. Default is "pdf".
+    style           :   string, optional
+        Matplotlib style to render the plots with.
+    nprocs          :   int, optional
+        Maximum number of processes to render with.
+    callbacks       :   list or tuple, optional
+        Further callbacks of the runner, called after the pipeline has
+        processed each run, e.g. to export metrics.
+    **kwargs
+        Passed on to run_and_gather_statistics, e.g. wrapper, order, seed or
+        max_load.
+
+    Returns
+    -------
+    dict
+        Final pipeline state with the "reader" database and "statistics".
+
+    Raises
+    ------
+    FileNotFoundError
+        If datapath or plotdir do not exist.
+    """
+
+    if not os.path.isdir(plotdir):
+        raise FileNotFoundError("'{0!s}' is not an existing directory".format(plotdir))
+
+    _state = new_pipeline_state()
+
+    # A single render pool serves the whole study
+    _executor = None
+    if (nprocs or os.cpu_count() or 1) > 1:
+        _executor = concurrent.futures.ProcessPoolExecutor(max_workers=nprocs)
+
+    _callback = functools.partial(
+        process_finished_run,
+        plotdir=plotdir,
+        state=_state,
+        ext=ext,
+        style=style,
+        nprocs=nprocs,
+        executor=_executor,
+    )
+    try:
+        run_and_gather_statistics(
+            syscalls,
+            datapath,
+            passes_per_cmd=passes_per_cmd,
+            callbacks=[_callback] + list(callbacks or ()),
+            **kwargs
+        )
+    finally:
+        if _executor is not None:
+            _executor.shutdown()
+    return _state
@@ -0,0 +1,264 @@
+import numpy as np
+import pandas as pd
+from scipy import optimize
+from parstud.reader.reader import phase_columns
+from parstud.reader.reader import drop_outliers
+
+# Terms of the scaling model of a phase on p processors:
+#   T(p) = serial + parallel / p + overhead * p
+# i.e. Amdahl's law with a communication/synchronisation cost growing with p.
+MODEL_TERMS = ("serial", "parallel", "overhead")
+
+# Minimum distance between proposed and known variations, in log2 units
+MIN_LOG2_SPACING = 0.5
+
+
+def _design_matrix(nprocs):
+    _p = np.asarray(nprocs, dtype=float)
+    return np.column_stack([np.ones_like(_p), 1.0 / _p, _p])
+
+
+def fit_scaling_model(nprocs, times):
+    """
+    Fits the scaling model T(p) = serial + parallel / p + overhead * p to the
+    timings of one phase by non-negative least squares.
+
+    Parameters
+    ----------
+    nprocs  :   array_like
+        Number of processors of every run.
+    times   :   array_like
+        Time of every run, in seconds.
+
+    Returns
+    -------
+    dict
+        With the "coefficients" (serial, parallel, overhead), the residual
+        standard deviation "sigma" and the covariance of the coefficients
+        "covariance".
+
+    Raises
+    ------
+    ValueError
+        If less than three distinct numbers of processors are given, in which
+        case the model is not identifiable.
+    """
+
+    _p = np.asarray(nprocs, dtype=float)
+    _t = np.asarray(times, dtype=float)
+    _valid = np.isfinite(_p) & np.isfinite(_t) & (_p > 0)
+    _p, _t = _p[_valid], _t[_valid]
+
+    if np.unique(_p).size < len(MODEL_TERMS):
+        raise ValueError(
+            "At least {0:d} distinct numbers of processors are needed to fit the model".format(
+                len(MODEL_TERMS)
+            )
+        )
+
+    _x = _design_matrix(_p)
+    _coefficients, _ = optimize.nnls(_x, _t)
+
+    # Residual variance, with a floor so that perfectly fitting data still
+    # leaves some uncertainty to reduce.
+    _residuals = _t - _x.dot(_coefficients)
+    _dof = max(_t.size - len(MODEL_TERMS), 1)
+    _sigma2 = max(float(_residuals.dot(_residuals)) / _dof, (1e-3 * _t.mean()) ** 2)
+
+    return {
+        "coefficients": _coefficients,
+        "sigma": np.sqrt(_sigma2),
+        "covariance": _sigma2 * np.linalg.pinv(_x.T.dot(_x)),
+    }
+
+
+def fit_study(df):
+    """
+    Fits the scaling model to every phase of a reader database and to the
+    total time of a run. Passes flagged as outliers are left out.
+
+    Parameters
+    ----------
+    df      :   pandas.DataFrame
+        DataFrame containing log data - usually read from csv produced by reader
+
+    Returns
+    -------
+    dict
+        Fit of every phase and of "Total", see fit_scaling_model.
+
+    Raises
+    ------
+    TypeError
+        If df is not a pandas DataFrame.
+    """
+
+    if not isinstance(df, pd.DataFrame):
+        raise TypeError("df must be an pandas DataFrame")
+
+    _phases = phase_columns(df)
+    df = drop_outliers(df)
+    _nprocs = pd.to_numeric(df["Number of processors"])
+
+    _fits = {}
+    for _phase in _phases:
+        _fits[_phase] = fit_scaling_model(_nprocs, df[_phase])
+    _fits["Total"] = fit_scaling_model(_nprocs, df[_phases].sum(axis=1, min_count=1))
+    return _fits
+
+
+def model_table(fits):
+    """
+    Summarizes fitted scaling models as a table with one row per phase, the
+    coefficients and their standard errors.
+    """
+
+    _rows = {}
+    for _phase, _fit in fits.items():
+        _row = dict(zip(MODEL_TERMS, _fit["coefficients"]))
+        _errors = np.sqrt(np.clip(np.diag(_fit["covariance"]), 0.0, None))
+        for _term, _error in zip(MODEL_TERMS, _errors):
+            _row[_term + " error"] = _error
+        _row["sigma"] = _fit["sigma"]
+        _rows[_phase] = _row
+    return pd.DataFrame.from_dict(_rows, orient="index")
+
+
+def predict(fit, nprocs):
+    """
+    Predicts the time and its standard error for the given numbers of
+    processors from a fitted scaling model.
+
+    Returns
+    -------
+    tuple
+        Arrays of the predicted times and of their standard errors.
+    """
+
+    _x = _design_matrix(np.atleast_1d(nprocs))
+    _variance = np.einsum("ij,jk,ik->i", _x, fit["covariance"], _x)
+    return _x.dot(fit["coefficients"]), np.sqrt(np.clip(_variance, 0.0, None))
+
+
+def efficiency_knee(fit, candidates, efficiency=0.5):
+    """
+    Locates the knee of the parallel efficiency predicted by a scaling model:
+    the smallest number of processors at which the efficiency
+    E(p) = T(1) / (p T(p)) falls below a threshold.
+
+    Parameters
+    ----------
+    fit         :   dict
+        Scaling model, see fit_scaling_model.
+    candidates  :   array_like
+        Numbers of processors to consider.
+    efficiency  :   float, optional
+        Efficiency threshold. Default is 0.5.
+
+    Returns
+    -------
+    int or None
+        The knee, None if the efficiency stays above the threshold.
+    """
+
+    _candidates = np.sort(np.asarray(candidates, dtype=float))
+    _serial_time = predict(fit, 1)[0][0]
+    _times = predict(fit, _candidates)[0]
+    _efficiency = _serial_time / (_candidates * _times)
+
+    _below = np.nonzero(_efficiency < efficiency)[0]
+    if _below.size == 0:
+        return None
+    return int(_candidates[_below[0]])
+
+
+def propose_variations(df, candidates, n=3, efficiency=0.5):
+    """
+    Proposes the next numbers of processors to run, in order to characterize
+    the scaling of a code with as few runs as possible.
+
+    The first proposal is the knee of the parallel efficiency predicted by
+    the model of the total time, unless it was already measured. The
+    remaining ones are chosen
+    greedily where the relative uncertainty of the predicted total time is
+    largest, assuming every proposal will be measured once. While less than
+    three variations have a total time from passes not flagged as outliers,
+    the proposals are instead spread evenly on a logarithmic scale between
+    the measured ones.
+
+    Parameters
+    ----------
+    df          :   pandas.DataFrame
+        DataFrame containing log data - usually read from csv produced by reader
+    candidates  :   list or tuple
+        Numbers of processors which can be run, e.g. range(1, 65).
+    n           :   int, optional
+        Number of variations to propose. Default is 3.
+    efficiency  :   float, optional
+        Parallel efficiency threshold defining the knee. Default is 0.5.
+
+    Returns
+    -------
+    list
+        Proposed numbers of processors, as strings ready to be passed to
+        generate_syscalls.
+
+    Raises
+    ------
+    TypeError
+        If df is not a pandas DataFrame.
+    """
+
+    if not isinstance(df, pd.DataFrame):
+        raise TypeError("df must be an pandas DataFrame")
+
+    # Only the passes the model can be fitted to count as measured, i.e. not
+    # flagged as outliers and with a total time
+    _usable = drop_outliers(df)
+    _nprocs = pd.to_numeric(_usable["Number of processors"])
+    _total = _usable[phase_columns(df)].sum(axis=1, min_count=1)
+    _valid = _total.notnull() & (_nprocs > 0)
+    _nprocs, _total = _nprocs[_valid], _total[_valid]
+
+    _measured = set(_nprocs.astype(int))
+    _open = sorted(set(int(_c) for _c in candidates) - _measured)
+    _proposals = []
+
+    if len(_measured) < len(MODEL_TERMS):
+        # Space filling: maximize the log distance to the known variations
+        while _open and len(_proposals) < n:
+            _known = np.log2(sorted(_measured | set(_proposals)) or [1])
+            _distance = [np.abs(_known - np.log2(_c)).min() for _c in _open]
+            _proposals.append(_open.pop(int(np.argmax(_distance))))
+        return [str(_p) for _p in _proposals]
+
+    _fit = fit_scaling_model(_nprocs, _total)
+    _covariance = _fit["covariance"].copy()
+    _sigma2 = _fit["sigma"] ** 2
+
+    def _add(nprocs):
+        # Rank one update of the covariance as if nprocs had been measured
+        _x = _design_matrix([nprocs])[0]
+        _cx = _covariance.dot(_x)
+        _covariance[:] = _covariance - np.outer(_cx, _cx) / (_sigma2 + _x.dot(_cx))
+        _open.remove(nprocs)
+        _proposals.append(nprocs)
+
+    _knee = efficiency_knee(_fit, _open + sorted(_measured), efficiency=efficiency)
+    if _knee is not None and _knee in _open and n > 0:
+        _add(_knee)
+
+    while _open and len(_proposals) < n:
+        _x = _design_matrix(_open)
+        _variance = np.einsum("ij,jk,ik->i", _x, _covariance, _x)
+        _relative = _variance / np.maximum(_x.dot(_fit["coefficients"]), 1e-12) ** 2
+
+        # Avoid proposing neighbours of known variations, e.g. 127 next to
+        # 128, as long as variations further apart are left.
+        _known = np.log2(sorted(_measured | set(_proposals)))
+        _distance = np.array([np.abs(_known - np.log2(_c)).min() for _c in _open])
+        if (_distance >= MIN_LOG2_SPACING).any():
+            _relative = np.where(_distance >= MIN_LOG2_SPACING, _relative, -np.inf)
+        _add(_open[int(np.argmax(_relative))])
+
+    return [str(_p) for _p in _proposals]
@@ -0,0 +1,184 @@
+import os
+import json
+import hashlib
+import numpy as np
+import matplotlib
+from parstud.plotter.plotter import render_figures
+
+MANIFEST_FILE = "plotcache_parstud.json"
+
+
+def figure_hash(func, kwargs):
+    """
+    Computes a content hash of a render job, i.e. of the render function,
+    the data slice and the plot parameters of one figure.
+
+    The directory part of the output file name is not hashed, hence a cache
+    stays valid when the output directory is moved.
+
+    Parameters
+    ----------
+    func    :   function
+        Render function of the job.
+    kwargs  :   dict
+        Keyword arguments of the render function.
+
+    Returns
+    -------
+    string
+        Hexadecimal SHA-256 digest.
+    """
+
+    _hash = hashlib.sha256()
+    _hash.update(func.__name__.encode())
+    # Figures rendered by another matplotlib version may differ
+    _hash.update(matplotlib.__version__.encode())
+
+    for _key in sorted(kwargs):
+        _value = kwargs[_key]
+        if _key == "filename":
+            _value = os.path.basename(_value)
+
+        _hash.update(_key.encode())
+        if isinstance(_value, np.ndarray):
+            _hash.update(str((_value.dtype, _value.shape)).encode())
+            _hash.update(np.ascontiguousarray(_value).tobytes())
+        else:
+            _hash.update(repr(_value).encode())
+
+    return _hash.hexdigest()
+
+
+def load_manifest(path):
+    """
+    Loads the plot cache manifest of an output directory.
+
+    Parameters
+    ----------
+    path    :   string
+        Path for output plots
+
+    Returns
+    -------
+    dict
+        Mapping of figure file names to their hashes. Empty if there is no
+        manifest in path.
+    """
+
+    _manifest = os.path.join(path, MANIFEST_FILE)
+    if not os.path.isfile(_manifest):
+        return {}
+
+    with open(_manifest, mode="r") as f:
+        return json.load(f)
+
+
+def save_manifest(path, manifest):
+    """
+    Writes the plot cache manifest of an output directory. The manifest is
+    replaced atomically, so an interrupted run never leaves a corrupt one.
+
+    Parameters
+    ----------
+    path        :   string
+        Path for output plots
+    manifest    :   dict
+        Mapping of figure file names to their hashes.
+
+    Returns
+    -------
+    Nothing
+    """
+
+    _manifest = os.path.join(path, MANIFEST_FILE)
+    with open(_manifest + ".tmp", mode="w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(_manifest + ".tmp", _manifest)
+
+
+def cached_files(path):
+    """
+    Lists the files of an output directory that belong to the plot cache,
+    including the manifest itself.
+
+    Parameters
+    ----------
+    path    :   string
+        Path for output plots
+
+    Returns
+    -------
+    list
+        File names, relative to path.
+    """
+
+    _manifest = load_manifest(path)
+    if not _manifest:
+        return []
+
+    return list(_manifest) + [MANIFEST_FILE]
+
+
+def render_cached(jobs, path, nprocs=None, executor=None):
+    """
+    Renders the figures of jobs whose hash differs from the one recorded in
+    the manifest of path, or whose file is missing, and reuses the others.
+    Figures recorded in the manifest but not part of jobs are deleted. The
+    manifest is updated afterwards.
+
+    Parameters
+    ----------
+    jobs        :   list
+        List of (function, kwargs) tuples as built by e.g. error_plot_jobs.
+        All figures are expected to be saved in path.
+    path        :   string
+        Path for output plots, holding the manifest.
+    nprocs      :   int, optional
+        Maximum number of processes to render with. Defaults to the number
+        of CPUs.
+    executor    :   concurrent.futures.Executor, optional
+        Pool to render in, see render_figures.
+
+    Returns
+    -------
+    dict
+        With the lists of "rendered" and "reused" figure file names.
+
+    Raises
+    ------
+    FileNotFoundError
+        If path does not exist.
+    """
+
+    if not os.path.isdir(path):
+        raise FileNotFoundError("'{0!s}' is not an existing directory".format(path))
+
+    _manifest = load_manifest(path)
+
+    _hashes = {}
+    _stale = []
+    _reused = []
+    for (_func, _kwargs) in jobs:
+        _name = os.path.basename(_kwargs["filename"])
+        _hashes[_name] = figure_hash(_func, _kwargs)
+
+        if _manifest.get(_name) == _hashes[_name] and os.path.isfile(
+            os.path.join(path, _name)
+        ):
+            _reused.append(_name)
+        else:
+            _stale.append((_func, _kwargs))
+
+    _rendered = [os.path.basename(_f) for _f in render_figures(_stale, nprocs=nprocs, executor=executor)]
+
+    # Figures not part of this invocation stem from an earlier or another
+    # study and are removed together with their entries.
+    for _name in list(_manifest):
+        if _name not in _hashes:
+            if os.path.isfile(os.path.join(path, _name)):
+                os.remove(os.path.join(path, _name))
+            del _manifest[_name]
+    _manifest.update(_hashes)
+    save_manifest(path, _manifest)
+
+    return {"rendered": _rendered, "reused": _reused}
@@ -1,10 +1,273 @@
+import os
+import contextlib
+import concurrent.futures
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import os
+import matplotlib.style
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from parstud.reader.reader import phase_columns
+from parstud.reader.reader import drop_outliers
+
+
+def _new_figure():
+    """
+    Creates a figure attached to the non-interactive Agg canvas. The figure
+    is not registered in pyplot's global state, hence it is freed as soon as
+    it goes out of scope.
+    """
+
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def _style_context(style):
+    """
+    Returns a context manager applying the matplotlib style, if any. The
+    style is applied inside each render call so that figures rendered in
+    worker processes look the same as the ones rendered in the main process.
+    """
+
+    if style:
+        return matplotlib.style.context(style)
+    return contextlib.nullcontext()
+
+
+def check_plot_output(path, ext):
+    """
+    Checks that plots can be saved in the given directory with the given
+    extension.
+
+    Parameters
+    ----------
+    path    :   string
+        Path for output plots
+    ext     :   string
+        Image extension to define the format ("png","pdf","svg"...)
 
+    Returns
+    -------
+    Nothing
 
-def error_plot(df, path, ext):
+    Raises
+    ------
+    TypeError
+        If path is not a string
+        If ext is not a string
+    ValueError
+        If ext is not a supported extension for an image format.
+    FileNotFoundError
+        If path does not exist.
+    """
+
+    if not isinstance(path, str):
+        raise TypeError("path must be a string")
+    if not isinstance(ext, str):
+        raise TypeError("ext must be a string")
+
+    if not os.path.isdir(path):
+        raise FileNotFoundError("'{0!s}' is not an existing directory".format(path))
+
+    if ext not in _new_figure().canvas.get_supported_filetypes():
+        raise ValueError("'{0!s}' is not a supported image format".format(ext))
+
+
+def _render_errorbar(filename, title, x, mean, lower, upper, style=None):
+    """
+    Renders one error plot to filename. Worker function for render_figures.
+    """
+
+    with _style_context(style):
+        fig = _new_figure()
+        ax = fig.add_subplot()
+        (_, caps, _) = ax.errorbar(
+            x,
+            mean,
+            yerr=[lower, upper],
+            linestyle="-",
+            fmt="o",
+            markersize=8,
+            capsize=5,
+        )
+        for cap in caps:
+            cap.set_markeredgewidth(1)
+        ax.set_title(title)
+        ax.set_ylabel("Time [s]")
+        ax.set_xlabel("Number of processors")
+        fig.savefig(filename, bbox_inches="tight")
+    return filename
+
+
+def _render_piechart(filename, title, labels, sizes, explode, style=None):
+    """
+    Renders one pie chart to filename. Worker function for render_figures.
+    """
+
+    with _style_context(style):
+        fig = _new_figure()
+        ax = fig.add_subplot()
+        ax.pie(
+            sizes,
+            explode=explode,
+            labels=labels,
+            autopct="%1.1f%%",
+            shadow=True,
+            startangle=90,
+        )
+        # Equal aspect ratio ensures that pie is drawn as a circle.
+        ax.axis("equal")
+        ax.set_title(title)
+        fig.savefig(filename, bbox_inches="tight")
+    return filename
+
+
+def _render_stackedbar(filename, title, x, labels, values, ylabel, style=None):
+    """
+    Renders one stacked bar chart to filename, one bar per x value and one
+    stacked segment per label. Worker function for render_figures.
+    """
+
+    with _style_context(style):
+        fig = _new_figure()
+        ax = fig.add_subplot()
+        _positions = np.arange(len(x))
+        _bottom = np.zeros(len(x))
+        for (_label, _values) in zip(labels, values):
+            ax.bar(_positions, _values, bottom=_bottom, label=_label)
+            _bottom = _bottom + np.asarray(_values)
+        ax.set_xticks(_positions)
+        ax.set_xticklabels([str(_x) for _x in x])
+        ax.set_title(title)
+        ax.set_ylabel(ylabel)
+        ax.set_xlabel("Number of processors")
+        ax.legend()
+        fig.savefig(filename, bbox_inches="tight")
+    return filename
+
+
+def render_figures(jobs, nprocs=None, executor=None):
+    """
+    Renders independent figures, in a process pool when more than one
+    process is allowed and more than one figure is to be rendered.
+
+    Parameters
+    ----------
+    jobs        :   list
+        List of (function, kwargs) tuples, where function is one of the
+        module level render functions and kwargs its keyword arguments.
+    nprocs      :   int, optional
+        Maximum number of processes to use. Defaults to the number of CPUs.
+    executor    :   concurrent.futures.Executor, optional
+        Pool to render in instead of starting a new one, e.g. kept alive
+        over the many renderings of a study pipeline. nprocs is ignored.
+
+    Returns
+    -------
+    list
+        Names of the rendered files, in the order of jobs.
+
+    Raises
+    ------
+    TypeError
+        If nprocs is not None or a positive integer.
+    """
+
+    if not (nprocs is None or (isinstance(nprocs, int) and nprocs > 0)):
+        raise TypeError("nprocs needs to be None or a positive integer")
+
+    if executor is not None:
+        _futures = [executor.submit(_func, **_kwargs) for (_func, _kwargs) in jobs]
+        return [_future.result() for _future in _futures]
+
+    _nprocs = min(nprocs or os.cpu_count() or 1, len(jobs))
+
+    if _nprocs <= 1:
+        return [_func(**_kwargs) for (_func, _kwargs) in jobs]
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=_nprocs) as _pool:
+        _futures = [_pool.submit(_func, **_kwargs) for (_func, _kwargs) in jobs]
+        return [_future.result() for _future in _futures]
+
+
+def error_plot_jobs(df, path, ext, style=None):
+    """
+    Builds the render jobs of error_plot, one per function of the 3DPOD.
+    See error_plot for the description of the parameters.
+
+    Returns
+    -------
+    list
+        List of (function, kwargs) tuples to be passed to render_figures.
+    """
+
+    if not isinstance(df, pd.DataFrame):
+        raise TypeError(
+            "df must be an pandas DataFrame"
+        )
+
+    check_plot_output(path, ext)
+
+    # Passes flagged as outliers by the runner do not skew the statistics
+    df = drop_outliers(df)
+
+    _phases = phase_columns(df)
+    _grouped = df[_phases + ["Number of processors"]].groupby("Number of processors")
+    mean = _grouped.mean()
+    p025 = _grouped.quantile(0.025)
+    p975 = _grouped.quantile(0.975)
+
+    return error_plot_jobs_from_statistics(mean, p025, p975, path, ext, style=style)
+
+
+def error_plot_jobs_from_statistics(mean, p025, p975, path, ext, style=None):
+    """
+    Builds the render jobs of error_plot from precomputed statistics, e.g.
+    computed out of core by streaming.stream_statistics.
+
+    Parameters
+    ----------
+    mean    :   pandas.DataFrame
+        Mean of each phase (columns) per number of processors (index).
+    p025    :   pandas.DataFrame
+        2.5 % quantile, with the same layout as mean.
+    p975    :   pandas.DataFrame
+        97.5 % quantile, with the same layout as mean.
+    path    :   string
+        Path for output plots
+    ext     :   string
+        Image extension to define the format ("png","pdf","svg"...)
+    style   :   string, optional
+        Matplotlib style to render the plots with.
+
+    Returns
+    -------
+    list
+        List of (function, kwargs) tuples to be passed to render_figures.
+    """
+
+    check_plot_output(path, ext)
+
+    jobs = []
+    for i, _phase in enumerate(mean.columns):
+        jobs.append(
+            (
+                _render_errorbar,
+                {
+                    "filename": os.path.join(path, "errorbar_" + str(i) + "." + ext),
+                    "title": _phase,
+                    "x": mean.index.values,
+                    "mean": mean[_phase].values,
+                    "lower": (mean[_phase] - p025[_phase]).values,
+                    "upper": (p975[_phase] - mean[_phase]).values,
+                    "style": style,
+                },
+            )
+        )
+    return jobs
+
+
+def error_plot(df, path, ext, style=None, nprocs=None):
     """
     Reads log data in pandas DataFrame format and creates error plots for 
     each function of the 3DPOD at a given directory with a given extension
@@ -17,6 +280,11 @@ def error_plot(df, path, ext):
         Path for output plots
     ext     :   string
         Image extension to define the format ("png","pdf","svg"...)
+    style   :   string, optional
+        Matplotlib style to render the plots with.
+    nprocs  :   int, optional
+        Maximum number of processes to render with. Defaults to the number
+        of CPUs.
 
     Returns
     -------
@@ -34,56 +302,105 @@ def error_plot(df, path, ext):
         If path does not exist.
     """
 
+    render_figures(error_plot_jobs(df, path, ext, style=style), nprocs=nprocs)
+
+
+def phase_categories(phases, mapping=None):
+    """
+    Maps phases to categories. Phases are mapped by mapping if listed there,
+    otherwise by the first word of their name, e.g. "Reading files" to
+    "Reading", which gives the "Reading", "Computing" and "Writing"
+    categories for the parallel-pod logs.
+
+    Parameters
+    ----------
+    phases  :   list
+        Phase names, e.g. from reader.phase_columns.
+    mapping :   dict, optional
+        Category of each phase, e.g. {"Computing POD modes": "Solver"}.
+
+    Returns
+    -------
+    dict
+        Category of every phase, in the order of phases.
+
+    Example
+    -------
+    >>> phase_categories(["Reading files", "Writing chronos"], {"Writing chronos": "IO"})
+    {'Reading files': 'Reading', 'Writing chronos': 'IO'}
+    """
+
+    _mapping = mapping or {}
+    return {
+        _phase: _mapping.get(_phase, _phase.split()[0] if _phase.split() else _phase)
+        for _phase in phases
+    }
+
+
+def _sum_categories(df, phases, mapping=None):
+    """
+    Sums the phase columns of df by category, keeping the categories in the
+    order of their first phase.
+    """
+
+    _categories = phase_categories(phases, mapping)
+    _order = list(dict.fromkeys(_categories.values()))
+    _summed = df[phases].T.groupby(_categories).sum(min_count=1).T
+    return _summed[_order]
+
+
+def reduce_df(df, mapping=None):
+    """
+    Takes in log-based DataFrame and performs two actions:
+    1) Reduces the phases to categories by summing up the phases of each
+    category, see phase_categories. By default the categories are "Reading",
+    "Computing" and "Writing" for the parallel-pod logs
+    2) Takes the average over all passess and number of processors
+
+    Parameters
+    ----------
+    df      :   pandas.DataFrame    
+        DataFrame containing log data - usually read from csv produced by reader
+    mapping :   dict, optional
+        Category of each phase, see phase_categories.
+
+    Returns
+    -------
+    df_r    :   pandas.Series
+        Averaged time per category, in the order of their first phase
+
+    Raises
+    ------
+    TypeError
+        If df is not a pandas DataFrame.
+    """
+
     if not isinstance(df, pd.DataFrame):
         raise TypeError(
             "df must be an pandas DataFrame"
         )
     else:
-        # Quantile method raises error for obj types
-        df_no_obj = df.iloc[:, 1:-1]
-        mean = df_no_obj.groupby("Number of processors").mean()
-        p025 = df_no_obj.groupby("Number of processors").quantile(0.025)
-        p975 = df_no_obj.groupby("Number of processors").quantile(0.975)
-
-        for i in range(0, 7):
-            plt.figure()
-            (_, caps, _) = plt.errorbar(
-                mean.index,
-                mean.iloc[:, i],
-                yerr=[mean.iloc[:, i] - p025.iloc[:, i],
-                      p975.iloc[:, i] - mean.iloc[:, i]],
-                linestyle="-",
-                fmt="o",
-                markersize=8,
-                capsize=5,
-            )
-            for cap in caps:
-                cap.set_markeredgewidth(1)
-            plt.title(mean.columns[i])
-            plt.ylabel("Time [s]")
-            plt.xlabel("Number of processors")
-            plt.savefig(
-                os.path.join(path, "errorbar_" + str(i) + "." + ext),
-                bbox_inches="tight"
-            )
+        df_r = _sum_categories(df, phase_columns(df), mapping)
+        return df_r.mean()
 
 
-def reduce_df(df):
+def category_breakdown(df, mapping=None):
     """
-    Takes in log-based DataFrame and performs two actions:
-    1) Reduces the number of functions to only "Reading", "Computing" and "Writing"
-    based on the column headers by summing up the functions that fit in that category
-    2) Takes the average over all passess and number of processors
+    Average time per category and variation, i.e. how the time of a run
+    splits up into e.g. reading, computing and writing for every number of
+    processors. Passes flagged as outliers are left out.
 
     Parameters
     ----------
-    df      :   pandas.DataFrame    
+    df      :   pandas.DataFrame
         DataFrame containing log data - usually read from csv produced by reader
+    mapping :   dict, optional
+        Category of each phase, see phase_categories.
 
     Returns
     -------
-    df_r    :   pandas.DataFrame    
-        Reduced data frame with only averaged "Reading", "Computing" and "Writing" categories
+    pandas.DataFrame
+        Indexed by "Number of processors", one column per category.
 
     Raises
     ------
@@ -91,20 +408,258 @@ def reduce_df(df):
         If df is not a pandas DataFrame.
     """
 
+    df = drop_outliers(df)
+    _phases = phase_columns(df)
+    _means = df[_phases + ["Number of processors"]].groupby("Number of processors").mean()
+    return category_breakdown_from_means(_means, mapping)
+
+
+def category_breakdown_from_means(means, mapping=None):
+    """
+    Average time per category and variation from the average time per
+    phase and variation, e.g. as maintained incrementally by the pipeline.
+
+    Parameters
+    ----------
+    means   :   pandas.DataFrame
+        Indexed by "Number of processors", one column per phase.
+    mapping :   dict, optional
+        Category of each phase, see phase_categories.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Indexed by "Number of processors", one column per category.
+    """
+
+    return _sum_categories(means, list(means.columns), mapping)
+
+
+def bottleneck_table(breakdown):
+    """
+    Flags the variations where the dominant bottleneck changes, i.e. where
+    another category than for the previous variation takes the largest share
+    of the time.
+
+    Parameters
+    ----------
+    breakdown   :   pandas.DataFrame
+        Time per category and variation, see category_breakdown.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Indexed by variation, in increasing order, with the "<category>
+        share" of every category, the "Dominant" category and "Shift", True
+        where the dominant category differs from the previous variation.
+        Variations whose categories sum up to zero have NaN shares and no
+        dominant category.
+    """
+
+    _breakdown = breakdown.sort_index()
+    # Variations without any time have no shares and no dominant category
+    _total = _breakdown.sum(axis=1)
+    _shares = _breakdown.div(_total.where(_total > 0), axis=0)
+
+    _table = _shares.add_suffix(" share")
+    _table["Dominant"] = None
+    _valid = _shares.notnull().any(axis=1)
+    if _valid.any():
+        _table.loc[_valid, "Dominant"] = _shares[_valid].idxmax(axis=1)
+    _previous = _table["Dominant"].shift()
+    _table["Shift"] = (
+        _previous.notnull() & _table["Dominant"].notnull() & (_table["Dominant"] != _previous)
+    )
+    return _table
+
+
+def breakdown_plot_jobs(df, path, ext, style=None, mapping=None):
+    """
+    Builds the render jobs of breakdown_plot. See breakdown_plot for the
+    description of the parameters.
+
+    Returns
+    -------
+    list
+        List of (function, kwargs) tuples to be passed to render_figures.
+    """
+
     if not isinstance(df, pd.DataFrame):
         raise TypeError(
             "df must be an pandas DataFrame"
         )
-    else:
-        df_r = df.iloc[:, 1:8]
-        col_n = df_r.columns.str.split()
-        col_r = [item[0] for item in col_n]
-        df_r.columns = [col_r]
-        df_r = df_r.groupby(level=0, axis=1).sum().mean()
-        return df_r
 
+    check_plot_output(path, ext)
+
+    return breakdown_plot_jobs_from_breakdown(
+        category_breakdown(df, mapping), path, ext, style=style
+    )
+
+
+def breakdown_plot_jobs_from_breakdown(breakdown, path, ext, style=None):
+    """
+    Builds the render jobs of breakdown_plot from the time per category and
+    variation, as returned by category_breakdown.
+
+    Returns
+    -------
+    list
+        List of (function, kwargs) tuples to be passed to render_figures.
+    """
+
+    check_plot_output(path, ext)
+
+    _breakdown = breakdown.sort_index()
+    _shares = _breakdown.div(_breakdown.sum(axis=1), axis=0) * 100.0
+    _jobs = []
+    for (_name, _title, _data, _ylabel) in (
+        ("breakdown", "Average time per category", _breakdown, "Time [s]"),
+        ("breakdown_share", "Share of time per category", _shares, "Share [%]"),
+    ):
+        _jobs.append(
+            (
+                _render_stackedbar,
+                {
+                    "filename": os.path.join(path, _name + "." + ext),
+                    "title": _title,
+                    "x": list(_data.index),
+                    "labels": list(_data.columns),
+                    "values": [_data[_col].values for _col in _data.columns],
+                    "ylabel": _ylabel,
+                    "style": style,
+                },
+            )
+        )
+    return _jobs
+
+
+def breakdown_plot(df, path, ext, style=None, mapping=None, nprocs=None):
+    """
+    Reads log data in pandas DataFrame format and creates two stacked bar
+    charts with one bar per number of processors: the average time per
+    category ("breakdown") and its share of the total time
+    ("breakdown_share"), showing how the bottleneck shifts with the number
+    of processors.
+
+    Parameters
+    ----------
+    df      :   pandas.DataFrame
+        DataFrame containing log data - usually read from csv produced by reader
+    path    :   string
+        Path for output plots
+    ext     :   string
+        Image extension to define the format ("png","pdf","svg"...)
+    style   :   string, optional
+        Matplotlib style to render the plots with.
+    mapping :   dict, optional
+        Category of each phase, see phase_categories.
+    nprocs  :   int, optional
+        Maximum number of processes to render with. Defaults to the number
+        of CPUs.
+
+    Returns
+    -------
+    Nothing
+
+    Raises
+    ------
+    TypeError
+        If df is not a pandas DataFrame.
+        If path is not a string
+        If ext is not a string
+    ValueError
+        If ext is not a supported extension for an image format.
+    FileNotFoundError
+        If path does not exist.
+    """
+
+    render_figures(
+        breakdown_plot_jobs(df, path, ext, style=style, mapping=mapping), nprocs=nprocs
+    )
+
+
+def piechart_plot_jobs(df, path, ext, style=None, mapping=None):
+    """
+    Builds the render job of piechart_plot. See piechart_plot for the
+    description of the parameters.
+
+    Returns
+    -------
+    list
+        List of (function, kwargs) tuples to be passed to render_figures.
+    """
 
-def piechart_plot(df, path, ext):
+    df_r = reduce_df(drop_outliers(df), mapping)
+
+    return piechart_plot_jobs_from_reduced(
+        df_r, path, ext, style=style, title=piechart_title(df)
+    )
+
+
+def piechart_title(df):
+    """
+    Title of the pie chart of a reader database, naming the number of
+    snapshots if all runs processed the same number.
+
+    Returns
+    -------
+    string or None
+        None if the number of snapshots is not known or not unique.
+    """
+
+    if "Number of snapshots" not in df.columns:
+        return None
+    return snapshots_title(df["Number of snapshots"].dropna().unique())
+
+
+def snapshots_title(snapshots):
+    """
+    Title of the pie chart given the distinct numbers of snapshots processed
+    by the runs, see piechart_title.
+
+    Returns
+    -------
+    string or None
+        None unless there is exactly one number of snapshots.
+    """
+
+    if len(snapshots) != 1:
+        return None
+    return "Average time distribution for {0:d} snapshots".format(int(list(snapshots)[0]))
+
+
+def piechart_plot_jobs_from_reduced(df_r, path, ext, style=None, title=None):
+    """
+    Builds the render job of piechart_plot from the averaged time per
+    category, as returned by reduce_df. The largest category is exploded.
+    The title defaults to "Average time distribution".
+
+    Returns
+    -------
+    list
+        List of (function, kwargs) tuples to be passed to render_figures.
+    """
+
+    check_plot_output(path, ext)
+
+    # Pie chart, where the slices will be ordered and plotted counter-clockwise:
+    return [
+        (
+            _render_piechart,
+            {
+                "filename": os.path.join(path, "piechart." + ext),
+                "title": title or "Average time distribution",
+                "labels": list(df_r.index),
+                "sizes": df_r.values,
+                # only "explode" the largest slice
+                "explode": [0.1 if _i == np.argmax(df_r.values) else 0 for _i in range(len(df_r))],
+                "style": style,
+            },
+        )
+    ]
+
+
+def piechart_plot(df, path, ext, style=None, nprocs=None, mapping=None):
     """
     Reads log data in pandas DataFrame format and creates piechart plot for 
     the averaged 3DPOD data at a given directory with a given extension
@@ -117,6 +672,13 @@ def piechart_plot(df, path, ext):
         Path for output plots
     ext     :   string
         Image extension to define the format ("png","pdf","svg"...)
+    style   :   string, optional
+        Matplotlib style to render the plot with.
+    nprocs  :   int, optional
+        Maximum number of processes to render with. Defaults to the number
+        of CPUs.
+    mapping :   dict, optional
+        Category of each phase, see phase_categories.
 
     Returns
     -------
@@ -134,23 +696,6 @@ def piechart_plot(df, path, ext):
         If path does not exist.
     """
 
-    df_r = reduce_df(df)
-
-    # Pie chart, where the slices will be ordered and plotted counter-clockwise:
-    labels = df_r.index
-    sizes = df_r
-    explode = (0.1, 0, 0)  # only "explode" the 2nd slice
-
-    fig1, ax1 = plt.subplots()
-    ax1.pie(
-        sizes,
-        explode=explode,
-        labels=labels,
-        autopct="%1.1f%%",
-        shadow=True,
-        startangle=90,
+    render_figures(
+        piechart_plot_jobs(df, path, ext, style=style, mapping=mapping), nprocs=nprocs
     )
-    # Equal aspect ratio ensures that pie is drawn as a circle.
-    ax1.axis("equal")
-    plt.title("Average time distribution for 3DPOD of 200 snapshots")
-    plt.savefig(os.path.join(path, "piechart." + ext), bbox_inches="tight")
@@ -0,0 +1,292 @@
+import numpy as np
+import pandas as pd
+from parstud.reader.reader import phase_columns
+from parstud.reader.reader import drop_outliers
+from parstud.plotter.plotter import error_plot_jobs_from_statistics
+from parstud.plotter.plotter import piechart_plot_jobs_from_reduced
+from parstud.plotter.plotter import breakdown_plot_jobs_from_breakdown
+from parstud.plotter.plotter import phase_categories
+from parstud.plotter.plotter import snapshots_title
+
+
+class RunningMoments:
+    """
+    Count, mean and variance of a stream of values, updated chunk by chunk
+    and mergeable with the moments of other streams (Chan et al.).
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, values):
+        """
+        Adds an array of values to the stream.
+        """
+
+        _values = np.asarray(values, dtype=float)
+        if _values.size == 0:
+            return
+        _other = RunningMoments()
+        _other.count = _values.size
+        _other.mean = float(_values.mean())
+        _other.m2 = float(((_values - _other.mean) ** 2).sum())
+        self.merge(_other)
+
+    def merge(self, other):
+        """
+        Merges the moments of another stream into this one.
+        """
+
+        _count = self.count + other.count
+        if _count == 0:
+            return
+        _delta = other.mean - self.mean
+        self.mean = self.mean + _delta * other.count / _count
+        self.m2 = self.m2 + other.m2 + _delta ** 2 * self.count * other.count / _count
+        self.count = _count
+
+    @property
+    def variance(self):
+        """
+        Sample variance (ddof=1), NaN for less than two values.
+        """
+
+        if self.count < 2:
+            return float("nan")
+        return self.m2 / (self.count - 1)
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch in the spirit of the merging t-digest.
+
+    Values are kept as centroids (mean, weight). As long as the number of
+    values does not exceed twice the compression, every value is its own
+    centroid and the quantiles are exact, computed with linear interpolation
+    like pandas.DataFrame.quantile. Beyond that, neighbouring centroids are
+    merged, keeping small centroids near the tails where the quantiles of
+    interest for error bars lie.
+    """
+
+    def __init__(self, compression=100):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+
+    @property
+    def count(self):
+        return float(self.weights.sum())
+
+    def update(self, values):
+        """
+        Adds an array of values to the sketch.
+        """
+
+        _values = np.asarray(values, dtype=float)
+        self._add(_values, np.ones(_values.size))
+
+    def merge(self, other):
+        """
+        Merges another sketch into this one.
+        """
+
+        self._add(other.means, other.weights)
+
+    def _add(self, means, weights):
+        self.means = np.concatenate([self.means, means])
+        self.weights = np.concatenate([self.weights, weights])
+        _order = np.argsort(self.means, kind="mergesort")
+        self.means = self.means[_order]
+        self.weights = self.weights[_order]
+        if self.means.size > 2 * self.compression:
+            self._compress()
+
+    def _compress(self):
+        _total = self.weights.sum()
+        _means = [self.means[0]]
+        _weights = [self.weights[0]]
+        _cumulative = 0.0
+        for _mean, _weight in zip(self.means[1:], self.weights[1:]):
+            # Size limit of a centroid around quantile q: 4 N q (1 - q) / delta
+            _q = (_cumulative + (_weights[-1] + _weight) / 2.0) / _total
+            _limit = max(1.0, 4.0 * _total * _q * (1.0 - _q) / self.compression)
+            if _weights[-1] + _weight <= _limit:
+                _merged = _weights[-1] + _weight
+                _means[-1] = _means[-1] + (_mean - _means[-1]) * _weight / _merged
+                _weights[-1] = _merged
+            else:
+                _cumulative = _cumulative + _weights[-1]
+                _means.append(_mean)
+                _weights.append(_weight)
+        self.means = np.array(_means)
+        self.weights = np.array(_weights)
+
+    def quantile(self, q):
+        """
+        Returns the (approximate) q quantile, NaN if the sketch is empty.
+        """
+
+        if self.means.size == 0:
+            return float("nan")
+
+        # Rank of the centre of each centroid; with unit weights these are
+        # 0, 1, ..., n - 1 and the interpolation below is exact.
+        _centres = np.cumsum(self.weights) - (self.weights + 1.0) / 2.0
+        _rank = q * (self.count - 1.0)
+        return float(np.interp(_rank, _centres, self.means))
+
+
+def stream_statistics(csvfile, chunksize=100000, quantiles=(0.025, 0.975)):
+    """
+    Computes per variation statistics of every phase of a reader CSV file
+    without loading it in memory, reading it chunk by chunk.
+
+    Parameters
+    ----------
+    csvfile     :   string
+        CSV file produced by the 'read' subcommand.
+    chunksize   :   int, optional
+        Number of rows read at once. Default is 100000.
+    quantiles   :   list or tuple, optional
+        Quantiles to estimate. Default is (0.025, 0.975).
+
+    Returns
+    -------
+    dict
+        With "count", "mean" and "var" DataFrames and one DataFrame per
+        quantile, all indexed by "Number of processors" with one column per
+        phase. The "overall" entry holds the mean of each phase over all rows
+        and "snapshots" the sorted distinct numbers of snapshots of the runs.
+
+    Raises
+    ------
+    FileNotFoundError
+        If csvfile does not exist.
+    """
+
+    _moments = {}
+    _sketches = {}
+    _overall = {}
+    _snapshots = set()
+    _phases = None
+
+    for _chunk in pd.read_csv(csvfile, chunksize=chunksize):
+        if _phases is None:
+            _phases = phase_columns(_chunk)
+        if "Number of snapshots" in _chunk.columns:
+            _snapshots.update(_chunk["Number of snapshots"].dropna().unique())
+
+        _chunk = drop_outliers(_chunk)
+        for _variation, _group in _chunk.groupby("Number of processors"):
+            for _phase in _phases:
+                _values = _group[_phase].dropna().values
+                _key = (_variation, _phase)
+                _moments.setdefault(_key, RunningMoments()).update(_values)
+                _sketches.setdefault(_key, QuantileSketch()).update(_values)
+                _overall.setdefault(_phase, RunningMoments()).update(_values)
+
+    _variations = sorted({_variation for (_variation, _) in _moments})
+
+    def _table(func):
+        return pd.DataFrame(
+            [[func(_variation, _phase) for _phase in _phases] for _variation in _variations],
+            index=pd.Index(_variations, name="Number of processors"),
+            columns=_phases,
+        )
+
+    _stats = {
+        "count": _table(lambda v, p: _moments[(v, p)].count),
+        "mean": _table(lambda v, p: _moments[(v, p)].mean if _moments[(v, p)].count else np.nan),
+        "var": _table(lambda v, p: _moments[(v, p)].variance),
+        "overall": pd.Series({_phase: _overall[_phase].mean for _phase in _phases}),
+        "snapshots": sorted(_snapshots),
+    }
+    for _q in quantiles:
+        _stats[_q] = _table(lambda v, p: _sketches[(v, p)].quantile(_q))
+    return _stats
+
+
+def statistics_breakdown(stats, mapping=None):
+    """
+    Time per category and variation, see plotter.category_breakdown, from
+    the statistics computed by stream_statistics.
+    """
+
+    _categories = phase_categories(stats["mean"].columns, mapping)
+    return stats["mean"].T.groupby(_categories, sort=False).sum().T
+
+
+def statistics_plot_jobs(stats, path, ext, style=None, mapping=None):
+    """
+    Builds the render jobs of error_plot, piechart_plot and breakdown_plot
+    from the statistics computed by stream_statistics. For inputs small
+    enough for the quantile sketches to stay exact, the figures are the same
+    as the ones built from the whole DataFrame.
+
+    Parameters
+    ----------
+    stats       :   dict
+        Statistics returned by stream_statistics, with the 0.025 and 0.975
+        quantiles.
+    path        :   string
+        Path for output plots
+    ext         :   string
+        Image extension to define the format ("png","pdf","svg"...)
+    style       :   string, optional
+        Matplotlib style to render the plots with.
+    mapping     :   dict, optional
+        Category of each phase, see plotter.phase_categories.
+
+    Returns
+    -------
+    list
+        List of (function, kwargs) tuples to be passed to render_figures.
+    """
+
+    _jobs = error_plot_jobs_from_statistics(
+        stats["mean"], stats[0.025], stats[0.975], path, ext, style=style
+    )
+
+    # Same reduction as reduce_df: sum the phases by category
+    _overall = stats["overall"]
+    df_r = _overall.groupby(phase_categories(_overall.index, mapping), sort=False).sum()
+    _jobs += piechart_plot_jobs_from_reduced(
+        df_r, path, ext, style=style, title=snapshots_title(stats.get("snapshots", ()))
+    )
+
+    _jobs += breakdown_plot_jobs_from_breakdown(
+        statistics_breakdown(stats, mapping), path, ext, style=style
+    )
+    return _jobs
+
+
+def stream_plot_jobs(csvfile, path, ext, style=None, chunksize=100000, mapping=None):
+    """
+    Builds the render jobs of error_plot, piechart_plot and breakdown_plot
+    for a reader CSV file read chunk by chunk, see statistics_plot_jobs.
+
+    Parameters
+    ----------
+    csvfile     :   string
+        CSV file produced by the 'read' subcommand.
+    path        :   string
+        Path for output plots
+    ext         :   string
+        Image extension to define the format ("png","pdf","svg"...)
+    style       :   string, optional
+        Matplotlib style to render the plots with.
+    chunksize   :   int, optional
+        Number of rows read at once. Default is 100000.
+    mapping     :   dict, optional
+        Category of each phase, see plotter.phase_categories.
+
+    Returns
+    -------
+    list
+        List of (function, kwargs) tuples to be passed to render_figures.
+    """
+
+    _stats = stream_statistics(csvfile, chunksize=chunksize, quantiles=(0.025, 0.975))
+    return statistics_plot_jobs(_stats, path, ext, style=style, mapping=mapping)
@@ -1,10 +1,25 @@
 import pandas as pd
+from parstud.runner.storage import read_output
+
+# Command line flags of the parallel-pod code declaring the problem size,
+# and the reader database columns they are stored in.
+POD_PARAMETERS = {
+    "-p": "Number of points",
+    "-v": "Number of variables",
+    "-s": "Number of snapshots",
+    "-nm": "Number of modes",
+}
+
+# Size in bytes of one value read or written by the parallel-pod code.
+POD_BYTES_PER_VALUE = 8
 
 
 def read_log(dir, flag_is_time):
     """
     Reads log file at given directory and extracts either funtion 
-    as string list or time as float list.
+    as string list or time as float list. Compressed logs and logs packed
+    into the archive of a study directory are read directly, see
+    runner.storage.read_output.
 
     Parameters
     ----------
@@ -36,18 +51,16 @@ def read_log(dir, flag_is_time):
     else:
         if flag_is_time == 1:
             str_t = "Done in "
-            with open(dir, "r") as reader:
-                for line in reader:
-                    if str_t in line:
-                        return_list.append(
-                            float(line[line.find(str_t) + len(str_t): -3]))
+            for line in read_output(dir).splitlines(keepends=True):
+                if str_t in line:
+                    return_list.append(
+                        float(line[line.find(str_t) + len(str_t): -3]))
             return return_list
         elif flag_is_time == 0:
             str_f = "..."
-            with open(dir, "r") as reader:
-                for line in reader:
-                    if str_f in line:
-                        return_list.append(line[0: line.find(str_f)])
+            for line in read_output(dir).splitlines(keepends=True):
+                if str_f in line:
+                    return_list.append(line[0: line.find(str_f)])
             return return_list
         else:
             raise ValueError(
@@ -78,18 +91,408 @@ def build_database(path, name):
     """
 
     info = pd.read_csv(path + name)
+    return database_from_info(path, info)
+
+
+def database_from_info(path, info):
+    """
+    Returns database as dataFrame based on 3DPOD log files listed in an
+    already loaded run info table. Used by build_database, and to read
+    single runs as soon as they finish.
+
+    Parameters
+    ----------
+    path    :   string
+        Path to log files
+    info    :   pandas.DataFrame
+        Run info table (or a subset of its rows) as written by the runner.
+
+    Returns
+    -------
+    pandas.DataFrame
+        With time and function data for all log files.
+
+    Raises
+    ------
+    FileNotFoundError
+        If a log file does not exist.
+    """
 
     nproc = info.command.str.split().str[-1]  # Number of processors
     fname = info.stdout_file  # File names
     npass = info.pass_no  # Pass number
 
-    funcs = read_log(path + fname[1], 0)
+    funcs = read_log(path + fname.iloc[0], 0)
     times = []
 
-    for i in range(len(info.index)):
-        times.append(read_log(path + fname[i], 1))
+    for f in fname:
+        times.append(read_log(path + f, 1))
 
     df = pd.DataFrame(data=times, columns=funcs, index=fname)
     df["Number of processors"] = nproc.values
     df["Pass number"] = npass.values
+
+    # Problem size declared on the command lines
+    params = pd.DataFrame(
+        [read_command_parameters(cmd) for cmd in info.command], index=fname
+    )
+    for col in params.columns:
+        df[col] = params[col].values
+
+    # Reports of the profiling tools the commands were wrapped in
+    if "wrapper_file" in info.columns:
+        reports = []
+        for wrapper, wfile in zip(info.wrapper, info.wrapper_file):
+            if isinstance(wfile, str) and wrapper in WRAPPER_PARSERS:
+                reports.append(read_wrapper_output(path + wfile, wrapper))
+            else:
+                reports.append({})
+        reports = pd.DataFrame(reports, index=fname)
+        for col in reports.columns:
+            df[col] = reports[col].values
+
+    # Passes flagged as outliers by the runner are kept, but marked
+    if "outlier" in info.columns:
+        df["outlier"] = info.outlier.fillna(False).astype(bool).values
+
+    return derive_throughput(df)
+
+
+def drop_outliers(df):
+    """
+    Returns the rows of a database produced by build_database (or read back
+    from its CSV output) which were not flagged as outliers by the runner.
+
+    Parameters
+    ----------
+    df      :   pandas.DataFrame
+        DataFrame containing log data - usually read from csv produced by reader
+
+    Returns
+    -------
+    pandas.DataFrame
+        df itself if it has no "outlier" column.
+
+    Raises
+    ------
+    TypeError
+        If df is not a pandas DataFrame.
+    """
+
+    if not isinstance(df, pd.DataFrame):
+        raise TypeError("df must be an pandas DataFrame")
+
+    if "outlier" not in df.columns:
+        return df
+    return df[~df["outlier"].fillna(False).astype(bool)]
+
+
+def phase_columns(df):
+    """
+    Returns the names of the columns holding phase timings in a database
+    produced by build_database (or read back from its CSV output).
+
+    Phase columns are the ones written by build_database before the
+    "Number of processors" column, excluding the log file name.
+
+    Parameters
+    ----------
+    df      :   pandas.DataFrame
+        DataFrame containing log data - usually read from csv produced by reader
+
+    Returns
+    -------
+    list
+        Phase column names in log order.
+
+    Raises
+    ------
+    TypeError
+        If df is not a pandas DataFrame.
+    KeyError
+        If df has no "Number of processors" column.
+    """
+
+    if not isinstance(df, pd.DataFrame):
+        raise TypeError("df must be an pandas DataFrame")
+
+    columns = list(df.columns)
+    last = columns.index("Number of processors")
+    return [col for col in columns[:last] if col != "stdout_file"]
+
+
+def read_command_parameters(command, parameters=None):
+    """
+    Extracts the declared problem size from a command line.
+
+    Parameters
+    ----------
+    command     :   string
+        Command line as stored in the run info csv file.
+    parameters  :   dict, optional
+        Mapping of command line flags to parameter names. Defaults to
+        POD_PARAMETERS.
+
+    Returns
+    -------
+    dict
+        Parameter names and their numerical values, for the flags found in
+        command and followed by a number.
+
+    Raises
+    ------
+    TypeError
+        If command is not a string.
+
+    Example
+    -------
+    >>> read_command_parameters("3DPOD_U.out -p 381600 -v 3 -nm 20 -s 200")
+    {'Number of points': 381600, 'Number of variables': 3, 'Number of modes': 20, 'Number of snapshots': 200}
+    """
+
+    if not isinstance(command, str):
+        raise TypeError("command must be a string")
+
+    if parameters is None:
+        parameters = POD_PARAMETERS
+
+    values = {}
+    tokens = command.split()
+    for flag, value in zip(tokens[:-1], tokens[1:]):
+        if flag not in parameters:
+            continue
+        try:
+            values[parameters[flag]] = int(value)
+        except ValueError:
+            try:
+                values[parameters[flag]] = float(value)
+            except ValueError:
+                continue
+    return values
+
+
+def derive_throughput(df, bytes_per_value=POD_BYTES_PER_VALUE):
+    """
+    Adds throughput columns derived from the declared problem size to a
+    database produced by build_database:
+
+    - "Reading files [MB/s]": points x variables x snapshots values read.
+    - "Writing POD modes [MB/s]": points x variables x modes values written.
+    - "<phase> [points x snapshots/s]" for every "Computing" phase.
+
+    Columns whose phase or size parameters are missing are skipped.
+
+    Parameters
+    ----------
+    df              :   pandas.DataFrame
+        DataFrame containing log data and problem size parameters.
+    bytes_per_value :   int, optional
+        Size in bytes of one value. Default is POD_BYTES_PER_VALUE.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Copy of df with the throughput columns appended.
+
+    Raises
+    ------
+    TypeError
+        If df is not a pandas DataFrame.
+    """
+
+    if not isinstance(df, pd.DataFrame):
+        raise TypeError("df must be an pandas DataFrame")
+
+    df = df.copy()
+    points = "Number of points"
+    variables = "Number of variables"
+
+    # Megabytes moved per I/O phase
+    io_phases = {
+        "Reading files": "Number of snapshots",
+        "Writing POD modes": "Number of modes",
+    }
+    for phase, count in io_phases.items():
+        if not {phase, points, variables, count}.issubset(df.columns):
+            continue
+        size = df[points] * df[variables] * df[count] * bytes_per_value / 1e6
+        df[phase + " [MB/s]"] = size / df[phase]
+
+    # Points times snapshots processed per compute phase
+    if {points, "Number of snapshots"}.issubset(df.columns):
+        work = df[points] * df["Number of snapshots"]
+        for phase in phase_columns(df):
+            if phase.startswith("Computing"):
+                df[phase + " [points x snapshots/s]"] = work / df[phase]
+
     return df
+
+
+def _to_number(value):
+    """
+    Converts a string to int or float if possible, otherwise returns it
+    unchanged.
+    """
+
+    for convert in (int, float):
+        try:
+            return convert(value)
+        except ValueError:
+            pass
+    return value
+
+
+def parse_time_output(text):
+    """
+    Parses the report written by GNU time in verbose mode (/usr/bin/time -v).
+
+    Parameters
+    ----------
+    text    :   string
+        Contents of the report.
+
+    Returns
+    -------
+    dict
+        "time: <field>" columns. Percentages are converted to numbers and
+        the elapsed wall clock time to seconds.
+    """
+
+    values = {}
+    for line in text.splitlines():
+        if ": " not in line:
+            continue
+        key, value = [item.strip() for item in line.rsplit(": ", 1)]
+        if key == "Command being timed":
+            continue
+
+        if key.startswith("Elapsed (wall clock) time"):
+            key = "Elapsed (wall clock) time (seconds)"
+            seconds = 0.0
+            for part in value.split(":"):
+                seconds = seconds * 60 + float(part)
+            value = seconds
+        elif value.endswith("%"):
+            value = _to_number(value[:-1])
+        else:
+            value = _to_number(value)
+        values["time: " + key] = value
+    return values
+
+
+def parse_perf_output(text):
+    """
+    Parses the report written by perf stat in CSV mode (perf stat -x ,).
+
+    Parameters
+    ----------
+    text    :   string
+        Contents of the report.
+
+    Returns
+    -------
+    dict
+        "perf: <event>" columns, with the unit appended in brackets if any.
+        Events that were not counted or are not supported are NaN.
+    """
+
+    values = {}
+    for line in text.splitlines():
+        if not line.strip() or line.startswith("#"):
+            continue
+        fields = line.split(",")
+        if len(fields) < 3:
+            continue
+        value, unit, event = fields[0], fields[1], fields[2]
+
+        key = "perf: " + event
+        if unit:
+            key = key + " [" + unit + "]"
+        try:
+            values[key] = float(value)
+        except ValueError:
+            values[key] = float("nan")
+    return values
+
+
+def parse_strace_output(text):
+    """
+    Parses the syscall summary table written by strace -c.
+
+    Parameters
+    ----------
+    text    :   string
+        Contents of the report.
+
+    Returns
+    -------
+    dict
+        "strace: <syscall> seconds", "strace: <syscall> calls" and
+        "strace: <syscall> errors" columns, including the "total" row.
+    """
+
+    lines = text.splitlines()
+    rules = [i for i, line in enumerate(lines) if line.startswith("------")]
+    if not rules:
+        return {}
+
+    # The columns are fixed width, delimited by the dashed rule below the
+    # header: % time, seconds, usecs/call, calls, errors, syscall.
+    spans = []
+    start = 0
+    for dashes in lines[rules[0]].split(" "):
+        if dashes:
+            spans.append((start, start + len(dashes)))
+        start = start + len(dashes) + 1
+    spans[-1] = (spans[-1][0], None)
+
+    values = {}
+    for i, line in enumerate(lines[rules[0] + 1 :], start=rules[0] + 1):
+        if i in rules or not line.strip():
+            continue
+        fields = [line[begin:end].strip() for (begin, end) in spans]
+        syscall = fields[-1]
+        values["strace: " + syscall + " seconds"] = float(fields[1])
+        values["strace: " + syscall + " calls"] = int(fields[3] or 0)
+        values["strace: " + syscall + " errors"] = int(fields[4] or 0)
+    return values
+
+
+# Parsers of the reports written by the profiling tools of
+# runner.WRAPPERS, by wrapper name.
+WRAPPER_PARSERS = {
+    "time": parse_time_output,
+    "perf": parse_perf_output,
+    "strace": parse_strace_output,
+}
+
+
+def read_wrapper_output(dir, wrapper):
+    """
+    Reads the report of a profiling tool a command was wrapped in. Compressed
+    reports and reports packed into an archive are read transparently.
+
+    Parameters
+    ----------
+    dir     :   string
+        Path to the report file including its name.
+    wrapper :   string
+        Name of the wrapper, a key of WRAPPER_PARSERS.
+
+    Returns
+    -------
+    dict
+        Typed columns extracted from the report.
+
+    Raises
+    ------
+    ValueError
+        If there is no parser for wrapper.
+    FileNotFoundError
+        If dir does not exist.
+    """
+
+    if wrapper not in WRAPPER_PARSERS:
+        raise ValueError("No parser for wrapper '{0!s}'".format(wrapper))
+
+    return WRAPPER_PARSERS[wrapper](read_output(dir))
@@ -0,0 +1,162 @@
+import os
+import numpy as np
+import pandas
+from parstud.reader.reader import read_log
+
+# Scale making the median absolute deviation a consistent estimator of the
+# standard deviation of normally distributed values.
+MAD_SCALE = 1.4826
+
+# Modified z-score above which a value is considered an outlier, as
+# recommended by Iglewicz and Hoaglin.
+OUTLIER_THRESHOLD = 3.5
+
+# Minimum distance to the median, in seconds and relative to the median, for
+# a value to be an outlier. Phases of a few milliseconds have a tiny MAD, so
+# that the jitter of the timer alone would give large modified z-scores.
+MIN_DEVIATION = 1e-3
+MIN_RELATIVE_DEVIATION = 0.05
+
+# Minimum number of successful passes needed to judge a variation
+MIN_PASSES = 3
+
+
+def robust_outliers(
+    values,
+    threshold=OUTLIER_THRESHOLD,
+    min_deviation=MIN_DEVIATION,
+    min_relative=MIN_RELATIVE_DEVIATION,
+):
+    """
+    Flags the outliers of a sample by their modified z-score, i.e. their
+    distance to the median in units of the scaled median absolute deviation.
+    Unlike the mean and standard deviation, both are not skewed by the
+    outliers themselves. A value is only flagged if its distance to the
+    median also exceeds min_deviation and min_relative times the median.
+
+    Parameters
+    ----------
+    values : array_like
+        the sample, NaN values are never flagged.
+
+    threshold : float, optional
+        modified z-score above which a value is an outlier.
+
+    min_deviation : float, optional
+        minimum distance to the median of an outlier, in the unit of values.
+
+    min_relative : float, optional
+        minimum distance to the median of an outlier, relative to the median.
+
+    Returns
+    -------
+    numpy.ndarray
+        Boolean array, True for the outliers. If more than half of the values
+        are identical, the MAD is zero and no value is flagged.
+
+    Example
+    -------
+    >>> robust_outliers([1.0, 1.1, 0.9, 1.0, 5.0])
+    array([False, False, False, False,  True])
+    """
+
+    _values = np.asarray(values, dtype=float)
+    _flags = np.zeros(_values.shape, dtype=bool)
+    _valid = np.isfinite(_values)
+    if not _valid.any():
+        return _flags
+
+    _median = np.median(_values[_valid])
+    _mad = MAD_SCALE * np.median(np.abs(_values[_valid] - _median))
+    if _mad == 0.0:
+        return _flags
+
+    _deviation = np.abs(_values[_valid] - _median)
+    _floor = max(min_deviation, min_relative * abs(_median))
+    _flags[_valid] = (_deviation / _mad > threshold) & (_deviation > _floor)
+    return _flags
+
+
+def pass_times(dbpath, rundb, indices):
+    """
+    Collects the times of the given runs. If the command outputs are
+    parallel-pod style logs, these are the time of every phase and their
+    'total', otherwise the 'elapsed_time' measured by the runner, which
+    includes the start-up of the process.
+
+    Parameters
+    ----------
+    dbpath : string
+        path to the study directory.
+
+    rundb : pandas.DataFrame
+        the run database.
+
+    indices : list
+        indices of the runs in rundb.
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per run and one column per time.
+    """
+
+    _rows = {}
+    for _index in indices:
+        _output = os.path.join(dbpath, rundb.at[_index, "stdout_file"])
+        try:
+            _row = dict(zip(read_log(_output, 0), read_log(_output, 1)))
+        except (OSError, ValueError):
+            _row = {}
+        if _row:
+            _row["total"] = sum(_row.values())
+        else:
+            # Not a log of the POD code, judge the run by its duration only
+            _row["elapsed_time"] = rundb.at[_index, "elapsed_time"]
+        _rows[_index] = _row
+    return pandas.DataFrame.from_dict(_rows, orient="index")
+
+
+def flag_outliers(dbpath, rundb, command, threshold=OUTLIER_THRESHOLD):
+    """
+    Judges the successful passes of a command against each other and marks
+    the ones whose total or per phase time is an outlier, see
+    `robust_outliers`, in the 'outlier' column of the run database. Rows are
+    never removed.
+
+    Parameters
+    ----------
+    dbpath : string
+        path to the study directory.
+
+    rundb : pandas.DataFrame
+        the run database, updated in place.
+
+    command : string
+        the command whose passes are judged.
+
+    threshold : float, optional
+        modified z-score above which a time is an outlier.
+
+    Returns
+    -------
+    list
+        Indices of the passes flagged as outliers.
+    """
+
+    _mask = (rundb["command"] == command) & (rundb["exit_status"] == 0)
+    _indices = list(rundb.index[_mask])
+    if "outlier" not in rundb.columns:
+        rundb["outlier"] = False
+    rundb["outlier"] = rundb["outlier"].fillna(False).astype(bool)
+    if len(_indices) < MIN_PASSES:
+        return []
+
+    _times = pass_times(dbpath, rundb, _indices)
+    _flags = np.zeros(len(_indices), dtype=bool)
+    for _column in _times.columns:
+        _flags |= robust_outliers(_times[_column].values, threshold=threshold)
+
+    for (_index, _flag) in zip(_indices, _flags):
+        rundb.at[_index, "outlier"] = bool(_flag)
+    return [_index for (_index, _flag) in zip(_indices, _flags) if _flag]
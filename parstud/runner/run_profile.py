@@ -1,7 +1,26 @@
 import os
+import glob
+import time
+import random
 import subprocess
+import numpy
 import pandas
 import datetime
+from parstud.runner.storage import write_output
+from parstud.runner.outliers import flag_outliers
+
+# Orders in which the runs of a study can be executed
+RUN_ORDERS = ("sequential", "roundrobin", "random")
+
+# Command line prefixes of the profiling tools a command can be wrapped in.
+# '{outfile}' is replaced by the file the tool writes its report to, so that
+# it is not mixed with the command output. New wrappers can be added here,
+# together with a parser in reader.WRAPPER_PARSERS.
+WRAPPERS = {
+    "time": ["/usr/bin/time", "-v", "-o", "{outfile}"],
+    "perf": ["perf", "stat", "-x", ",", "-o", "{outfile}"],
+    "strace": ["strace", "-c", "-f", "-o", "{outfile}"],
+}
 
 
 def is_os_compatible(osname):
@@ -120,7 +139,54 @@ def run_stuff(syscall, use_shell=False):
     return _cmd_out
 
 
-def prepare_run_database(syscalls, columnspec=False, passes_per_cmd=1):
+def wrap_command(command, wrapper, outfile):
+    """
+    Builds the argument list executing a command wrapped in a profiling tool.
+
+    Parameters
+    ----------
+    command : string
+        the command to wrap.
+
+    wrapper : string
+        name of the wrapper, a key of WRAPPERS.
+
+    outfile : string
+        file the wrapper writes its report to.
+
+    Returns
+    -------
+    list
+        The arguments to execute.
+
+    Raises
+    ------
+    ValueError
+        If the wrapper is unknown.
+
+    Example
+    -------
+    >>> wrap_command("ls -l", "time", "wrapper_0.txt")
+    ['/usr/bin/time', '-v', '-o', 'wrapper_0.txt', 'ls', '-l']
+    """
+
+    if wrapper not in WRAPPERS:
+        raise ValueError(
+            "Unknown wrapper '{0!s}', choose from {1!s}".format(wrapper, list(WRAPPERS))
+        )
+
+    _prefix = [_arg.format(outfile=outfile) for _arg in WRAPPERS[wrapper]]
+    return _prefix + command.split()
+
+
+def prepare_run_database(
+    syscalls,
+    columnspec=False,
+    passes_per_cmd=1,
+    wrapper=None,
+    order="sequential",
+    seed=None,
+):
     """
     This function can be used to populate a pandas dataFrame object with
     data to run parameteric studies on system calls. Used internally in this
@@ -137,6 +203,23 @@ def prepare_run_database(syscalls, columnspec=False, passes_per_cmd=1):
     passes_per_cmd : int, optional
         speciefier on how many times each syscall is going to be executed.
 
+    wrapper : string, optional
+        name of a profiling tool from WRAPPERS to wrap every syscall in,
+        stored in the 'wrapper' column.
+
+    order : string, optional
+        execution order of the runs, one of RUN_ORDERS:
+
+        - 'sequential': all passes of a syscall back to back (default).
+        - 'roundrobin': the first pass of every syscall, then the second...
+        - 'random': a random permutation of all runs, see seed.
+
+        Interleaving the runs avoids confounding drifts of the machine state
+        (thermal throttling, page cache, other tenants) with the variations.
+
+    seed : int, optional
+        seed of the random permutation when order='random'.
+
     Returns
     -------
     pandas.dataFrame
@@ -192,6 +275,16 @@ def prepare_run_database(syscalls, columnspec=False, passes_per_cmd=1):
     if not (isinstance(passes_per_cmd, int) or passes_per_cmd < 1):
         raise TypeError("passes_per_cmd need to be of type int and 1 or larger")
 
+    if wrapper and wrapper not in WRAPPERS:
+        raise ValueError(
+            "Unknown wrapper '{0!s}', choose from {1!s}".format(wrapper, list(WRAPPERS))
+        )
+
+    if order not in RUN_ORDERS:
+        raise ValueError(
+            "Unknown order '{0!s}', choose from {1!s}".format(order, list(RUN_ORDERS))
+        )
+
     if columnspec:
         _run_database = pandas.DataFrame(columns=columnspec)
     else:
@@ -203,12 +296,119 @@ def prepare_run_database(syscalls, columnspec=False, passes_per_cmd=1):
             _dicts.append(
                 {"command": _syscall, "pass_no": _i, "desired_passes": passes_per_cmd}
             )
+            if wrapper:
+                _dicts[-1]["wrapper"] = wrapper
+
+    # The index of the run database is the execution order
+    if order == "roundrobin":
+        _dicts.sort(key=lambda _dict: _dict["pass_no"])
+    elif order == "random":
+        random.Random(seed).shuffle(_dicts)
 
     _run_database = _run_database.append(pandas.DataFrame(_dicts), sort=True)
     return _run_database
 
 
-def execute_per_run_database(dbpath, rundb, dbfile):
+def get_cpu_frequency():
+    """
+    Returns the mean current frequency of the CPUs as reported by the Linux
+    cpufreq subsystem, in MHz.
+
+    Returns
+    -------
+    float or None
+        None if the frequency is not available.
+    """
+
+    _freqs = []
+    for _file in glob.glob("/sys/devices/system/cpu/cpu[0-9]*/cpufreq/scaling_cur_freq"):
+        try:
+            with open(_file, mode="r") as f:
+                _freqs.append(float(f.read()) / 1000.0)
+        except (OSError, ValueError):
+            continue
+
+    if not _freqs:
+        return None
+    return sum(_freqs) / len(_freqs)
+
+
+def wait_for_quiet_system(
+    max_load, freq_tolerance=0.05, interval=1.0, timeout=300.0
+):
+    """
+    Waits until the 1 minute load average of the system is at most max_load
+    and the CPU frequency has settled, i.e. changed by less than
+    freq_tolerance (relative) between two samples taken interval seconds
+    apart. The load is checked first, hence a quiet system only costs the
+    second frequency sample, and nothing if the frequency is not available.
+    Gives up after timeout seconds.
+
+    Parameters
+    ----------
+    max_load : float
+        maximum 1 minute load average.
+
+    freq_tolerance : float, optional
+        maximum relative change of the CPU frequency between two samples.
+
+    interval : float, optional
+        seconds between two samples.
+
+    timeout : float, optional
+        maximum number of seconds to wait.
+
+    Returns
+    -------
+    dict
+        With the last sampled 'load_1min' and 'cpu_freq' (MHz, None if not
+        available), the 'gate_wait' in seconds and whether the system was
+        'gate_quiet' or the wait timed out.
+    """
+
+    _start = time.monotonic()
+    _freq = get_cpu_frequency()
+    _load = os.getloadavg()[0]
+    # Settling is judged on two frequency samples, unless the frequency is
+    # not available at all
+    _settled = _freq is None
+    _quiet = True
+    while _load > max_load or not _settled:
+        _elapsed = time.monotonic() - _start
+        if _elapsed >= timeout:
+            _quiet = False
+            break
+
+        time.sleep(min(interval, timeout - _elapsed))
+        _load = os.getloadavg()[0]
+        _new_freq = get_cpu_frequency()
+        _settled = (
+            _freq is None
+            or _new_freq is None
+            or abs(_new_freq - _freq) <= freq_tolerance * _freq
+        )
+        _freq = _new_freq
+
+    return {
+        "load_1min": _load,
+        "cpu_freq": _freq,
+        "gate_wait": time.monotonic() - _start,
+        "gate_quiet": _quiet,
+    }
+
+
+def execute_per_run_database(
+    dbpath,
+    rundb,
+    dbfile,
+    callbacks=None,
+    max_load=None,
+    compression=None,
+    archive=False,
+    outlier_threshold=None,
+    max_reruns=0,
+    timeout=None,
+):
     """
     Takes a pandas dataFrame object and executes what is liste in the 'commands'
     column as system calls. Writes the command outputs to persistent storage in
@@ -216,6 +416,26 @@ def execute_per_run_database(dbpath, rundb, dbfile):
 
     A suitable run database can be generated with the `prepare_run_database`
     function.
+
+    Besides the wall-clock 'start_time' and 'end_time', the following numeric
+    columns are recorded per command, in seconds:
+
+    - 'spawn_time' and 'reap_time': monotonic timestamps (time.perf_counter)
+      taken immediately before spawning and after reaping the process.
+    - 'elapsed_time': duration of the process, reap_time - spawn_time.
+    - 'overhead_spawn': time needed to spawn the process.
+    - 'overhead_output': time needed to write the command output to file.
+    - 'overhead_database': time needed to persist the run database, i.e.
+      all writes of the database made for the command, including the one
+      after scheduling replacement passes. The final write of the database
+      is added to the last command in memory only, as its duration is known
+      after the write, hence it is part of `summarize_overhead` of the
+      returned database but not of the persisted one.
+
+    If the run database has a 'wrapper' column, commands are wrapped in the
+    given profiling tool, see `wrap_command`, and the name of the file holding
+    the report of the tool is stored in the 'wrapper_file' column. Reports
+    are compressed and/or archived like the command outputs.
     
     Parameters
     ----------
@@ -229,6 +449,41 @@ def execute_per_run_database(dbpath, rundb, dbfile):
         name of the file where the rundb dataFrame is written to 
         (located in dbpath)
 
+    callbacks : list or tuple, optional
+        functions called as callback(dbpath, rundb, index) after each
+        command has finished and the run database has been updated.
+
+    max_load : float, optional
+        if given, wait before each command until the system is quiet, see
+        `wait_for_quiet_system`, and record the outcome in the 'cpu_freq',
+        'gate_wait' and 'gate_quiet' columns. The 1 minute load average
+        before each command is always recorded in the 'load_1min' column.
+
+    compression : string, optional
+        codec to compress the command outputs with, 'gzip' or 'zstd'.
+
+    archive : boolean, optional
+        pack the command outputs into a single append-only archive with an
+        index instead of writing one file per command, see
+        `storage.write_output`.
+
+    outlier_threshold : float, optional
+        if given, the passes of a command are judged against each other once
+        they have all been attempted, and the ones whose total or per phase
+        time is an outlier are marked in the 'outlier' column, see
+        `outliers.flag_outliers`. Flagged rows are kept.
+
+    max_reruns : int, optional
+        maximum number of replacement passes per command scheduled for the
+        passes flagged as outliers. Replacement passes are appended to the
+        run database, with the index of the replaced pass in the 'rerun_of'
+        column, and judged together with the other passes. Default is 0.
+
+    timeout : float, optional
+        maximum duration of a command in seconds. Commands running longer
+        are killed and marked in the 'timed_out' column; their output up to
+        that point is kept.
+
     Returns
     -------
     Nothing
@@ -241,7 +496,11 @@ def execute_per_run_database(dbpath, rundb, dbfile):
 
     _DBFILE = os.path.join(dbpath, dbfile)
 
-    for _rundb_row in rundb.itertuples():
+    # Replacement passes are appended to the queue while it is processed
+    _queue = list(rundb.index)
+    _last = None
+    while _queue:
+        _rundb_row = next(rundb.loc[[_queue.pop(0)]].itertuples())
         # Check if command was run and reported as attempted.
         # If true, skip and check next. _rundb_row is a named tuple, hence
         # the existance of the keyword 'attempeted' is assessed by retrieveing
@@ -249,53 +508,235 @@ def execute_per_run_database(dbpath, rundb, dbfile):
         if ("attempted" in _rundb_row._fields) and (_rundb_row.attempted is True):
             continue
 
+        # Record the load of the system before the run, waiting for it to
+        # settle if requested.
+        if max_load is not None:
+            for _key, _value in wait_for_quiet_system(max_load).items():
+                rundb.at[_rundb_row.Index, _key] = _value
+        else:
+            rundb.at[_rundb_row.Index, "load_1min"] = os.getloadavg()[0]
+
         # Update the database with when command was started and print
-        # update to file.
+        # update to file. The time spent persisting the database is part of
+        # the overhead of the runner.
         rundb.at[_rundb_row.Index, "start_time"] = datetime.datetime.now().isoformat()
+        _t_db = time.perf_counter()
         rundb.to_csv(_DBFILE)
+        _overhead_db = time.perf_counter() - _t_db
+
+        # Run system command. The monotonic timestamps are taken immediately
+        # around spawning and reaping the process.
+        _cmd_out = b""
+        _args = _rundb_row.command.split()
+        if "wrapper" in _rundb_row._fields and isinstance(_rundb_row.wrapper, str):
+            _WRAPPERFILE = "wrapper_{0}.txt".format(_rundb_row.Index)
+            _args = wrap_command(
+                _rundb_row.command,
+                _rundb_row.wrapper,
+                os.path.join(dbpath, _WRAPPERFILE),
+            )
+            rundb.at[_rundb_row.Index, "wrapper_file"] = _WRAPPERFILE
 
-        # Run system command
-        _cmd_out = ""
         try:
-            # Run the command
-            _cmd_out = subprocess.check_output(
-                _rundb_row.command.split(), stderr=subprocess.STDOUT
+            _spawn = time.perf_counter()
+            _proc = subprocess.Popen(
+                _args,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
             )
-            # If no exception indicate succesful run in database
-            rundb.at[_rundb_row.Index, "exit_status"] = 0
-        except subprocess.CalledProcessError as _exc:
-            # If unsuccessful execution store the returnceode in database
-            rundb.at[_rundb_row.Index, "exit_status"] = _exc.returncode
-            # Retrieve the error output from the exception
-            _cmd_out = _exc.output
+            _spawned = time.perf_counter()
+            try:
+                _cmd_out, _ = _proc.communicate(timeout=timeout)
+                rundb.at[_rundb_row.Index, "timed_out"] = False
+            except subprocess.TimeoutExpired:
+                _proc.kill()
+                _cmd_out, _ = _proc.communicate()
+                rundb.at[_rundb_row.Index, "timed_out"] = True
+            _reap = time.perf_counter()
+
+            # Store the returncode in database, 0 being a succesful run
+            rundb.at[_rundb_row.Index, "exit_status"] = _proc.returncode
+            rundb.at[_rundb_row.Index, "spawn_time"] = _spawn
+            rundb.at[_rundb_row.Index, "reap_time"] = _reap
+            rundb.at[_rundb_row.Index, "elapsed_time"] = _reap - _spawn
+            rundb.at[_rundb_row.Index, "overhead_spawn"] = _spawned - _spawn
         except Exception as _exc:
             raise _exc
         finally:
             # Indicate that the command was attempted in database
             rundb.at[_rundb_row.Index, "attempted"] = True
-            rundb.to_csv(_DBFILE)
 
             # Write output to file
-            _CMDOUTFILE = "output_{0}.txt".format(_rundb_row.Index)
-            with open(os.path.join(dbpath, _CMDOUTFILE), mode="w") as f:
-                f.write(os.fsdecode(_cmd_out))
+            _t_out = time.perf_counter()
+            _CMDOUTFILE = write_output(
+                dbpath,
+                "output_{0}.txt".format(_rundb_row.Index),
+                _cmd_out,
+                compression=compression,
+                archive=archive,
+            )
             rundb.at[_rundb_row.Index, "stdout_file"] = _CMDOUTFILE
-            rundb.to_csv(_DBFILE)
+
+            # The report of the wrapper is written by the tool itself and
+            # stored like the command output afterwards
+            if "wrapper_file" in rundb.columns and (compression or archive):
+                _store_wrapper_report(dbpath, rundb, _rundb_row.Index, compression, archive)
+            rundb.at[_rundb_row.Index, "overhead_output"] = time.perf_counter() - _t_out
 
         # Update the database with when command ended and print
-        # update to file.
+        # update to file. The duration of this last write is only known
+        # afterwards and is persisted with the next update of the database.
         rundb.at[_rundb_row.Index, "end_time"] = datetime.datetime.now().isoformat()
+        rundb.at[_rundb_row.Index, "overhead_database"] = _overhead_db
+        _t_db = time.perf_counter()
         rundb.to_csv(_DBFILE)
+        rundb.at[_rundb_row.Index, "overhead_database"] = (
+            _overhead_db + time.perf_counter() - _t_db
+        )
+
+        # Once all passes of the command were attempted, judge them against
+        # each other and schedule replacements for the outliers.
+        if outlier_threshold is not None:
+            _queue += _schedule_reruns(
+                dbpath, rundb, _rundb_row.command, _queue, outlier_threshold, max_reruns
+            )
+            _t_db = time.perf_counter()
+            rundb.to_csv(_DBFILE)
+            rundb.at[_rundb_row.Index, "overhead_database"] += time.perf_counter() - _t_db
+
+        _last = _rundb_row.Index
+        for _callback in callbacks or ():
+            _callback(dbpath, rundb, _rundb_row.Index)
+
+    # Persist the overhead of the last update of the database
+    _t_db = time.perf_counter()
+    rundb.to_csv(_DBFILE)
+    if _last is not None:
+        rundb.at[_last, "overhead_database"] += time.perf_counter() - _t_db
 
 
-def run_and_gather_statistics(syscalls, datapath, passes_per_cmd=1, buildonly=False):
+def _store_wrapper_report(dbpath, rundb, index, compression, archive):
+    """
+    Moves the report a wrapper wrote for the command at index into storage,
+    see `storage.write_output`, and updates the 'wrapper_file' column.
+    """
+
+    _name = rundb.at[index, "wrapper_file"]
+    if not isinstance(_name, str) or not os.path.isfile(os.path.join(dbpath, _name)):
+        return
+
+    with open(os.path.join(dbpath, _name), mode="rb") as f:
+        _report = f.read()
+    rundb.at[index, "wrapper_file"] = write_output(
+        dbpath, _name, _report, compression=compression, archive=archive
+    )
+    os.remove(os.path.join(dbpath, _name))
+
+
+def _schedule_reruns(dbpath, rundb, command, queue, threshold, max_reruns):
+    """
+    Flags the outliers among the passes of command if none of them is still
+    queued, and appends one replacement pass per new outlier to rundb, up to
+    max_reruns replacements per command. Returns the indices of the
+    replacement passes.
+    """
+
+    _command_mask = rundb["command"] == command
+    if any(_command_mask[_index] for _index in queue):
+        return []
+
+    _outliers = flag_outliers(dbpath, rundb, command, threshold=threshold)
+
+    if "rerun_of" not in rundb.columns:
+        rundb["rerun_of"] = numpy.nan
+    _replaced = set(rundb.loc[_command_mask, "rerun_of"].dropna().astype(int))
+    _budget = max_reruns - len(_replaced)
+
+    _reruns = []
+    for _index in _outliers:
+        if _budget <= 0:
+            break
+        if _index in _replaced:
+            continue
+        _new = rundb.index.max() + 1
+        _pass_no = rundb.loc[_command_mask, "pass_no"].max() + 1
+        rundb.loc[_new, "command"] = command
+        rundb.loc[_new, "desired_passes"] = rundb.at[_index, "desired_passes"]
+        rundb.loc[_new, "pass_no"] = _pass_no
+        rundb.loc[_new, "rerun_of"] = _index
+        if "wrapper" in rundb.columns:
+            rundb.loc[_new, "wrapper"] = rundb.at[_index, "wrapper"]
+        _command_mask = rundb["command"] == command
+        _reruns.append(_new)
+        _budget -= 1
+    return _reruns
+
+
+def summarize_overhead(rundb):
+    """
+    Summarizes the overhead of the runner itself, i.e. the time spent
+    spawning processes, writing their output and persisting the run
+    database, as recorded by `execute_per_run_database`.
+
+    Parameters
+    ----------
+    rundb : pandas.DataFrame
+        an executed run database.
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per overhead category plus a 'total' row, with the 'mean'
+        and 'max' per run, the 'sum' over the study in seconds and the
+        'fraction' of the overhead relative to the time spent in the
+        commands themselves.
+
+    Raises
+    ------
+    TypeError
+        If the input is of wrong type.
+    KeyError
+        If rundb was not executed.
+    """
+
+    if not isinstance(rundb, pandas.DataFrame):
+        raise TypeError("rundb needs to be of type pandas.DataFrame")
+
+    _columns = ["overhead_spawn", "overhead_output", "overhead_database"]
+    _overhead = rundb[_columns].copy()
+    _overhead.columns = ["spawn", "output", "database"]
+    _overhead["total"] = _overhead.sum(axis=1)
+
+    _summary = _overhead.agg(["mean", "max", "sum"]).T
+    _summary["fraction"] = _summary["sum"] / rundb["elapsed_time"].sum()
+    return _summary
+
+
+def run_and_gather_statistics(
+    syscalls,
+    datapath,
+    passes_per_cmd=1,
+    buildonly=False,
+    callbacks=None,
+    wrapper=None,
+    order="sequential",
+    seed=None,
+    max_load=None,
+    compression=None,
+    archive=False,
+    outlier_threshold=None,
+    max_reruns=0,
+    timeout=None,
+):
     """
     Function that will configure a run database and execute the system calls of
     the database. Will store system information in the folder specified by
     datapath together with the run database.
 
     If buildonly=True, will return the generated run database as a pandas
-    DataFrame object and skip execution.
+    DataFrame object and skip execution. Otherwise the executed run database
+    is returned and a summary of the overhead of the runner is stored in the
+    folder specified by datapath.
 
     Parameters
     ----------
@@ -312,10 +753,46 @@ def run_and_gather_statistics(syscalls, datapath, passes_per_cmd=1, buildonly=Fa
         dictates if all system commands will be run after gathering system
         information and construction of run database. Default is False.
 
+    callbacks : list or tuple, optional
+        functions called after each command has finished, see
+        `execute_per_run_database`.
+
+    wrapper : string, optional
+        name of a profiling tool from WRAPPERS to wrap every syscall in.
+
+    order : string, optional
+        execution order of the runs, see `prepare_run_database`.
+
+    seed : int, optional
+        seed of the random execution order.
+
+    max_load : float, optional
+        maximum load average to wait for before each run, see
+        `execute_per_run_database`.
+
+    compression : string, optional
+        codec to compress the command outputs with, see
+        `execute_per_run_database`.
+
+    archive : boolean, optional
+        pack the command outputs into a single archive, see
+        `execute_per_run_database`.
+
+    outlier_threshold : float, optional
+        modified z-score above which a pass is flagged as an outlier, see
+        `execute_per_run_database`.
+
+    max_reruns : int, optional
+        maximum number of replacement passes per command for the outliers.
+
+    timeout : float, optional
+        maximum duration of a command in seconds, see
+        `execute_per_run_database`.
+
     Returns
     -------
     pandas.DataFrame
-        When buildonly=True, otherwise nothing.
+        The run database.
 
     Raises
     ------
@@ -357,7 +834,9 @@ def run_and_gather_statistics(syscalls, datapath, passes_per_cmd=1, buildonly=Fa
 
     # Build database on run configuration and save to file
     _RUNSTATFILE = "runinfo_parstud.csv"
-    _rundb = prepare_run_database(syscalls, passes_per_cmd=passes_per_cmd)
+    _rundb = prepare_run_database(
+        syscalls, passes_per_cmd=passes_per_cmd, wrapper=wrapper, order=order, seed=seed
+    )
     _rundb.to_csv(os.path.join(datapath, _RUNSTATFILE))
 
     # If true then the execution step will be skipped
@@ -365,4 +844,21 @@ def run_and_gather_statistics(syscalls, datapath, passes_per_cmd=1, buildonly=Fa
         return _rundb
 
     # Run commands
-    execute_per_run_database(datapath, _rundb, _RUNSTATFILE)
+    execute_per_run_database(
+        datapath,
+        _rundb,
+        _RUNSTATFILE,
+        callbacks=callbacks,
+        max_load=max_load,
+        compression=compression,
+        archive=archive,
+        outlier_threshold=outlier_threshold,
+        max_reruns=max_reruns,
+        timeout=timeout,
+    )
+
+    # Summarize the overhead of the runner itself
+    _OVERHEADFILE = "overhead_parstud.csv"
+    summarize_overhead(_rundb).to_csv(os.path.join(datapath, _OVERHEADFILE))
+
+    return _rundb
@@ -0,0 +1,183 @@
+import os
+import gzip
+import functools
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Compression codecs for run outputs and the extensions of their files
+COMPRESSIONS = {None: "", "gzip": ".gz", "zstd": ".zst"}
+
+# Single append-only archive the run outputs can be packed into, and its
+# index with one "name,offset,length" line per output.
+ARCHIVEFILE = "outputs_parstud.pack"
+INDEXFILE = "outputs_parstud.idx"
+
+
+def compress(data, compression):
+    """
+    Compresses data with the given codec.
+
+    Parameters
+    ----------
+    data : bytes
+        the data to compress.
+
+    compression : string or None
+        codec, one of COMPRESSIONS. None returns data unchanged.
+
+    Returns
+    -------
+    bytes
+
+    Raises
+    ------
+    ValueError
+        If the codec is unknown.
+    ImportError
+        If zstd is requested and the zstandard package is not installed.
+    """
+
+    if compression not in COMPRESSIONS:
+        raise ValueError(
+            "Unknown compression '{0!s}', choose from {1!s}".format(
+                compression, [_c for _c in COMPRESSIONS if _c]
+            )
+        )
+
+    if compression == "gzip":
+        return gzip.compress(data, compresslevel=6, mtime=0)
+    if compression == "zstd":
+        if zstandard is None:
+            raise ImportError("zstd compression requires the zstandard package")
+        return zstandard.ZstdCompressor().compress(data)
+    return data
+
+
+def decompress(data, name):
+    """
+    Decompresses data according to the extension of its name.
+
+    Parameters
+    ----------
+    data : bytes
+        the stored data.
+
+    name : string
+        name of the stored output.
+
+    Returns
+    -------
+    bytes
+    """
+
+    if name.endswith(COMPRESSIONS["gzip"]):
+        return gzip.decompress(data)
+    if name.endswith(COMPRESSIONS["zstd"]):
+        if zstandard is None:
+            raise ImportError("zstd compression requires the zstandard package")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return data
+
+
+def write_output(dbpath, name, data, compression=None, archive=False):
+    """
+    Stores the output of a run, optionally compressed and/or appended to the
+    archive of dbpath instead of written to a file of its own.
+
+    Parameters
+    ----------
+    dbpath : string
+        path to the study directory.
+
+    name : string
+        name of the output, e.g. 'output_0.txt'.
+
+    data : bytes
+        the output.
+
+    compression : string, optional
+        codec, one of COMPRESSIONS.
+
+    archive : boolean, optional
+        append to ARCHIVEFILE and INDEXFILE instead of writing a file.
+
+    Returns
+    -------
+    string
+        The name the output is stored under, to be passed to read_output.
+    """
+
+    _data = compress(data, compression)
+    _name = name + COMPRESSIONS[compression]
+
+    if not archive:
+        with open(os.path.join(dbpath, _name), mode="wb") as f:
+            f.write(_data)
+        return _name
+
+    # Data first, then the index entry, so that an interrupted write never
+    # leaves an index entry pointing to missing data.
+    with open(os.path.join(dbpath, ARCHIVEFILE), mode="ab") as f:
+        _offset = f.seek(0, os.SEEK_END)
+        f.write(_data)
+    with open(os.path.join(dbpath, INDEXFILE), mode="a") as f:
+        f.write("{0},{1:d},{2:d}\n".format(_name, _offset, len(_data)))
+    return _name
+
+
+@functools.lru_cache(maxsize=8)
+def _load_index(indexfile, mtime_ns, size):
+    """
+    Loads an archive index. Cached on the modification time and size of the
+    index, so that reading many outputs does not reload it every time.
+    """
+
+    _index = {}
+    with open(indexfile, mode="r") as f:
+        for _line in f:
+            _name, _offset, _length = _line.rstrip("\n").rsplit(",", 2)
+            _index[_name] = (int(_offset), int(_length))
+    return _index
+
+
+def read_output(path):
+    """
+    Reads a run output stored by write_output, directly from its file or
+    from the archive of its directory, and decompresses it.
+
+    Parameters
+    ----------
+    path : string
+        path to the output, i.e. the study directory joined with the name
+        returned by write_output.
+
+    Returns
+    -------
+    string
+        The decoded output.
+
+    Raises
+    ------
+    FileNotFoundError
+        If the output is neither a file nor in the archive.
+    """
+
+    if os.path.isfile(path):
+        with open(path, mode="rb") as f:
+            return os.fsdecode(decompress(f.read(), path))
+
+    _dbpath, _name = os.path.split(path)
+    _indexfile = os.path.join(_dbpath, INDEXFILE)
+    if os.path.isfile(_indexfile):
+        _stat = os.stat(_indexfile)
+        _index = _load_index(_indexfile, _stat.st_mtime_ns, _stat.st_size)
+        if _name in _index:
+            _offset, _length = _index[_name]
+            with open(os.path.join(_dbpath, ARCHIVEFILE), mode="rb") as f:
+                f.seek(_offset)
+                return os.fsdecode(decompress(f.read(_length), _name))
+
+    raise FileNotFoundError("'{0!s}' does not exist".format(path))
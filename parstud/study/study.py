@@ -0,0 +1,314 @@
+import os
+import functools
+import pandas as pd
+from parstud.runner.storage import INDEXFILE
+from parstud.reader.reader import database_from_info
+from parstud.reader.reader import drop_outliers
+from parstud.reader.reader import phase_columns
+from parstud.plotter.plotter import reduce_df
+from parstud.plotter.plotter import category_breakdown
+from parstud.plotter.plotter import bottleneck_table
+from parstud.plotter.plotter import error_plot_jobs_from_statistics
+from parstud.plotter.plotter import piechart_plot_jobs_from_reduced
+from parstud.plotter.plotter import piechart_title
+from parstud.plotter.plotter import breakdown_plot_jobs_from_breakdown
+from parstud.plotter.cache import render_cached
+from parstud.pipeline.pipeline import compute_statistics
+
+# Files written by the runner next to the run database
+SYSINFOFILE = "sysinfo_parstud.txt"
+MEMINFOFILE = "meminfo_parstud.txt"
+
+
+def file_signature(paths):
+    """
+    Returns a signature of files changing whenever one of them is created,
+    modified or removed: their modification times and sizes.
+
+    Parameters
+    ----------
+    paths : list or tuple
+        paths to the files.
+
+    Returns
+    -------
+    tuple
+    """
+
+    _signature = []
+    for _path in paths:
+        try:
+            _stat = os.stat(_path)
+            _signature.append((_path, _stat.st_mtime_ns, _stat.st_size))
+        except FileNotFoundError:
+            _signature.append((_path, None, None))
+    return tuple(_signature)
+
+
+def memoized_view(files):
+    """
+    Turns a method of Study into a lazily computed property which is
+    memoized until the files returned by files(study) change, see
+    file_signature.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self):
+            _signature = file_signature(files(self))
+            _cached = self._cache.get(func.__name__)
+            if _cached is not None and _cached[0] == _signature:
+                return _cached[1]
+            _value = func(self)
+            self._cache[func.__name__] = (_signature, _value)
+            return _value
+
+        return property(wrapper)
+
+    return decorator
+
+
+class Study:
+    """
+    A study directory written by the runner, with its data exposed as lazily
+    computed views. Every view is computed on first access and memoized
+    until the files it derives from change on disk, e.g. while a study is
+    still running, so that notebooks and scripts can access them repeatedly
+    without re-parsing the logs or re-aggregating the data.
+
+    The views are shared between accesses and must not be modified in place;
+    copy them first.
+
+    Parameters
+    ----------
+    path : string
+        path to the study directory.
+
+    dbfile : string, optional
+        name of the run database in path. Default is "runinfo_parstud.csv".
+
+    mapping : dict, optional
+        category of each phase, see plotter.phase_categories.
+
+    Raises
+    ------
+    FileNotFoundError
+        If path does not exist.
+
+    Example
+    -------
+    >>> study = Study("study_dir")
+    >>> study.statistics["Reading files mean"]
+    """
+
+    def __init__(self, path, dbfile="runinfo_parstud.csv", mapping=None):
+        if not os.path.isdir(path):
+            raise FileNotFoundError("'{0!s}' is not an existing directory".format(path))
+
+        self.path = path
+        self.dbfile = dbfile
+        self.mapping = mapping
+        self._cache = {}
+        # Row hashes of the successful runs and their parsed logs
+        self._parsed = None
+
+    def __repr__(self):
+        return "Study({0!r})".format(self.path)
+
+    def invalidate(self):
+        """
+        Drops all memoized views and parsed logs, e.g. after a log was
+        modified in place without the run database being updated.
+        """
+
+        self._cache.clear()
+        self._parsed = None
+
+    def _run_files(self):
+        return [os.path.join(self.path, self.dbfile)]
+
+    def _log_files(self):
+        # The logs are not stat'ed one by one: the runner updates the run
+        # database after every log it writes, the archive index changes with
+        # every packed log and the modification time of the directory with
+        # every log file added or removed.
+        return self._run_files() + [os.path.join(self.path, INDEXFILE), self.path]
+
+    @memoized_view(_run_files)
+    def rundb(self):
+        """
+        The run database, as written by the runner.
+        """
+
+        return pd.read_csv(os.path.join(self.path, self.dbfile), index_col=0)
+
+    @memoized_view(lambda self: [os.path.join(self.path, SYSINFOFILE)])
+    def sysinfo(self):
+        """
+        The hardware information of the machine the study ran on, None if it
+        was not recorded.
+        """
+
+        return self._read_text(SYSINFOFILE)
+
+    @memoized_view(lambda self: [os.path.join(self.path, MEMINFOFILE)])
+    def meminfo(self):
+        """
+        The memory information of the machine the study ran on, None if it
+        was not recorded.
+        """
+
+        return self._read_text(MEMINFOFILE)
+
+    def _read_text(self, name):
+        _file = os.path.join(self.path, name)
+        if not os.path.isfile(_file):
+            return None
+        with open(_file, mode="r") as f:
+            return f.read()
+
+    @memoized_view(_log_files)
+    def database(self):
+        """
+        The reader database of the successful runs, indexed by log file, see
+        reader.build_database. The "Number of processors" are numeric where
+        possible.
+
+        Only the logs of the runs whose row in the run database changed since
+        the last access are read again. Without any successful run, e.g.
+        before the first run finished, the database is empty.
+        """
+
+        _rundb = self.rundb
+        if "exit_status" not in _rundb.columns or "stdout_file" not in _rundb.columns:
+            _rundb = _rundb.iloc[:0]
+        else:
+            _rundb = _rundb[(_rundb["exit_status"] == 0) & _rundb["stdout_file"].notnull()]
+        if _rundb.empty:
+            self._parsed = None
+            return pd.DataFrame(
+                columns=["Number of processors", "Pass number"],
+                index=pd.Index([], name="stdout_file"),
+            )
+
+        _hashes = pd.util.hash_pandas_object(_rundb, index=True)
+        _unchanged = pd.Series(False, index=_rundb.index)
+        if self._parsed is not None:
+            _unchanged = self._parsed[0].reindex(_rundb.index) == _hashes
+
+        _frames = []
+        if _unchanged.any():
+            _frames.append(self._parsed[1].loc[_rundb.loc[_unchanged, "stdout_file"]])
+        if not _unchanged.all():
+            _frames.append(
+                database_from_info(os.path.join(self.path, ""), _rundb[~_unchanged])
+            )
+        _df = pd.concat(_frames).loc[_rundb["stdout_file"]]
+        self._parsed = (_hashes, _df)
+        try:
+            _df["Number of processors"] = pd.to_numeric(_df["Number of processors"])
+        except ValueError:
+            # Keep non-numerical variations as they are
+            pass
+        return _df
+
+    @property
+    def phases(self):
+        """
+        The phases of the logs, in log order.
+        """
+
+        return phase_columns(self.database)
+
+    @memoized_view(_log_files)
+    def statistics(self):
+        """
+        Per variation statistics of every phase, outliers left out, see
+        pipeline.compute_statistics.
+        """
+
+        return compute_statistics(self.database)
+
+    @memoized_view(_log_files)
+    def errorbars(self):
+        """
+        Per variation mean and 2.5 % / 97.5 % quantiles of every phase,
+        outliers left out, as drawn by plotter.error_plot.
+
+        Returns
+        -------
+        dict
+            With the "mean", 0.025 and 0.975 DataFrames, indexed by
+            "Number of processors" with one column per phase.
+        """
+
+        _df = drop_outliers(self.database)
+        _grouped = _df[self.phases + ["Number of processors"]].groupby(
+            "Number of processors"
+        )
+        return {
+            "mean": _grouped.mean(),
+            0.025: _grouped.quantile(0.025),
+            0.975: _grouped.quantile(0.975),
+        }
+
+    @memoized_view(_log_files)
+    def reduced(self):
+        """
+        Average time per phase category (by default reading, computing and
+        writing), outliers left out, see plotter.reduce_df.
+        """
+
+        return reduce_df(drop_outliers(self.database), self.mapping)
+
+    @memoized_view(_log_files)
+    def breakdown(self):
+        """
+        Average time per phase category and variation, outliers left out,
+        see plotter.category_breakdown.
+        """
+
+        return category_breakdown(self.database, self.mapping)
+
+    @property
+    def bottlenecks(self):
+        """
+        Share of every phase category per variation, with the dominant
+        category and where it shifts, see plotter.bottleneck_table.
+        """
+
+        return bottleneck_table(self.breakdown)
+
+    def plot_jobs(self, plotdir, ext="pdf", style=None):
+        """
+        Builds the render jobs of the error bar, pie chart and breakdown plots
+        from the memoized views.
+
+        Returns
+        -------
+        list
+            List of (function, kwargs) tuples to be passed to render_figures.
+        """
+
+        _errorbars = self.errorbars
+        _jobs = error_plot_jobs_from_statistics(
+            _errorbars["mean"], _errorbars[0.025], _errorbars[0.975], plotdir, ext, style=style
+        )
+        _jobs += piechart_plot_jobs_from_reduced(
+            self.reduced, plotdir, ext, style=style, title=piechart_title(self.database)
+        )
+        _jobs += breakdown_plot_jobs_from_breakdown(self.breakdown, plotdir, ext, style=style)
+        return _jobs
+
+    def plot(self, plotdir, ext="pdf", style=None, nprocs=None):
+        """
+        Renders the plots of the study to plotdir through the plot cache, so
+        that only the figures whose data changed are rendered again.
+
+        Returns
+        -------
+        dict
+            With the "rendered" and "reused" figures, see cache.render_cached.
+        """
+
+        return render_cached(self.plot_jobs(plotdir, ext, style=style), plotdir, nprocs=nprocs)
@@ -0,0 +1,36 @@
+from parstud.benchmark.bench import run_benchmarks
+from parstud.benchmark.bench import record_results
+import os
+import pytest
+import pandas as pd
+
+
+def test_run_benchmarks(tmp_path):
+    results = run_benchmarks(str(tmp_path), 16, runner_runs=3, nprocs=1)
+
+    assert results["runs"] == 16
+    for _key in (
+        "reader_time",
+        "reader_throughput",
+        "database_memory",
+        "plot_time",
+        "runner_time",
+        "runner_time_per_command",
+        "runner_overhead_total",
+    ):
+        assert results[_key] > 0
+    assert len(os.listdir(str(tmp_path / "plots"))) == 10
+
+    with pytest.raises(FileNotFoundError):
+        run_benchmarks("nonexistant-folder/", 16)
+
+
+def test_record_results(tmp_path):
+    resultfile = str(tmp_path / "results.csv")
+
+    record_results({"runs": 8, "reader_time": 0.5}, resultfile)
+    recorded = record_results({"runs": 16, "reader_time": 0.7}, resultfile)
+
+    assert list(recorded["runs"]) == [8, 16]
+    assert list(pd.read_csv(resultfile)["reader_time"]) == [0.5, 0.7]
+    assert "revision" in recorded.columns
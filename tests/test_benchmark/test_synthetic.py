@@ -0,0 +1,39 @@
+from parstud.benchmark.synthetic import generate_log
+from parstud.benchmark.synthetic import generate_study
+from parstud.benchmark.synthetic import POD_PHASES
+from parstud.reader.reader import read_log
+from parstud.reader.reader import build_database
+import os
+import pytest
+
+
+def test_generate_log(tmp_path):
+    _log = tmp_path / "output_0.txt"
+    _log.write_text(generate_log([("Reading files", 1.5), ("Writing chronos", 2e-5)]))
+
+    assert read_log(str(_log), 0) == ["Reading files", "Writing chronos"]
+    assert read_log(str(_log), 1) == [1.5, 2e-5]
+
+
+def test_generate_study(tmp_path):
+    rundb = generate_study(str(tmp_path), [1, 2, 4], passes_per_cmd=3, seed=1)
+
+    assert len(rundb.index) == 9
+    assert len(os.listdir(str(tmp_path))) == 10
+
+    df = build_database(str(tmp_path) + "/", "runinfo_parstud.csv")
+    assert list(df.columns[:7]) == [_phase for (_phase, _, _) in POD_PHASES]
+    assert df["Number of snapshots"].iloc[0] == 200
+
+    # Parallel phases get faster with more processors
+    mean = df.groupby("Number of processors")["Computing POD modes"].mean()
+    assert mean["1"] > mean["2"] > mean["4"]
+
+    # The same seed produces the same study
+    other = tmp_path / "other"
+    other.mkdir()
+    generate_study(str(other), [1, 2, 4], passes_per_cmd=3, seed=1)
+    assert (other / "output_8.txt").read_text() == (tmp_path / "output_8.txt").read_text()
+
+    with pytest.raises(FileNotFoundError):
+        generate_study("nonexistant-folder/", [1])
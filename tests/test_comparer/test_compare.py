@@ -0,0 +1,120 @@
+from parstud.comparer.compare import cliffs_delta
+from parstud.comparer.compare import compare_databases
+from parstud.comparer.compare import find_regressions
+from parstud.reader.reader import phase_columns
+import pytest
+import pandas as pd
+
+
+def test_cliffs_delta():
+    assert cliffs_delta([1.0, 2.0], [3.0, 4.0]) == 1.0
+    assert cliffs_delta([3.0, 4.0], [1.0, 2.0]) == -1.0
+    assert cliffs_delta([1.0, 2.0], [1.0, 2.0]) == 0.0
+
+    with pytest.raises(ValueError):
+        cliffs_delta([], [1.0])
+
+
+def test_compare_databases():
+    path = "tests/test_plotter/input/"
+    df = pd.read_csv(path + "logs.csv")
+
+    # Slow down reading by 50 % and speed up writing by 50 %
+    df_new = df.copy()
+    df_new["Reading files"] = df_new["Reading files"] * 1.5
+    df_new["Writing POD modes"] = df_new["Writing POD modes"] * 0.5
+
+    report = compare_databases(df, df_new)
+
+    assert isinstance(report, pd.DataFrame)
+    # Three variations times seven phases
+    assert len(report.index) == 21
+    assert report["Relative change"].is_monotonic_decreasing
+
+    slow = report[report["Verdict"] == "slowdown"]
+    fast = report[report["Verdict"] == "speedup"]
+    assert set(slow["Phase"]) == {"Reading files"}
+    assert set(fast["Phase"]) == {"Writing POD modes"}
+    assert (report[report["Verdict"] == "unchanged"]["Relative change"] == 0).all()
+
+    with pytest.raises(TypeError):
+        compare_databases(123, df_new)
+
+
+def test_compare_databases_outliers():
+    path = "tests/test_plotter/input/"
+    df = pd.read_csv(path + "logs.csv")
+
+    # Disturbed passes flagged by the runner are left out of both databases,
+    # even when they are the majority of their variation
+    df["outlier"] = False
+    _flagged = df.index[df["Number of processors"] == 9][:3]
+    df.loc[_flagged, "outlier"] = True
+    df_new = df.copy()
+    df_new.loc[_flagged, "Reading files"] = df_new.loc[_flagged, "Reading files"] * 10.0
+
+    report = compare_databases(df, df_new)
+    assert 9 in set(report["Number of processors"])
+    assert (report["Relative change"] == 0).all()
+
+    df_new["outlier"] = False
+    report = compare_databases(df, df_new)
+    assert report["Relative change"].max() > 1.0
+
+
+def test_compare_databases_edge_cases():
+    path = "tests/test_plotter/input/"
+    df = pd.read_csv(path + "logs.csv")
+
+    # No phase has timings in both databases: still a valid table
+    df_new = df.copy()
+    df_new[phase_columns(df)] = float("nan")
+    report = compare_databases(df, df_new)
+    assert report.empty
+    assert "Verdict" in report.columns
+
+    # A phase taking no time in the baseline has no relative change
+    df_zero = df.copy()
+    df_zero["Writing eigenvalues"] = 0.0
+    report = compare_databases(df_zero, df)
+    zero = report[report["Phase"] == "Writing eigenvalues"]
+    assert zero["Relative change"].isnull().all()
+    assert (zero["Verdict"] == "slowdown").all()
+    assert list(report.index[report["Relative change"].isnull()]) == [0, 1, 2]
+    assert set(find_regressions(report)["Phase"]) == {"Writing eigenvalues"}
+    report = compare_databases(df_zero, df_zero)
+    assert (report["Relative change"] == 0).all()
+
+    # Slowdowns from a zero baseline rank above every speedup
+    df_new = df.copy()
+    df_new["Writing POD modes"] = df_new["Writing POD modes"] * 0.5
+    report = compare_databases(df_zero, df_new)
+    assert list(report["Verdict"][:3]) == ["slowdown"] * 3
+    assert report["Relative change"][:3].isnull().all()
+    assert list(report["Verdict"][-3:]) == ["speedup"] * 3
+    assert list(find_regressions(report).index) == [0, 1, 2]
+
+    # Significant changes below the minimum effect size are not reported
+    report = compare_databases(df, df.assign(**{"Reading files": df["Reading files"] * 1.5}))
+    assert (report["Verdict"] == "slowdown").any()
+    report = compare_databases(
+        df, df.assign(**{"Reading files": df["Reading files"] * 1.5}), min_effect=1.1
+    )
+    assert (report["Verdict"] == "unchanged").all()
+
+
+def test_find_regressions():
+    path = "tests/test_plotter/input/"
+    df = pd.read_csv(path + "logs.csv")
+
+    df_new = df.copy()
+    df_new["Reading files"] = df_new["Reading files"] * 1.2
+
+    report = compare_databases(df, df_new)
+
+    assert len(find_regressions(report, threshold=0.1).index) == 3
+    assert find_regressions(report, threshold=0.3).empty
+    assert find_regressions(compare_databases(df, df)).empty
+
+    with pytest.raises(TypeError):
+        find_regressions(123)
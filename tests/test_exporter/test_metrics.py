@@ -0,0 +1,89 @@
+from parstud.exporter.metrics import StudyMetrics
+from parstud.exporter.metrics import OPENMETRICS_CONTENT_TYPE
+from parstud.runner.run_profile import run_and_gather_statistics
+import os
+import sys
+import urllib.request
+import urllib.error
+import pytest
+import pandas as pd
+
+
+def _fake_pod():
+    _curr_dir = os.path.dirname(os.path.realpath(__file__))
+    return os.path.join(_curr_dir, "..", "test_pipeline", "input", "fake_pod.py")
+
+
+def test_study_metrics(tmp_path):
+    datapath = str(tmp_path)
+    textfile = os.path.join(datapath, "parstud.prom")
+    metrics = StudyMetrics(textfile=textfile, buckets=(1.0,))
+
+    _pod = "{0} {1} -np".format(sys.executable, _fake_pod())
+    _syscalls = [_pod + " 1", _pod + " 2", "/bin/false 4", "/bin/sleep 10"]
+    _renders = []
+    _rundb = run_and_gather_statistics(
+        _syscalls,
+        datapath,
+        callbacks=[metrics.update, lambda *args: _renders.append(metrics.render())],
+        timeout=0.5,
+    )
+    assert list(_rundb["timed_out"]) == [False, False, False, True]
+
+    text = metrics.render()
+    lines = text.splitlines()
+    assert lines[-1] == "# EOF"
+    assert "parstud_runs_planned 4.0" in lines
+    assert "parstud_runs_completed_total 2.0" in lines
+    assert "parstud_runs_failed_total 1.0" in lines
+    assert "parstud_runs_timed_out_total 1.0" in lines
+    assert "# TYPE parstud_runs_completed counter" in lines
+    assert 'parstud_run_duration_seconds_bucket{variation="1",le="+Inf"} 1.0' in lines
+    assert 'parstud_run_duration_seconds_count{variation="10"} 1.0' in lines
+    assert 'parstud_run_duration_seconds_bucket{variation="10",le="1.0"} 1.0' in lines
+    assert 'parstud_phase_seconds{variation="2",phase="Reading files"} 2.0' in lines
+    # The current variation is the one of the latest run
+    assert 'parstud_current_variation{variation="1"} 1.0' in _renders[0].splitlines()
+    assert 'parstud_current_variation{variation="10"} 1.0' in lines
+
+    # The textfile is in the Prometheus text format, without the EOF marker
+    with open(textfile) as f:
+        prom = f.read().splitlines()
+    assert "# TYPE parstud_runs_completed_total counter" in prom
+    assert "# EOF" not in prom
+
+
+def test_study_metrics_partial_rundb(tmp_path):
+    metrics = StudyMetrics()
+    _rundb = pd.DataFrame(
+        {
+            "command": ["pod -np 1", "pod -np 2", "pod -np 4", "pod -np 8"],
+            "attempted": [True, True, None, None],
+            "exit_status": [1, 1, None, None],
+            "elapsed_time": [0.1, 0.2, None, None],
+        }
+    )
+
+    # Called for the second run, while the third one has not started
+    metrics.update(str(tmp_path), _rundb, 1)
+    lines = metrics.render().splitlines()
+    assert 'parstud_current_variation{variation="2"} 1.0' in lines
+    assert not [l for l in lines if 'variation="4"' in l]
+
+
+def test_serve_metrics(tmp_path):
+    metrics = StudyMetrics()
+    server = metrics.serve(0)
+    try:
+        url = "http://{0!s}:{1:d}/metrics".format(*server.server_address)
+        with urllib.request.urlopen(url) as response:
+            assert response.headers["Content-Type"] == OPENMETRICS_CONTENT_TYPE
+            body = response.read().decode("utf-8")
+        assert "parstud_runs_completed_total 0.0" in body.splitlines()
+        assert body.endswith("# EOF\n")
+
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(url.replace("/metrics", "/other"))
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,75 @@
+from parstud.exporter.trace import build_trace
+from parstud.exporter.trace import write_trace
+from parstud.exporter.trace import counter_events
+from parstud.benchmark.synthetic import generate_study
+import os
+import json
+import pytest
+import pandas as pd
+
+
+def test_build_trace(tmp_path):
+    datapath = str(tmp_path)
+    rundb = generate_study(datapath, [1, 2], passes_per_cmd=2, seed=0)
+
+    trace = build_trace(datapath, rundb)
+    events = trace["traceEvents"]
+
+    runs = [e for e in events if e.get("cat") == "run"]
+    phases = [e for e in events if e.get("cat") == "phase"]
+    tracks = [e for e in events if e["name"] == "thread_name"]
+    assert len(runs) == len(tracks) == 4
+    assert len(phases) == 4 * 7
+
+    # The synthetic runs follow each other and start at the trace origin
+    assert runs[0]["ts"] == 0.0
+    assert runs[1]["ts"] == pytest.approx(runs[0]["ts"] + runs[0]["dur"])
+
+    # The phases of a run are nested in its slice, in log order
+    first = [e for e in phases if e["tid"] == runs[0]["tid"]]
+    assert first[0]["name"] == "Reading files"
+    assert first[0]["ts"] == runs[0]["ts"]
+    for prev, nxt in zip(first[:-1], first[1:]):
+        assert nxt["ts"] == pytest.approx(prev["ts"] + prev["dur"])
+    # The synthetic logs round the phase times to six significant digits
+    assert first[-1]["ts"] + first[-1]["dur"] == pytest.approx(
+        runs[0]["ts"] + runs[0]["dur"], rel=1e-4
+    )
+
+    # The trace is plain JSON
+    filename = os.path.join(datapath, "trace.json")
+    write_trace(trace, filename)
+    with open(filename) as f:
+        assert json.load(f) == trace
+
+    with pytest.raises(TypeError):
+        build_trace(datapath, "runinfo_parstud.csv")
+
+
+def test_trace_counters(tmp_path):
+    datapath = str(tmp_path)
+    rundb = generate_study(datapath, [1], passes_per_cmd=1, seed=0)
+    rundb["load_1min"] = 0.5
+
+    counters = pd.DataFrame(
+        {
+            "timestamp": ["2019-10-28T00:00:00", "2019-10-28T00:00:10"],
+            "cpu [%]": [10.0, 90.0],
+            "host": ["a", "a"],
+        }
+    )
+    trace = build_trace(datapath, rundb, counters=counters)
+    samples = [e for e in trace["traceEvents"] if e["ph"] == "C"]
+
+    assert [e["name"] for e in samples] == ["load_1min", "cpu [%]", "cpu [%]"]
+    assert samples[2]["ts"] == pytest.approx(10e6)
+    assert samples[2]["args"] == {"cpu [%]": 90.0}
+
+    with pytest.raises(KeyError):
+        counter_events(counters.drop(columns="timestamp"), pd.Timestamp(0))
+
+
+def test_trace_unattempted():
+    rundb = pd.DataFrame({"command": ["echo 1"], "pass_no": [1]})
+    trace = build_trace(".", rundb)
+    assert [e["name"] for e in trace["traceEvents"]] == ["process_name"]
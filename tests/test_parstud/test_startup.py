@@ -0,0 +1,44 @@
+import os
+import sys
+import time
+import subprocess
+
+_SCRIPT = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))),
+    "parstud",
+    "parstud.py",
+)
+_HEAVY_MODULES = ("pandas", "numpy", "scipy", "matplotlib")
+
+
+def startup_time_helper(cmd, repeats=3):
+    # Best of several runs, to reduce the noise of the measurement
+    _best = None
+    for _ in range(repeats):
+        _start = time.perf_counter()
+        subprocess.check_output(cmd)
+        _elapsed = time.perf_counter() - _start
+        _best = _elapsed if _best is None else min(_best, _elapsed)
+    return _best
+
+
+def test_help_imports_no_heavy_modules():
+    for _subcommand in ("run", "read", "plot", "compare", "study", "bench", "plan", "trace"):
+        _out = subprocess.run(
+            [sys.executable, "-X", "importtime", _SCRIPT, _subcommand, "--help"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            check=True,
+        )
+        # The import time report is printed to stderr, one module per line
+        _imported = [line.split("|")[-1].strip() for line in os.fsdecode(_out.stderr).splitlines()]
+        for _module in _HEAVY_MODULES:
+            assert _module not in _imported
+
+
+def test_startup_time_benchmark():
+    # The overhead of parsing the arguments on top of starting the
+    # interpreter should stay well below the cost of importing pandas.
+    _interpreter = startup_time_helper([sys.executable, "-c", "pass"])
+    _help = startup_time_helper([sys.executable, _SCRIPT, "run", "--help"])
+    assert _help - _interpreter < 0.25
@@ -0,0 +1,17 @@
+# Mimics the log output of the parallel-pod code, with phase times
+# inversely proportional to the value given to -np.
+import sys
+
+_np = int(sys.argv[sys.argv.index("-np") + 1])
+
+print("Starting POD routines \n")
+for _phase, _time in (
+    ("Reading files", 4.0),
+    ("Computing projection matrix", 2.0),
+    ("Computing eigenvalues and eigenvectors", 0.01),
+    ("Computing POD modes", 3.0),
+    ("Writing eigenvalues", 0.01),
+    ("Writing chronos", 0.02),
+    ("Writing POD modes", 5.0),
+):
+    print("{0}...\t\t\t\t Done in {1}s \n".format(_phase, _time / _np))
@@ -0,0 +1,83 @@
+from parstud.pipeline.pipeline import compute_statistics
+from parstud.pipeline.pipeline import run_study_pipeline
+from parstud.pipeline.pipeline import READERFILE
+from parstud.pipeline.pipeline import STATISTICSFILE
+from parstud.runner.run_profile import generate_syscalls
+import os
+import sys
+import pytest
+import pandas as pd
+
+
+def test_compute_statistics():
+    path = "tests/test_plotter/input/"
+    df = pd.read_csv(path + "logs.csv")
+
+    stats = compute_statistics(df)
+
+    assert list(stats.index) == [9, 18, 36]
+    assert (stats["Number of passes"] == 5).all()
+    assert stats.loc[9, "Reading files mean"] == pytest.approx(
+        df[df["Number of processors"] == 9]["Reading files"].mean()
+    )
+
+    with pytest.raises(TypeError):
+        compute_statistics(123)
+
+    # Passes flagged as outliers are left out
+    df["outlier"] = False
+    df.loc[0, "outlier"] = True
+    stats = compute_statistics(df)
+    assert stats.loc[9, "Number of passes"] == 4
+    assert stats.loc[9, "Reading files mean"] == pytest.approx(
+        df[df["Number of processors"] == 9]["Reading files"].iloc[1:].mean()
+    )
+
+
+def test_run_study_pipeline(tmp_path):
+    _curr_dir = os.path.dirname(os.path.realpath(__file__))
+    _fake_pod = os.path.join(_curr_dir, "input/fake_pod.py")
+
+    datapath = str(tmp_path / "study")
+    plotdir = str(tmp_path / "plots")
+    os.makedirs(datapath)
+    os.makedirs(plotdir)
+
+    _basecmd = "{0} {1} -p 1000 -v 3 -s 10 -nm 2 -np".format(sys.executable, _fake_pod)
+    _syscalls = generate_syscalls([1, 2], _basecmd)
+    state = run_study_pipeline(_syscalls, datapath, plotdir, passes_per_cmd=2, nprocs=1)
+
+    # Everything is persisted as well as kept in memory
+    reader = pd.read_csv(os.path.join(datapath, READERFILE))
+    assert len(reader.index) == len(state["reader"].index) == 4
+    stats = pd.read_csv(os.path.join(datapath, STATISTICSFILE), index_col=0)
+    assert list(stats.index) == [1, 2]
+    assert stats.loc[2, "Reading files mean"] == pytest.approx(2.0)
+    assert len(os.listdir(plotdir)) == 11
+
+    with pytest.raises(FileNotFoundError):
+        run_study_pipeline(_syscalls, datapath, "nonexistant-folder/")
+
+
+def test_run_study_pipeline_outliers(tmp_path):
+    _curr_dir = os.path.dirname(os.path.realpath(__file__))
+    _script = os.path.join(_curr_dir, "../test_runner/input/noisy_pod.py")
+    _counter = str(tmp_path / "counter.txt")
+
+    datapath = str(tmp_path / "study")
+    plotdir = str(tmp_path / "plots")
+    os.makedirs(datapath)
+    os.makedirs(plotdir)
+
+    # The third pass is disturbed and flagged once all passes ran, after
+    # the first passes were already appended to the reader database
+    _command = "{0} {1} {2} 2".format(sys.executable, _script, _counter)
+    state = run_study_pipeline(
+        [_command], datapath, plotdir, passes_per_cmd=5, nprocs=2, outlier_threshold=3.5
+    )
+
+    reader = pd.read_csv(os.path.join(datapath, READERFILE))
+    assert list(reader["outlier"]) == [False, False, True, False, False]
+    assert list(reader["stdout_file"]) == list(state["reader"]["stdout_file"])
+    assert state["statistics"].loc[2, "Number of passes"] == 4
+    assert len(os.listdir(plotdir)) == 11
@@ -0,0 +1,93 @@
+from parstud.planner.planner import fit_scaling_model
+from parstud.planner.planner import fit_study
+from parstud.planner.planner import model_table
+from parstud.planner.planner import predict
+from parstud.planner.planner import efficiency_knee
+from parstud.planner.planner import propose_variations
+from parstud.benchmark.synthetic import generate_study
+from parstud.reader.reader import build_database
+from parstud.reader.reader import phase_columns
+from parstud.runner.run_profile import generate_syscalls
+import os
+import pytest
+import numpy as np
+import pandas as pd
+
+
+def test_fit_scaling_model():
+    nprocs = np.repeat([1, 2, 4, 8, 16], 3)
+    times = 2.0 + 30.0 / nprocs + 0.1 * nprocs
+
+    fit = fit_scaling_model(nprocs, times)
+    assert fit["coefficients"] == pytest.approx([2.0, 30.0, 0.1], rel=1e-3)
+
+    predicted, error = predict(fit, [32])
+    assert predicted[0] == pytest.approx(2.0 + 30.0 / 32 + 3.2, rel=1e-3)
+    assert error[0] >= 0.0
+
+    # The efficiency 32.1 / (2 p + 30 + 0.1 p^2) drops below 0.5 at p = 12
+    assert efficiency_knee(fit, range(1, 65)) == 12
+    assert efficiency_knee(fit, range(1, 65), efficiency=0.01) is None
+
+    with pytest.raises(ValueError):
+        fit_scaling_model([1, 1, 2, 2], [4.0, 4.0, 2.0, 2.0])
+
+
+def test_fit_study(tmp_path):
+    generate_study(str(tmp_path), [1, 2, 4, 8, 16], passes_per_cmd=3, noise=0.0)
+    df = build_database(os.path.join(str(tmp_path), ""), "runinfo_parstud.csv")
+    df = df.reset_index()
+
+    fits = fit_study(df)
+    table = model_table(fits)
+    assert "Total" in table.index
+    # 381600 points x 200 snapshots, see synthetic.POD_PHASES
+    assert table.at["Computing POD modes", "parallel"] == pytest.approx(
+        76.32 * 1.30, rel=1e-2
+    )
+    assert table.at["Writing POD modes", "serial"] == pytest.approx(76.32 * 0.40, rel=1e-2)
+
+    # A disturbed pass flagged as outlier does not bias the fit
+    df["outlier"] = False
+    df.loc[0, "outlier"] = True
+    df.loc[0, "Computing POD modes"] = df.loc[0, "Computing POD modes"] * 100.0
+    flagged = model_table(fit_study(df))
+    assert flagged.at["Computing POD modes", "parallel"] == pytest.approx(
+        76.32 * 1.30, rel=1e-2
+    )
+
+    with pytest.raises(TypeError):
+        fit_study("logs.csv")
+
+
+def test_propose_variations():
+    path = "tests/test_plotter/input/"
+    df = pd.read_csv(path + "logs.csv")
+    measured = set(df["Number of processors"].astype(str))
+
+    proposals = propose_variations(df, range(1, 65), n=3)
+    assert len(proposals) == 3
+    assert len(set(proposals)) == 3
+    assert not set(proposals) & measured
+    # The first proposal is the efficiency knee of the total time
+    fits = fit_study(df)
+    assert proposals[0] == str(efficiency_knee(fits["Total"], range(1, 65)))
+
+    # Ready to be fed to generate_syscalls
+    syscalls = generate_syscalls(proposals, "echo -np")
+    assert syscalls[0] == "echo -np " + proposals[0]
+
+    # Too few variations for a model: spread on a logarithmic scale
+    single = df[df["Number of processors"] == df["Number of processors"].min()]
+    spread = propose_variations(single, range(1, 65), n=2)
+    assert spread == ["1", "64"]
+
+    # Variations left without usable passes do not count as measured
+    flagged = df.copy()
+    flagged["outlier"] = flagged["Number of processors"] == 36
+    flagged.loc[flagged["Number of processors"] == 18, phase_columns(df)] = float("nan")
+    spread = propose_variations(flagged, range(1, 65), n=2)
+    assert spread == ["1", "64"]
+
+    with pytest.raises(TypeError):
+        propose_variations("logs.csv", range(1, 65))
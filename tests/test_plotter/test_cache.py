@@ -0,0 +1,64 @@
+from parstud.plotter.cache import figure_hash
+from parstud.plotter.cache import render_cached
+from parstud.plotter.cache import load_manifest
+from parstud.plotter.cache import cached_files
+from parstud.plotter.plotter import error_plot_jobs
+import os
+import pytest
+import pandas as pd
+
+
+def test_figure_hash(tmp_path):
+    path = "tests/test_plotter/input/"
+    df = pd.read_csv(path + "logs.csv")
+
+    jobs = error_plot_jobs(df, str(tmp_path), "png")
+    hashes = [figure_hash(func, kwargs) for (func, kwargs) in jobs]
+    assert len(set(hashes)) == len(jobs)
+
+    # The output directory does not take part in the hash
+    moved = error_plot_jobs(df, path, "png")
+    assert [figure_hash(func, kwargs) for (func, kwargs) in moved] == hashes
+
+    # Changing the plot parameters or data changes the hash
+    styled = error_plot_jobs(df, str(tmp_path), "png", style="ggplot")
+    assert figure_hash(*styled[0]) != hashes[0]
+
+    df_new = df.copy()
+    df_new["Reading files"] = df_new["Reading files"] * 2
+    changed = error_plot_jobs(df_new, str(tmp_path), "png")
+    changed_hashes = [figure_hash(func, kwargs) for (func, kwargs) in changed]
+    assert changed_hashes[0] != hashes[0]
+    assert changed_hashes[1:] == hashes[1:]
+
+
+def test_render_cached(tmp_path):
+    path = "tests/test_plotter/input/"
+    df = pd.read_csv(path + "logs.csv")
+    outdir = str(tmp_path)
+
+    report = render_cached(error_plot_jobs(df, outdir, "png"), outdir, nprocs=1)
+    assert len(report["rendered"]) == 7
+    assert report["reused"] == []
+    assert len(load_manifest(outdir)) == 7
+    assert sorted(cached_files(outdir)) == sorted(os.listdir(outdir))
+
+    report = render_cached(error_plot_jobs(df, outdir, "png"), outdir, nprocs=1)
+    assert report["rendered"] == []
+    assert len(report["reused"]) == 7
+
+    # Only the figure whose data changed, or whose file is gone, is rendered
+    df["Reading files"] = df["Reading files"] * 2
+    os.remove(os.path.join(outdir, "errorbar_6.png"))
+    report = render_cached(error_plot_jobs(df, outdir, "png"), outdir, nprocs=1)
+    assert report["rendered"] == ["errorbar_0.png", "errorbar_6.png"]
+    assert len(report["reused"]) == 5
+
+    # Cached figures of another study are removed with their entries
+    report = render_cached(error_plot_jobs(df, outdir, "png")[:2], outdir, nprocs=1)
+    assert len(report["reused"]) == 2
+    assert sorted(load_manifest(outdir)) == ["errorbar_0.png", "errorbar_1.png"]
+    assert sorted(cached_files(outdir)) == sorted(os.listdir(outdir))
+
+    with pytest.raises(FileNotFoundError):
+        render_cached([], "nonexistant-folder/")
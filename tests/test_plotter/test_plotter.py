@@ -1,6 +1,13 @@
 from parstud.plotter.plotter import error_plot
 from parstud.plotter.plotter import reduce_df
 from parstud.plotter.plotter import piechart_plot
+from parstud.plotter.plotter import render_figures
+from parstud.plotter.plotter import error_plot_jobs
+from parstud.plotter.plotter import piechart_plot_jobs
+from parstud.plotter.plotter import phase_categories
+from parstud.plotter.plotter import category_breakdown
+from parstud.plotter.plotter import bottleneck_table
+from parstud.plotter.plotter import breakdown_plot
 import sys
 import os
 import pytest
@@ -32,6 +39,13 @@ def test_reduce_df():
     df_r = reduce_df(df)
 
     assert isinstance(df, pd.DataFrame)
+    assert list(df_r.index) == ["Reading", "Computing", "Writing"]
+    assert df_r["Reading"] == pytest.approx(df["Reading files"].mean())
+
+    # Any number of phases, with a custom mapping
+    df_few = df[["stdout_file", "Reading files", "Computing POD modes", "Number of processors"]]
+    df_r = reduce_df(df_few, {"Computing POD modes": "Solver"})
+    assert list(df_r.index) == ["Reading", "Solver"]
 
     bad_df = 123
 
@@ -54,3 +68,124 @@ def test_piechart_plot():
         piechart_plot(df, bad_path, ext)
     with pytest.raises(ValueError):
         piechart_plot(df, path, bad_ext)
+
+
+def test_error_plot_output(tmp_path):
+    path = "tests/test_plotter/input/"
+    df = pd.read_csv(path + "logs.csv")
+    ext = "png"
+
+    # Serial and parallel rendering produce one figure per phase
+    for nprocs, outdir in ((1, tmp_path / "serial"), (2, tmp_path / "parallel")):
+        outdir.mkdir()
+        error_plot(df, str(outdir), ext, nprocs=nprocs)
+        assert sorted(os.listdir(outdir)) == [
+            "errorbar_{0}.png".format(i) for i in range(7)
+        ]
+
+    piechart_plot(df, str(tmp_path), ext, nprocs=1)
+    assert os.path.isfile(os.path.join(str(tmp_path), "piechart.png"))
+
+
+def test_render_figures(tmp_path):
+    path = "tests/test_plotter/input/"
+    df = pd.read_csv(path + "logs.csv")
+
+    jobs = error_plot_jobs(df, str(tmp_path), "pdf")
+    assert len(jobs) == 7
+    assert render_figures(jobs[:2], nprocs=2) == [
+        os.path.join(str(tmp_path), "errorbar_0.pdf"),
+        os.path.join(str(tmp_path), "errorbar_1.pdf"),
+    ]
+    assert render_figures([]) == []
+
+    with pytest.raises(TypeError):
+        render_figures(jobs, nprocs=0)
+
+
+def test_error_plot_jobs_outliers(tmp_path):
+    path = "tests/test_plotter/input/"
+    df = pd.read_csv(path + "logs.csv")
+
+    # A pass flagged as outlier by the runner does not skew the error bars
+    df_flagged = df.copy()
+    df_flagged.loc[0, "Reading files"] = 1000.0
+    df_flagged["outlier"] = False
+    df_flagged.loc[0, "outlier"] = True
+
+    jobs = error_plot_jobs(df.drop(index=0), str(tmp_path), "png")
+    flagged = error_plot_jobs(df_flagged, str(tmp_path), "png")
+    for (_, kwargs), (_, f_kwargs) in zip(jobs, flagged):
+        assert list(f_kwargs["mean"]) == pytest.approx(list(kwargs["mean"]))
+
+
+def test_phase_categories():
+    phases = ["Reading files", "Computing POD modes", "Writing chronos"]
+    assert phase_categories(phases) == {
+        "Reading files": "Reading",
+        "Computing POD modes": "Computing",
+        "Writing chronos": "Writing",
+    }
+    assert phase_categories(phases, {"Writing chronos": "IO"})["Writing chronos"] == "IO"
+
+
+def test_breakdown_and_bottlenecks(tmp_path):
+    path = "tests/test_plotter/input/"
+    df = pd.read_csv(path + "logs.csv")
+
+    breakdown = category_breakdown(df)
+    assert list(breakdown.index) == [9, 18, 36]
+    assert list(breakdown.columns) == ["Reading", "Computing", "Writing"]
+    reading = df[df["Number of processors"] == 9]["Reading files"].mean()
+    assert breakdown.loc[9, "Reading"] == pytest.approx(reading)
+
+    table = bottleneck_table(breakdown)
+    assert table[["Reading share", "Computing share", "Writing share"]].sum(
+        axis=1
+    ).values == pytest.approx([1.0, 1.0, 1.0])
+    assert list(table["Dominant"]) == ["Writing"] * 3
+    assert not table["Shift"].any()
+
+    # Reading dominates on few processors, writing on many
+    shifted = pd.DataFrame(
+        {"Reading": [10.0, 5.0, 2.0], "Writing": [4.0, 4.0, 4.0]}, index=[4, 1, 16]
+    )
+    table = bottleneck_table(shifted)
+    assert list(table.index) == [1, 4, 16]
+    assert list(table["Dominant"]) == ["Reading", "Reading", "Writing"]
+    assert list(table["Shift"]) == [False, False, True]
+
+    # A variation without any time has no dominant category
+    shifted.loc[32] = [0.0, 0.0]
+    table = bottleneck_table(shifted)
+    assert table.loc[32, ["Reading share", "Writing share"]].isnull().all()
+    assert table.loc[32, "Dominant"] is None
+    assert not table.loc[32, "Shift"]
+
+    breakdown_plot(df, str(tmp_path), "png", nprocs=1)
+    assert os.path.isfile(os.path.join(str(tmp_path), "breakdown.png"))
+    assert os.path.isfile(os.path.join(str(tmp_path), "breakdown_share.png"))
+
+    with pytest.raises(TypeError):
+        breakdown_plot(123, str(tmp_path), "png")
+
+
+def test_piechart_plot_jobs(tmp_path):
+    path = "tests/test_plotter/input/"
+    df = pd.read_csv(path + "logs.csv")
+
+    # The largest category is exploded, whatever the number of categories
+    (_, kwargs), = piechart_plot_jobs(df, str(tmp_path), "png")
+    assert kwargs["explode"] == [0, 0, 0.1]
+    assert kwargs["title"] == "Average time distribution"
+
+    df["Number of snapshots"] = 200
+    mapping = {"Computing POD modes": "Solver"}
+    (_, kwargs), = piechart_plot_jobs(df, str(tmp_path), "png", mapping=mapping)
+    assert len(kwargs["explode"]) == len(kwargs["labels"]) == 4
+    assert kwargs["title"] == "Average time distribution for 200 snapshots"
+
+    # Runs without a declared number of snapshots are ignored for the title
+    df.loc[0, "Number of snapshots"] = float("nan")
+    (_, kwargs), = piechart_plot_jobs(df, str(tmp_path), "png")
+    assert kwargs["title"] == "Average time distribution for 200 snapshots"
@@ -0,0 +1,112 @@
+from parstud.plotter.streaming import RunningMoments
+from parstud.plotter.streaming import QuantileSketch
+from parstud.plotter.streaming import stream_statistics
+from parstud.plotter.streaming import stream_plot_jobs
+from parstud.plotter.plotter import error_plot_jobs
+from parstud.plotter.plotter import piechart_plot_jobs
+from parstud.plotter.plotter import breakdown_plot_jobs
+from parstud.reader.reader import phase_columns
+import os
+import pytest
+import numpy as np
+import pandas as pd
+
+
+def test_running_moments():
+    values = np.random.default_rng(0).normal(10.0, 2.0, size=1000)
+
+    moments = RunningMoments()
+    for chunk in np.array_split(values, 7):
+        moments.update(chunk)
+    assert moments.count == values.size
+    assert moments.mean == pytest.approx(values.mean())
+    assert moments.variance == pytest.approx(values.var(ddof=1))
+
+    # Merging the moments of two halves gives the moments of the whole
+    first = RunningMoments()
+    first.update(values[:300])
+    second = RunningMoments()
+    second.update(values[300:])
+    first.merge(second)
+    assert first.mean == pytest.approx(values.mean())
+    assert first.variance == pytest.approx(values.var(ddof=1))
+
+    assert np.isnan(RunningMoments().variance)
+
+
+def test_quantile_sketch():
+    rng = np.random.default_rng(1)
+
+    # Small inputs are exact, like pandas
+    values = rng.normal(size=150)
+    sketch = QuantileSketch()
+    for chunk in np.array_split(values, 4):
+        sketch.update(chunk)
+    for q in (0.0, 0.025, 0.5, 0.975, 1.0):
+        assert sketch.quantile(q) == pytest.approx(pd.Series(values).quantile(q))
+
+    # Large inputs are approximated with bounded memory
+    values = rng.normal(size=100000)
+    sketch = QuantileSketch()
+    for chunk in np.array_split(values, 50):
+        sketch.update(chunk)
+    assert sketch.means.size < 1000
+    assert sketch.count == values.size
+    for q in (0.025, 0.5, 0.975):
+        assert sketch.quantile(q) == pytest.approx(np.quantile(values, q), abs=0.02)
+
+    assert np.isnan(QuantileSketch().quantile(0.5))
+
+
+def test_stream_statistics():
+    path = "tests/test_plotter/input/logs.csv"
+    df = pd.read_csv(path)
+    phases = phase_columns(df)
+    grouped = df[phases + ["Number of processors"]].groupby("Number of processors")
+
+    stats = stream_statistics(path, chunksize=4)
+    np.testing.assert_allclose(stats["mean"].values, grouped.mean().values)
+    np.testing.assert_allclose(stats["var"].values, grouped.var().values)
+    np.testing.assert_allclose(stats[0.025].values, grouped.quantile(0.025).values)
+    np.testing.assert_allclose(stats[0.975].values, grouped.quantile(0.975).values)
+    assert list(stats["mean"].index) == list(grouped.mean().index)
+    assert stats["overall"].values == pytest.approx(df[phases].mean().values)
+
+    with pytest.raises(FileNotFoundError):
+        stream_statistics("tests/test_plotter/input/missing.csv")
+
+
+def test_stream_plot_jobs(tmp_path):
+    path = "tests/test_plotter/input/logs.csv"
+    df = pd.read_csv(path)
+
+    jobs = error_plot_jobs(df, str(tmp_path), "png")
+    jobs += piechart_plot_jobs(df, str(tmp_path), "png")
+    jobs += breakdown_plot_jobs(df, str(tmp_path), "png")
+    streamed = stream_plot_jobs(path, str(tmp_path), "png", chunksize=4)
+
+    assert len(streamed) == len(jobs)
+    for (func, kwargs), (s_func, s_kwargs) in zip(jobs, streamed):
+        assert s_func is func
+        assert s_kwargs["filename"] == kwargs["filename"]
+        for key in ("mean", "lower", "upper", "sizes", "values"):
+            if key in kwargs:
+                np.testing.assert_allclose(s_kwargs[key], kwargs[key])
+        for key in ("labels", "explode", "x"):
+            if key in kwargs:
+                assert list(s_kwargs[key]) == list(kwargs[key])
+
+
+def test_stream_plot_jobs_title(tmp_path):
+    df = pd.read_csv("tests/test_plotter/input/logs.csv")
+    df["Number of snapshots"] = 200
+    path = os.path.join(str(tmp_path), "logs.csv")
+    df.to_csv(path, index=False)
+
+    # Streaming and in-memory plotting give the same pie chart title
+    (_, kwargs), = piechart_plot_jobs(df, str(tmp_path), "png")
+    streamed = stream_plot_jobs(path, str(tmp_path), "png", chunksize=4)
+    (_, s_kwargs), = [job for job in streamed if "explode" in job[1]]
+    assert kwargs["title"] == "Average time distribution for 200 snapshots"
+    assert s_kwargs["title"] == kwargs["title"]
+
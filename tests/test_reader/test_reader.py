@@ -1,5 +1,9 @@
 from parstud.reader.reader import build_database
 from parstud.reader.reader import read_log
+from parstud.reader.reader import read_command_parameters
+from parstud.reader.reader import derive_throughput
+from parstud.reader.reader import read_wrapper_output
+from parstud.reader.reader import database_from_info
 import sys
 import os
 import pytest
@@ -47,3 +51,81 @@ def test_build_database():
         df = build_database(bad_path, bad_name)
         df = build_database(path, bad_name)
         df = build_database(bad_path, name)
+
+
+def test_read_command_parameters():
+    cmd = "3DPOD_U.out -i input -p 381600 -v 3 -nm 20 -s 200 -np  9"
+
+    params = read_command_parameters(cmd)
+
+    assert params == {
+        "Number of points": 381600,
+        "Number of variables": 3,
+        "Number of modes": 20,
+        "Number of snapshots": 200,
+    }
+    assert read_command_parameters(cmd, parameters={"-np": "np"}) == {"np": 9}
+    assert read_command_parameters("ls -p") == {}
+
+    with pytest.raises(TypeError):
+        read_command_parameters(123)
+
+
+def test_derive_throughput():
+    path = "tests/test_reader/input/out_test/"
+    name = "runinfo.parstud"
+
+    df = build_database(path, name)
+
+    assert df["Number of snapshots"].iloc[0] == 200
+    # 381600 points x 3 variables x 200 snapshots x 8 bytes in 18.8998 s
+    assert df["Reading files [MB/s]"].iloc[0] == pytest.approx(1831.68 / 18.8998)
+    assert "Writing POD modes [MB/s]" in df.columns
+    assert "Computing POD modes [points x snapshots/s]" in df.columns
+
+    # Nothing can be derived without the problem size
+    bare = df.iloc[:, :9]
+    assert list(derive_throughput(bare).columns) == list(bare.columns)
+
+    with pytest.raises(TypeError):
+        derive_throughput(123)
+
+
+def test_read_wrapper_output():
+    path = "tests/test_reader/input/wrappers/"
+
+    time = read_wrapper_output(path + "time.txt", "time")
+    assert time["time: Maximum resident set size (kbytes)"] == 5123456
+    assert time["time: Percent of CPU this job got"] == 689
+    assert time["time: Elapsed (wall clock) time (seconds)"] == pytest.approx(61.34)
+
+    perf = read_wrapper_output(path + "perf.txt", "perf")
+    assert perf["perf: task-clock [msec]"] == pytest.approx(61253.12)
+    assert perf["perf: context-switches"] == 5120
+    assert pd.isna(perf["perf: cycles"])
+
+    strace = read_wrapper_output(path + "strace.txt", "strace")
+    assert strace["strace: read calls"] == 2000
+    assert strace["strace: openat errors"] == 3
+    assert strace["strace: total seconds"] == pytest.approx(0.8192)
+    assert strace["strace: total calls"] == 6001
+
+    # The reports end up next to the phase timings in the database
+    info = pd.DataFrame(
+        {
+            "command": ["3DPOD_U.out -np 9", "3DPOD_U.out -np 18"],
+            "pass_no": [1, 1],
+            "stdout_file": ["out_test/output.0", "out_test/output.5"],
+            "wrapper": ["time", "strace"],
+            "wrapper_file": ["wrappers/time.txt", "wrappers/strace.txt"],
+        }
+    )
+    df = database_from_info("tests/test_reader/input/", info)
+    assert df["time: Swaps"].tolist()[0] == 0
+    assert pd.isna(df["time: Swaps"].tolist()[1])
+    assert df["strace: total calls"].tolist()[1] == 6001
+
+    with pytest.raises(ValueError):
+        read_wrapper_output(path + "time.txt", "unknown")
+    with pytest.raises(FileNotFoundError):
+        read_wrapper_output("nonexistant-folder/", "time")
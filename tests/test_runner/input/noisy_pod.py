@@ -0,0 +1,26 @@
+# Mimics the log output of the parallel-pod code. The invocations are
+# counted in the file given as first argument; the invocations listed in the
+# remaining arguments are disturbed and take ten times longer.
+import sys
+
+with open(sys.argv[1], mode="a+") as f:
+    f.seek(0)
+    _count = len(f.read())
+    f.write("x")
+
+_factor = 10.0 if str(_count) in sys.argv[2:] else 1.0
+
+print("Starting POD routines \n")
+for _phase, _time in (
+    ("Reading files", 4.0),
+    ("Computing projection matrix", 2.0),
+    ("Computing eigenvalues and eigenvectors", 0.01),
+    ("Computing POD modes", 3.0),
+    ("Writing eigenvalues", 0.01),
+    ("Writing chronos", 0.02),
+    ("Writing POD modes", 5.0),
+):
+    _time = _time * (1.0 + 0.01 * _count)
+    if _phase == "Computing POD modes":
+        _time = _time * _factor
+    print("{0}...\t\t\t\t Done in {1}s \n".format(_phase, _time))
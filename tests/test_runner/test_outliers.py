@@ -0,0 +1,76 @@
+import os
+import sys
+import numpy as np
+from parstud.runner.outliers import robust_outliers
+from parstud.runner.outliers import flag_outliers
+from parstud.runner.run_profile import run_and_gather_statistics
+from parstud.reader.reader import build_database
+
+
+def test_robust_outliers():
+    _flags = robust_outliers([1.0, 1.1, 0.9, 1.0, 5.0])
+    assert list(_flags) == [False, False, False, False, True]
+
+    # The outlier does not hide itself by inflating the spread
+    assert robust_outliers([1.0, 1.1, 0.9, 1.0, 1.05, 100.0])[-1]
+
+    # NaN values are ignored and never flagged
+    _flags = robust_outliers([1.0, np.nan, 1.1, 0.9, 5.0])
+    assert list(_flags) == [False, False, False, False, True]
+
+    # No spread, no outliers
+    assert not robust_outliers([1.0, 1.0, 1.0, 2.0]).any()
+    assert not robust_outliers([]).any()
+
+    # Timer jitter on a sub-millisecond phase is not an outlier
+    _jitter = [2.0e-4, 2.1e-4, 1.9e-4, 2.0e-4, 9.0e-4]
+    assert not robust_outliers(_jitter).any()
+    assert robust_outliers(_jitter, min_deviation=0.0, min_relative=0.0)[-1]
+
+    # Neither is a deviation of a few percent of a long phase
+    assert not robust_outliers([100.0, 100.1, 99.9, 100.0, 103.0]).any()
+    assert robust_outliers([100.0, 100.1, 99.9, 100.0, 110.0])[-1]
+
+
+def test_flag_outliers_too_few_passes(tmp_path):
+    _rundb = run_and_gather_statistics(["/bin/true"], str(tmp_path), passes_per_cmd=2)
+    assert flag_outliers(str(tmp_path), _rundb, "/bin/true") == []
+    assert not _rundb["outlier"].any()
+
+
+def test_rerun_outliers(tmp_path):
+    _script = os.path.join(os.path.dirname(__file__), "input", "noisy_pod.py")
+    _counter = os.path.join(str(tmp_path), "counter.txt")
+    _datapath = os.path.join(str(tmp_path), "study")
+    os.makedirs(_datapath)
+
+    # The third invocation is disturbed, its replacement is not
+    _command = "{0} {1} {2} 2".format(sys.executable, _script, _counter)
+    _rundb = run_and_gather_statistics(
+        [_command], _datapath, passes_per_cmd=5, outlier_threshold=3.5, max_reruns=2
+    )
+
+    assert len(_rundb.index) == 6
+    assert list(_rundb["outlier"]) == [False, False, True, False, False, False]
+    assert _rundb.at[5, "rerun_of"] == 2
+    assert _rundb.at[5, "pass_no"] == 6
+    assert _rundb.at[5, "exit_status"] == 0
+
+    # The flags are persisted and carried over to the reader database
+    _df = build_database(os.path.join(_datapath, ""), "runinfo_parstud.csv")
+    assert list(_df["outlier"]) == [False, False, True, False, False, False]
+
+
+def test_rerun_outliers_bounded(tmp_path):
+    _script = os.path.join(os.path.dirname(__file__), "input", "noisy_pod.py")
+    _counter = os.path.join(str(tmp_path), "counter.txt")
+
+    # The replacement is disturbed as well, but only one is allowed
+    _command = "{0} {1} {2} 1 5".format(sys.executable, _script, _counter)
+    _rundb = run_and_gather_statistics(
+        [_command], str(tmp_path), passes_per_cmd=5, outlier_threshold=3.5, max_reruns=1
+    )
+
+    assert len(_rundb.index) == 6
+    assert _rundb["rerun_of"].dropna().tolist() == [1]
+    assert _rundb["outlier"].sum() == 2
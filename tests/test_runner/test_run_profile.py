@@ -146,3 +146,110 @@ def test_run_and_gather_statistics():
     _output_dir = next(_output_dir_iter)
     pprint.pprint("Using directory: {}".format(_output_dir))
     run_and_gather_statistics(_syscalls, _output_dir, passes_per_cmd=_passes_per_cmd)
+
+
+def test_execute_timestamps_and_overhead(tmp_path):
+    _output_dir = str(tmp_path)
+
+    _syscalls = generate_syscalls(["0.05"], "/bin/sleep")
+    _rundb = run_and_gather_statistics(_syscalls, _output_dir, passes_per_cmd=2)
+
+    # Monotonic timestamps bracket the process
+    assert (_rundb["reap_time"] > _rundb["spawn_time"]).all()
+    assert (_rundb["elapsed_time"] >= 0.05).all()
+    assert _rundb["spawn_time"][1] >= _rundb["reap_time"][0]
+    assert os.path.isfile(os.path.join(_output_dir, "overhead_parstud.csv"))
+
+    # The final write of the database is accounted to the last run in memory
+    _persisted = pandas.read_csv(os.path.join(_output_dir, "runinfo_parstud.csv"))
+    assert _rundb["overhead_database"][0] == pytest.approx(_persisted["overhead_database"][0])
+    assert _rundb["overhead_database"][1] > _persisted["overhead_database"][1]
+
+    _summary = summarize_overhead(_rundb)
+    assert list(_summary.index) == ["spawn", "output", "database", "total"]
+    assert _summary.loc["total", "sum"] == pytest.approx(
+        _summary.loc[["spawn", "output", "database"], "sum"].sum()
+    )
+    assert (_summary["fraction"] > 0).all()
+
+    with pytest.raises(TypeError):
+        summarize_overhead("rundb")
+
+
+def test_run_with_wrapper(tmp_path):
+    _output_dir = str(tmp_path)
+
+    assert wrap_command("ls -l", "strace", "out.txt") == [
+        "strace", "-c", "-f", "-o", "out.txt", "ls", "-l"
+    ]
+    with pytest.raises(ValueError):
+        wrap_command("ls -l", "unknown", "out.txt")
+    with pytest.raises(ValueError):
+        prepare_run_database(["ls"], wrapper="unknown")
+
+    # Register a wrapper writing its own report before running the command
+    WRAPPERS["fake"] = ["/bin/sh", "-c", 'echo "wrapped" > {outfile}; exec "$@"', "sh"]
+    try:
+        _rundb = run_and_gather_statistics(
+            ["/bin/echo hello"], _output_dir, wrapper="fake"
+        )
+    finally:
+        del WRAPPERS["fake"]
+
+    assert _rundb["exit_status"][0] == 0
+    with open(os.path.join(_output_dir, _rundb["stdout_file"][0])) as f:
+        assert f.read() == "hello\n"
+    with open(os.path.join(_output_dir, _rundb["wrapper_file"][0])) as f:
+        assert f.read() == "wrapped\n"
+
+
+def test_prepare_run_database_order():
+    _sequential = prepare_run_database(["cmd1", "cmd2"], passes_per_cmd=2)
+    assert list(_sequential["command"]) == ["cmd1", "cmd1", "cmd2", "cmd2"]
+
+    _roundrobin = prepare_run_database(
+        ["cmd1", "cmd2"], passes_per_cmd=2, order="roundrobin"
+    )
+    assert list(_roundrobin["command"]) == ["cmd1", "cmd2", "cmd1", "cmd2"]
+    assert list(_roundrobin["pass_no"]) == [1, 1, 2, 2]
+    assert list(_roundrobin.index) == [0, 1, 2, 3]
+
+    # A random order is a reproducible permutation of all runs
+    _syscalls = ["cmd{0}".format(_i) for _i in range(10)]
+    _random = prepare_run_database(_syscalls, passes_per_cmd=3, order="random", seed=1)
+    _again = prepare_run_database(_syscalls, passes_per_cmd=3, order="random", seed=1)
+    pandas.testing.assert_frame_equal(_random, _again)
+    assert list(_random["command"]) != sorted(_random["command"])
+    assert sorted(_random["command"]) == sorted(_syscalls * 3)
+
+    with pytest.raises(ValueError):
+        prepare_run_database(["cmd1"], order="backwards")
+
+
+def test_wait_for_quiet_system(monkeypatch):
+    import parstud.runner.run_profile as run_profile
+
+    # Without a CPU frequency, a quiet system passes the gate without sleeping
+    monkeypatch.setattr(run_profile, "get_cpu_frequency", lambda: None)
+    _gate = wait_for_quiet_system(1e6, interval=10.0)
+    assert _gate["gate_quiet"] is True
+    assert _gate["load_1min"] >= 0
+    assert _gate["gate_wait"] < 1.0
+
+    # A settled frequency is confirmed by a second sample
+    monkeypatch.setattr(run_profile, "get_cpu_frequency", lambda: 2000.0)
+    _gate = wait_for_quiet_system(1e6, interval=0.05)
+    assert _gate["gate_quiet"] is True
+    assert 0.05 <= _gate["gate_wait"] < 1.0
+
+    # A drifting frequency keeps the gate closed, even if the load is low
+    _freqs = iter(range(1000, 100000, 200))
+    monkeypatch.setattr(run_profile, "get_cpu_frequency", lambda: float(next(_freqs)))
+    _gate = wait_for_quiet_system(1e6, interval=0.05, timeout=0.3)
+    assert _gate["gate_quiet"] is False
+    assert _gate["gate_wait"] >= 0.3
+
+    # A negative load average is never reached
+    _gate = wait_for_quiet_system(-1, interval=0.05, timeout=0.2)
+    assert _gate["gate_quiet"] is False
+    assert _gate["gate_wait"] >= 0.2
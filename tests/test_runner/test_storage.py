@@ -0,0 +1,92 @@
+import os
+import pytest
+
+from parstud.runner.storage import *
+from parstud.reader.reader import read_log
+
+
+def test_compress():
+    _data = b"Reading files...\t\t\t\t Done in 18.8998s \n" * 100
+
+    _gzip = compress(_data, "gzip")
+    assert len(_gzip) < len(_data)
+    assert decompress(_gzip, "output_0.txt.gz") == _data
+    assert compress(_data, None) == _data
+
+    with pytest.raises(ValueError):
+        compress(_data, "rar")
+
+
+def test_write_and_read_output(tmp_path):
+    _dbpath = str(tmp_path)
+    _log = "tests/test_reader/input/out_test/output.0"
+    with open(_log, mode="rb") as f:
+        _data = f.read()
+
+    # Separate files, plain and compressed
+    assert write_output(_dbpath, "output_0.txt", _data) == "output_0.txt"
+    assert write_output(_dbpath, "output_1.txt", _data, compression="gzip") == (
+        "output_1.txt.gz"
+    )
+
+    # Packed into the archive, several outputs share two files
+    for _i in range(2, 5):
+        _name = write_output(
+            _dbpath, "output_{0}.txt".format(_i), _data, compression="gzip", archive=True
+        )
+        assert _name == "output_{0}.txt.gz".format(_i)
+    assert sorted(os.listdir(_dbpath)) == sorted(
+        ["output_0.txt", "output_1.txt.gz", ARCHIVEFILE, INDEXFILE]
+    )
+
+    for _name in ("output_0.txt", "output_1.txt.gz", "output_3.txt.gz"):
+        assert read_output(os.path.join(_dbpath, _name)) == os.fsdecode(_data)
+        assert read_log(os.path.join(_dbpath, _name), 1) == read_log(_log, 1)
+
+    with pytest.raises(FileNotFoundError):
+        read_output(os.path.join(_dbpath, "output_5.txt.gz"))
+
+
+def test_run_archived_outputs(tmp_path):
+    from parstud.runner.run_profile import run_and_gather_statistics
+
+    _output_dir = str(tmp_path)
+
+    _rundb = run_and_gather_statistics(
+        ["/bin/echo hello", "/bin/echo world"],
+        _output_dir,
+        compression="gzip",
+        archive=True,
+    )
+
+    assert list(_rundb["stdout_file"]) == ["output_0.txt.gz", "output_1.txt.gz"]
+    assert not os.path.exists(os.path.join(_output_dir, "output_0.txt.gz"))
+    assert read_output(os.path.join(_output_dir, "output_1.txt.gz")) == "world\n"
+
+
+def test_run_archived_wrapper_reports(tmp_path):
+    from parstud.runner.run_profile import run_and_gather_statistics
+    from parstud.runner.run_profile import WRAPPERS
+    from parstud.reader.reader import read_wrapper_output
+
+    _output_dir = str(tmp_path)
+    _report = os.path.abspath("tests/test_reader/input/wrappers/time.txt")
+
+    # Register a wrapper copying a sample report before running the command
+    WRAPPERS["fake"] = ["/bin/sh", "-c", 'cat ' + _report + ' > {outfile}; exec "$@"', "sh"]
+    try:
+        _rundb = run_and_gather_statistics(
+            ["/bin/echo hello"],
+            _output_dir,
+            wrapper="fake",
+            compression="gzip",
+            archive=True,
+        )
+    finally:
+        del WRAPPERS["fake"]
+
+    # The report is packed into the archive like the command output
+    assert list(_rundb["wrapper_file"]) == ["wrapper_0.txt.gz"]
+    assert not os.path.exists(os.path.join(_output_dir, "wrapper_0.txt"))
+    _time = read_wrapper_output(os.path.join(_output_dir, "wrapper_0.txt.gz"), "time")
+    assert _time["time: Maximum resident set size (kbytes)"] == 5123456
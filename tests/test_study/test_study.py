@@ -0,0 +1,111 @@
+from parstud.study.study import Study
+from parstud.study.study import file_signature
+from parstud.benchmark.synthetic import generate_study
+from parstud.benchmark.synthetic import generate_log
+from parstud.pipeline.pipeline import compute_statistics
+from parstud.reader.reader import build_database
+from parstud.plotter.plotter import piechart_plot_jobs
+import os
+import pytest
+import pandas as pd
+
+
+def test_file_signature(tmp_path):
+    _file = os.path.join(str(tmp_path), "a.txt")
+    _missing = file_signature([_file])
+
+    with open(_file, mode="w") as f:
+        f.write("a")
+    _written = file_signature([_file])
+    assert _written != _missing
+
+    with open(_file, mode="a") as f:
+        f.write("b")
+    assert file_signature([_file]) != _written
+
+
+def test_study_views(tmp_path):
+    datapath = str(tmp_path)
+    generate_study(datapath, [1, 2, 4], passes_per_cmd=3, seed=0)
+
+    study = Study(datapath)
+    assert len(study.rundb.index) == 9
+    assert study.sysinfo is None
+
+    expected = build_database(os.path.join(datapath, ""), "runinfo_parstud.csv")
+    assert list(study.database.index) == list(expected.index)
+    assert list(study.database["Number of processors"]) == [1] * 3 + [2] * 3 + [4] * 3
+    assert study.phases[0] == "Reading files"
+
+    stats = compute_statistics(study.database)
+    pd.testing.assert_frame_equal(study.statistics, stats)
+    assert list(study.errorbars["mean"].index) == [1, 2, 4]
+    assert sorted(study.reduced.index) == ["Computing", "Reading", "Writing"]
+
+    jobs = study.plot_jobs(datapath, "png")
+    assert len(jobs) == len(study.phases) + 3
+    # Same pie chart title as plotted from the reader database
+    (_, kwargs), = piechart_plot_jobs(expected, datapath, "png")
+    assert jobs[len(study.phases)][1]["title"] == kwargs["title"]
+    assert kwargs["title"] == "Average time distribution for 200 snapshots"
+    assert list(study.bottlenecks.index) == [1, 2, 4]
+
+    with pytest.raises(FileNotFoundError):
+        Study("nonexistant-folder/")
+
+
+def test_study_memoization(tmp_path):
+    datapath = str(tmp_path)
+    generate_study(datapath, [1, 2], passes_per_cmd=2, seed=0)
+
+    study = Study(datapath)
+    database = study.database
+    statistics = study.statistics
+
+    # Unchanged files: the memoized views are returned
+    assert study.database is database
+    assert study.statistics is statistics
+
+    # Logs modified in place are not noticed on their own
+    _logs = [os.path.join(datapath, _name) for _name in study.rundb["stdout_file"]]
+    _text = generate_log([(_phase, 1000.0) for _phase in study.phases])
+    for _log in _logs[:2]:
+        with open(_log, mode="w") as f:
+            f.write(_text)
+    assert study.database is database
+
+    # Once the run database is updated, as the runner does after writing a
+    # log, only the logs of the changed rows are read again
+    _rundb = pd.read_csv(os.path.join(datapath, "runinfo_parstud.csv"), index_col=0)
+    _rundb.loc[0, "end_time"] = "rerun"
+    _rundb.to_csv(os.path.join(datapath, "runinfo_parstud.csv"))
+    assert study.database is not database
+    assert study.database["Reading files"].iloc[0] == 1000.0
+    assert study.database["Reading files"].iloc[1] == database["Reading files"].iloc[1]
+    assert study.statistics.loc[1, "Reading files max"] == 1000.0
+
+    study.invalidate()
+    assert study.statistics is not statistics
+    assert study.database["Reading files"].iloc[1] == 1000.0
+
+
+def test_study_without_successful_runs(tmp_path):
+    from parstud.runner.run_profile import run_and_gather_statistics
+
+    # No run has finished yet
+    pending = str(tmp_path / "pending")
+    os.makedirs(pending)
+    run_and_gather_statistics(["/bin/echo 1"], pending, buildonly=True)
+    study = Study(pending)
+    assert study.database.empty
+    assert "Number of processors" in study.database.columns
+    assert study.phases == []
+
+    # Every run failed
+    failed = str(tmp_path / "failed")
+    os.makedirs(failed)
+    run_and_gather_statistics(["/bin/false 1", "/bin/false 2"], failed)
+    study = Study(failed)
+    assert (study.rundb["exit_status"] != 0).all()
+    assert study.database.empty
+    assert study.statistics.empty